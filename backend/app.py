@@ -1,23 +1,23 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, request, make_response, current_app
 from flask_cors import CORS
 import os
+import hashlib
+from functools import wraps
 from database import (
     init_database,
     create_free_trial_request, 
-    get_all_free_trial_requests, 
-    get_all_interns, 
+    list_free_trial_requests,
+    get_free_trial_request,
     create_intern_record, 
-    assign_intern_to_request, 
-    update_request_status,
     update_project_details,
     get_intern_by_credentials,
     update_intern_credentials,
     get_requests_for_intern,
     update_intern_note,
-    get_intern_customer_companies,
-    get_intern_customer_requests,
-    get_intern_assigned_count,
-    get_db_connection,
+    list_interns_with_assignments,
+    expire_demo_accounts,
+    get_table_versions,
+    read_cache,
     create_demo_credentials,
     get_companies_assigned_to_interns,
     get_all_companies,
@@ -26,49 +26,160 @@ from database import (
     delete_intern_record,
     update_customer_basic_info,
     update_intern_basic_info,
-    get_all_demo_accounts,
+    list_demo_accounts,
     delete_demo_account,
     update_demo_account,
     regenerate_demo_credentials,
-    assign_intern_to_demo,
-    update_demo_admin_note,
     update_demo_intern_note,
     get_demo_accounts_for_intern,
-    create_notification,
-    get_notifications,
+    get_notification_inbox,
     mark_notification_as_read,
     mark_all_notifications_as_read,
     get_unread_notification_count,
-    delete_notification
+    get_latest_notification_id,
+    delete_notification,
+    assign_intern_to_request_with_notifications,
+    update_request_status_with_notifications,
+    assign_intern_to_demo_with_notifications,
+    update_demo_admin_note_with_notifications,
+    update_demo_intern_note_with_notifications,
+    bulk_assign_requests,
+    bulk_update_request_status,
+    bulk_delete_requests,
+    bulk_assign_demos,
+    bulk_delete_demos,
+    MAX_BULK_IDS,
+    decode_page_cursor,
+    resolve_list_fields,
+    INTERN_ASSIGNMENT_FIELDS,
+    PAGE_SORTS,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE
 )
+import db_pool
+import write_queue
+from backup_database import backup_and_rotate, list_backups
+from purge_notifications import purge_notifications
+from import_records import import_records, detect_format
+from export_records import (
+    build_export_query, export_chunks, export_filename, EXPORT_FORMATS, EXPORT_MIMETYPES
+)
+from json_provider import get_json_provider_class
+from compression import CompressionMiddleware, get_compression_stats
+from static_assets import StaticManifest, send_asset
+from notification_stream import notification_events, get_stream_stats
+from scheduler import get_scheduler, get_scheduler_status
 
 app = Flask(__name__)
+app.json = get_json_provider_class()(app)
+app.wsgi_app = CompressionMiddleware(app.wsgi_app)
 CORS(app)
 
 # Configuration
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 
+# Built frontend, scanned once per worker
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'dist')
+static_assets = StaticManifest(FRONTEND_DIR)
+
+# Return request-scoped database connections to the pool
+db_pool.init_app(app)
+
 # Initialize database tables
 init_database()
 
+@app.before_request
+def start_scheduler():
+    """Start this worker's maintenance scheduler (after fork, so never in the gunicorn master)"""
+    get_scheduler()
+
+def get_page_args(table, extra_fields=()):
+    """Read the list sorting, keyset pagination and fields= projection arguments
+
+    Without limit or after every row is returned, as older clients expect.
+    fields is a comma-separated list of the fields to return; without it
+    every field except credentials the list views never display is returned.
+    Raises ValueError with a client-facing message for invalid arguments.
+    """
+    limit = None
+    if 'limit' in request.args or 'after' in request.args:
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    sort = request.args.get('sort', 'created_at')
+    if sort not in PAGE_SORTS[table]:
+        raise ValueError(f"sort must be one of: {', '.join(PAGE_SORTS[table])}")
+
+    order = request.args.get('order', 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+
+    after = request.args.get('after') or None
+    if after is not None:
+        decode_page_cursor(after)
+
+    fields = None
+    if request.args.get('fields'):
+        fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+        resolve_list_fields(table, fields, extra_fields)
+
+    return {'limit': limit, 'after': after, 'sort': sort, 'order': order, 'fields': fields}
+
+def list_response(items, pagination):
+    """Build a list response, adding pagination info only for paginated requests"""
+    response = {
+        'success': True,
+        'data': items
+    }
+    if pagination is not None:
+        response['pagination'] = pagination
+    return jsonify(response)
+
+def conditional_get(*tables):
+    """Answer If-None-Match from the change counters of the tables an endpoint reads
+
+    The ETag hashes the request URL with the tables' versions, so a client
+    whose copy is current gets 304 Not Modified before any list query runs.
+    The versions are read before the endpoint queries, so a write landing
+    in between can only make the ETag stale (forcing a refetch next time),
+    never pair it with outdated data.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = get_table_versions(tables)
+            state = ','.join(f'{table}={versions.get(table, 0)}' for table in tables)
+            etag = hashlib.blake2b(f'{request.full_path}|{state}'.encode('utf-8'), digest_size=12).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # Let browsers keep the body but revalidate on every use
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
 # Routes for serving the frontend
 @app.route('/user-portal')
 @app.route('/user-portal/<path:path>')
 def user_portal(path=''):
     """Serve the user portal (LD SaaS Platform)"""
-    frontend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'dist')
-    if path and os.path.exists(os.path.join(frontend_dir, path)):
-        return send_from_directory(frontend_dir, path)
-    return send_from_directory(frontend_dir, 'index.html')
+    return send_asset(static_assets.get(path))
 
 @app.route('/admin-portal')
 @app.route('/admin-portal/<path:path>')
 def admin_portal(path=''):
     """Serve the admin portal"""
-    frontend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'dist')
-    if path and os.path.exists(os.path.join(frontend_dir, path)):
-        return send_from_directory(frontend_dir, path)
-    return send_from_directory(frontend_dir, 'index.html')
+    return send_asset(static_assets.get(path))
 
 # API Routes
 @app.route('/api/auth/login', methods=['POST'])
@@ -195,22 +306,23 @@ def get_admin_dashboard():
     }), 501
 
 @app.route('/api/admin/interns', methods=['GET'])
+@conditional_get('interns', 'free_trial_requests', 'demo_credentials')
 def get_admin_interns():
-    """Get all interns for admin with their customer companies, customer requests, demo accounts, and correct assigned count"""
+    """Get all interns for admin with their customer companies, customer requests, demo accounts, and correct assigned count
+
+    Accepts limit, after, sort, order and fields (see get_page_args).
+    """
     try:
-        interns = get_all_interns()
-        
-        # Add detailed data for each intern
-        for intern in interns:
-            intern['customer_companies'] = get_intern_customer_companies(intern['id'])
-            intern['customer_requests'] = get_intern_customer_requests(intern['id'])
-            intern['demo_accounts'] = get_demo_accounts_for_intern(intern['id'])
-            intern['assigned_count'] = get_intern_assigned_count(intern['id'])
-        
+        page = get_page_args('interns', INTERN_ASSIGNMENT_FIELDS)
+    except ValueError as e:
         return jsonify({
-            'success': True,
-            'data': interns
-        })
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    try:
+        interns, pagination = list_interns_with_assignments(**page)
+        return list_response(interns, pagination)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -243,14 +355,23 @@ def create_intern():
         }), 500
 
 @app.route('/api/admin/customers', methods=['GET'])
+@conditional_get('free_trial_requests', 'interns')
 def get_admin_customers():
-    """Get all customers for admin - returns free trial requests"""
+    """Get all customers for admin - returns free trial requests
+
+    Accepts limit, after, sort, order and fields (see get_page_args).
+    """
     try:
-        requests = get_all_free_trial_requests()
+        page = get_page_args('free_trial_requests')
+    except ValueError as e:
         return jsonify({
-            'success': True,
-            'data': requests
-        })
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    try:
+        requests, pagination = list_free_trial_requests(**page)
+        return list_response(requests, pagination)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -272,22 +393,29 @@ def create_customer():
             }), 400
     
     try:
-        # Create free trial request record
-        request_id = create_free_trial_request(
-            data['first_name'],
-            data['last_name'],
-            data['email'],
-            data['company'],
-            data.get('phone', ''),
-            data.get('industry_domain', ''),
-            data.get('request_type', 'L&D')
-        )
+        # Create free trial request record (the function takes the registration form's keys)
+        request_id = create_free_trial_request({
+            'firstName': data['first_name'],
+            'lastName': data['last_name'],
+            'email': data['email'],
+            'company': data['company'],
+            'phone': data.get('phone', ''),
+            'industryDomain': data.get('industry_domain', ''),
+            'primaryUseCase': data.get('primary_use_case'),
+            'accountType': data.get('account_type', 'ld'),
+            'selectedIntegrations': data.get('selected_integrations'),
+        })
         
         return jsonify({
             'success': True,
             'message': 'Customer record created successfully',
             'data': {'id': request_id}
         })
+    except ValueError as ve:
+        return jsonify({
+            'success': False,
+            'message': str(ve)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -305,47 +433,7 @@ def assign_intern_to_trial_request(request_id):
         intern_id = None
     
     try:
-        assign_intern_to_request(request_id, intern_id)
-        
-        # Create notifications
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get customer details
-        cursor.execute('SELECT first_name, last_name, company FROM free_trial_requests WHERE id = ?', (request_id,))
-        customer = cursor.fetchone()
-        
-        if intern_id and customer:
-            # Get intern name
-            cursor.execute('SELECT name FROM interns WHERE id = ?', (intern_id,))
-            intern = cursor.fetchone()
-            
-            if intern:
-                # Notify admin
-                create_notification(
-                    'admin', None,
-                    'Intern Assigned',
-                    f'{intern["name"]} has been assigned to {customer["first_name"]} {customer["last_name"]} from {customer["company"]}',
-                    'success', 'assignment', request_id
-                )
-                
-                # Notify intern
-                create_notification(
-                    'intern', intern_id,
-                    'New Assignment',
-                    f'You have been assigned to {customer["first_name"]} {customer["last_name"]} from {customer["company"]}',
-                    'info', 'assignment', request_id
-                )
-        elif customer:
-            # Unassignment notification
-            create_notification(
-                'admin', None,
-                'Intern Unassigned',
-                f'Intern has been unassigned from {customer["first_name"]} {customer["last_name"]} from {customer["company"]}',
-                'warning', 'unassignment', request_id
-            )
-        
-        conn.close()
+        assign_intern_to_request_with_notifications(request_id, intern_id)
         
         if intern_id:
             message = 'Intern assigned successfully'
@@ -375,38 +463,7 @@ def update_trial_request_status(request_id):
         }), 400
     
     try:
-        update_request_status(request_id, status)
-        
-        # Create notifications
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get customer and intern details
-        cursor.execute('''
-            SELECT first_name, last_name, company, assigned_intern_id 
-            FROM free_trial_requests WHERE id = ?
-        ''', (request_id,))
-        customer = cursor.fetchone()
-        
-        if customer:
-            # Notify admin
-            create_notification(
-                'admin', None,
-                'Status Updated',
-                f'Status for {customer["first_name"]} {customer["last_name"]} from {customer["company"]} changed to {status}',
-                'info', 'status_change', request_id
-            )
-            
-            # Notify assigned intern if any
-            if customer['assigned_intern_id']:
-                create_notification(
-                    'intern', customer['assigned_intern_id'],
-                    'Status Updated',
-                    f'Status for {customer["first_name"]} {customer["last_name"]} from {customer["company"]} changed to {status}',
-                    'info', 'status_change', request_id
-                )
-        
-        conn.close()
+        update_request_status_with_notifications(request_id, status)
         
         return jsonify({
             'success': True,
@@ -418,6 +475,70 @@ def update_trial_request_status(request_id):
             'message': f'Error updating status: {str(e)}'
         }), 500
 
+def parse_bulk_request(data, actions):
+    """Validate a bulk request body; returns (action, ids, intern_id, error message)"""
+    action = data.get('action')
+    if action not in actions:
+        return None, None, None, f"action must be one of: {', '.join(actions)}"
+    
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return None, None, None, 'ids must be a non-empty list'
+    if not all(isinstance(row_id, int) and not isinstance(row_id, bool) for row_id in ids):
+        return None, None, None, 'ids must be integers'
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_BULK_IDS:
+        return None, None, None, f'At most {MAX_BULK_IDS} ids can be changed at once'
+    
+    intern_id = data.get('intern_id') or None
+    if action == 'assign' and not intern_id:
+        return None, None, None, 'intern_id is required'
+    return action, ids, intern_id, None
+
+@app.route('/api/admin/requests/bulk', methods=['POST'])
+def bulk_update_trial_requests():
+    """Assign, unassign, set the status of or delete many customer records in one transaction"""
+    data = request.get_json(silent=True) or {}
+    action, ids, intern_id, error = parse_bulk_request(data, ('assign', 'unassign', 'status', 'delete'))
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        }), 400
+    
+    status = data.get('status')
+    if action == 'status' and not status:
+        return jsonify({
+            'success': False,
+            'message': 'Status is required'
+        }), 400
+    
+    try:
+        if action == 'assign':
+            result = bulk_assign_requests(ids, intern_id)
+        elif action == 'unassign':
+            result = bulk_assign_requests(ids, None)
+        elif action == 'status':
+            result = bulk_update_request_status(ids, status)
+        else:
+            result = bulk_delete_requests(ids)
+        
+        return jsonify({
+            'success': True,
+            'message': f"{result['updated']} customer record(s) updated",
+            'data': result
+        })
+    except ValueError as ve:
+        return jsonify({
+            'success': False,
+            'message': str(ve)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error updating customer records: {str(e)}'
+        }), 500
+
 @app.route('/api/admin/requests/<int:request_id>/project', methods=['PUT'])
 def update_trial_request_project(request_id):
     """Update project details for a trial request"""
@@ -628,29 +749,7 @@ def update_intern_demo_note_api(demo_id):
                 'message': 'Access denied: You are not assigned to this demo account'
             }), 403
             
-        update_demo_intern_note(demo_id, intern_note)
-        
-        # Create notifications
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get intern and demo account details
-        cursor.execute('SELECT name FROM interns WHERE id = ?', (intern_id,))
-        intern = cursor.fetchone()
-        
-        cursor.execute('SELECT first_name, last_name, company FROM demo_credentials WHERE id = ?', (demo_id,))
-        demo_details = cursor.fetchone()
-        
-        if intern and demo_details:
-            # Notify admin about intern note update
-            create_notification(
-                'admin', None,
-                'Demo Account Note Updated',
-                f'{intern["name"]} updated their note for demo account: {demo_details["first_name"]} {demo_details["last_name"]} from {demo_details["company"]}',
-                'info', 'demo_note_update', demo_id
-            )
-        
-        conn.close()
+        update_demo_intern_note_with_notifications(demo_id, intern_id, intern_note)
         
         return jsonify({
             'success': True,
@@ -714,6 +813,26 @@ def update_customer_dashboards(request_id):
         }), 500
 
 # Delete customer record
+@app.route('/api/admin/customers/<int:customer_id>', methods=['GET'])
+def get_customer(customer_id):
+    """Get one customer record with every field, including the API credentials left out of the list"""
+    try:
+        customer = get_free_trial_request(customer_id)
+        if customer is None:
+            return jsonify({
+                'success': False,
+                'message': 'Customer not found'
+            }), 404
+        return jsonify({
+            'success': True,
+            'data': customer
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error fetching customer record: {str(e)}'
+        }), 500
+
 @app.route('/api/admin/customers/<int:customer_id>', methods=['DELETE'])
 def delete_customer(customer_id):
     """Delete a customer record"""
@@ -801,14 +920,23 @@ def update_intern(intern_id):
 
 # Demo Accounts Management
 @app.route('/api/admin/demos', methods=['GET'])
+@conditional_get('demo_credentials', 'interns')
 def get_demo_accounts():
-    """Get all demo accounts"""
+    """Get all demo accounts
+
+    Accepts limit, after, sort, order and fields (see get_page_args).
+    """
     try:
-        demo_accounts = get_all_demo_accounts()
+        page = get_page_args('demo_credentials')
+    except ValueError as e:
         return jsonify({
-            'success': True,
-            'data': demo_accounts
-        })
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    try:
+        demo_accounts, pagination = list_demo_accounts(**page)
+        return list_response(demo_accounts, pagination)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -883,47 +1011,7 @@ def assign_intern_to_demo_endpoint(demo_id):
         intern_id = None
     
     try:
-        assign_intern_to_demo(demo_id, intern_id)
-        
-        # Create notifications
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get demo account details
-        cursor.execute('SELECT first_name, last_name, company FROM demo_credentials WHERE id = ?', (demo_id,))
-        demo_account = cursor.fetchone()
-        
-        if intern_id and demo_account:
-            # Get intern name
-            cursor.execute('SELECT name FROM interns WHERE id = ?', (intern_id,))
-            intern = cursor.fetchone()
-            
-            if intern:
-                # Notify admin
-                create_notification(
-                    'admin', None,
-                    'Intern Assigned to Demo',
-                    f'{intern["name"]} has been assigned to demo account for {demo_account["first_name"]} {demo_account["last_name"]} from {demo_account["company"]}',
-                    'success', 'demo_assignment', demo_id
-                )
-                
-                # Notify intern
-                create_notification(
-                    'intern', intern_id,
-                    'New Demo Assignment',
-                    f'You have been assigned to demo account for {demo_account["first_name"]} {demo_account["last_name"]} from {demo_account["company"]}',
-                    'info', 'demo_assignment', demo_id
-                )
-        elif demo_account:
-            # Unassignment notification
-            create_notification(
-                'admin', None,
-                'Intern Unassigned from Demo',
-                f'Intern has been unassigned from demo account for {demo_account["first_name"]} {demo_account["last_name"]} from {demo_account["company"]}',
-                'info', 'demo_unassignment', demo_id
-            )
-        
-        conn.close()
+        assign_intern_to_demo_with_notifications(demo_id, intern_id)
         
         if intern_id:
             message = 'Intern assigned to demo account successfully'
@@ -940,6 +1028,135 @@ def assign_intern_to_demo_endpoint(demo_id):
             'message': f'Error assigning intern to demo: {str(e)}'
         }), 500
 
+@app.route('/api/admin/demos/bulk', methods=['POST'])
+def bulk_update_demo_accounts():
+    """Assign, unassign or delete many demo accounts in one transaction"""
+    data = request.get_json(silent=True) or {}
+    action, ids, intern_id, error = parse_bulk_request(data, ('assign', 'unassign', 'delete'))
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        }), 400
+    
+    try:
+        if action == 'assign':
+            result = bulk_assign_demos(ids, intern_id)
+        elif action == 'unassign':
+            result = bulk_assign_demos(ids, None)
+        else:
+            result = bulk_delete_demos(ids)
+        
+        return jsonify({
+            'success': True,
+            'message': f"{result['updated']} demo account(s) updated",
+            'data': result
+        })
+    except ValueError as ve:
+        return jsonify({
+            'success': False,
+            'message': str(ve)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error updating demo accounts: {str(e)}'
+        }), 500
+
+@app.route('/api/admin/import/<kind>', methods=['POST'])
+def import_records_endpoint(kind):
+    """Import customers or demo accounts from an uploaded CSV or NDJSON file
+
+    The file is sent as the multipart field "file" or as the raw request
+    body, and is read line by line. Query parameters: format (csv/ndjson,
+    otherwise guessed from the file name or content type), on_conflict
+    (skip/update/error) and dry_run.
+    """
+    upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+    if upload is not None:
+        stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+    else:
+        stream, filename, content_type = request.stream, None, request.mimetype
+    
+    file_format = request.args.get('format') or detect_format(filename, content_type)
+    if not file_format:
+        return jsonify({
+            'success': False,
+            'message': 'format is required (csv or ndjson)'
+        }), 400
+    
+    try:
+        report = import_records(
+            kind, stream, file_format,
+            on_conflict=request.args.get('on_conflict', 'skip'),
+            dry_run=request.args.get('dry_run', 'false').lower() == 'true',
+            source=filename or 'an upload'
+        )
+        if report['dry_run']:
+            message = 'Dry run completed'
+        else:
+            message = (f"{report['inserted']} added, {report['updated']} updated, "
+                       f"{report['skipped']} skipped, {report['errors']} rejected")
+        return jsonify({
+            'success': True,
+            'message': message,
+            'data': report
+        })
+    except ValueError as ve:
+        return jsonify({
+            'success': False,
+            'message': str(ve)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error importing records: {str(e)}'
+        }), 500
+
+@app.route('/api/admin/export/<kind>', methods=['GET'])
+def export_records_endpoint(kind):
+    """Stream customers, demo accounts or notifications as a CSV or NDJSON download
+
+    Query parameters: format (csv/ndjson), fields, status, intern_id and a
+    created_at range with from (inclusive) and to (exclusive).
+    """
+    file_format = request.args.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'message': f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+        }), 400
+    
+    fields = None
+    if request.args.get('fields'):
+        fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+    
+    try:
+        intern_id = request.args.get('intern_id')
+        if intern_id is not None:
+            try:
+                intern_id = int(intern_id)
+            except ValueError:
+                raise ValueError('intern_id must be an integer')
+        sql, params, fields = build_export_query(
+            kind, fields,
+            status=request.args.get('status') or None,
+            intern_id=intern_id,
+            created_from=request.args.get('from') or None,
+            created_to=request.args.get('to') or None
+        )
+    except ValueError as ve:
+        return jsonify({
+            'success': False,
+            'message': str(ve)
+        }), 400
+    
+    chunks = export_chunks(kind, sql, params, fields, file_format, current_app.json.dumps)
+    return current_app.response_class(chunks, mimetype=EXPORT_MIMETYPES[file_format], headers={
+        'Content-Disposition': f'attachment; filename="{export_filename(kind, file_format)}"',
+        'Cache-Control': 'no-store'
+    })
+
 @app.route('/api/admin/demos/<int:demo_id>/admin-note', methods=['PUT'])
 def update_demo_admin_note_endpoint(demo_id):
     """Update admin note for a demo account"""
@@ -947,40 +1164,7 @@ def update_demo_admin_note_endpoint(demo_id):
     admin_note = data.get('admin_note', '')
     
     try:
-        update_demo_admin_note(demo_id, admin_note)
-        
-        # Create notifications
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get demo account details and assigned intern
-        cursor.execute('''
-            SELECT dc.first_name, dc.last_name, dc.company, dc.assigned_intern_id, i.name as intern_name
-            FROM demo_credentials dc
-            LEFT JOIN interns i ON dc.assigned_intern_id = i.id
-            WHERE dc.id = ?
-        ''', (demo_id,))
-        demo_details = cursor.fetchone()
-        
-        if demo_details:
-            if demo_details['assigned_intern_id']:
-                # Notify assigned intern about admin note update
-                create_notification(
-                    'intern', demo_details['assigned_intern_id'],
-                    'Admin Note Added to Demo',
-                    f'Admin added a note to demo account: {demo_details["first_name"]} {demo_details["last_name"]} from {demo_details["company"]}',
-                    'info', 'demo_admin_note', demo_id
-                )
-            
-            # Also notify admin (for activity tracking)
-            create_notification(
-                'admin', None,
-                'Demo Admin Note Updated',
-                f'Admin note updated for demo account: {demo_details["first_name"]} {demo_details["last_name"]} from {demo_details["company"]}',
-                'success', 'demo_admin_note', demo_id
-            )
-        
-        conn.close()
+        update_demo_admin_note_with_notifications(demo_id, admin_note)
         
         return jsonify({
             'success': True,
@@ -994,25 +1178,9 @@ def update_demo_admin_note_endpoint(demo_id):
 
 @app.route('/api/admin/refresh-demo-expiry', methods=['POST'])
 def refresh_demo_expiry():
-    """Refresh demo account expiry status"""
+    """Refresh demo account expiry status now instead of waiting for the scheduler"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get current timestamp
-        cursor.execute('SELECT datetime("now")')
-        current_time = cursor.fetchone()[0]
-        
-        # Update expired demo accounts
-        cursor.execute('''
-            UPDATE demo_credentials 
-            SET is_active = 0 
-            WHERE expires_at < ? AND is_active = 1
-        ''', (current_time,))
-        
-        expired_count = cursor.rowcount
-        conn.commit()
-        conn.close()
+        expired_count = expire_demo_accounts()
         
         return jsonify({
             'success': True,
@@ -1043,13 +1211,96 @@ def update_demo_intern_note_endpoint(demo_id):
             'message': f'Error updating demo intern note: {str(e)}'
         }), 500
 
+# Database Backups
+@app.route('/api/admin/backups', methods=['GET'])
+def get_backups():
+    """List database backups, newest first"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': list_backups()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error listing backups: {str(e)}'
+        }), 500
+
+@app.route('/api/admin/backups', methods=['POST'])
+def create_backup_endpoint():
+    """Create a verified online backup of the database and rotate old ones"""
+    try:
+        backup = backup_and_rotate()
+        return jsonify({
+            'success': True,
+            'message': 'Backup created successfully',
+            'data': backup
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error creating backup: {str(e)}'
+        }), 500
+
+# Maintenance Scheduler
+@app.route('/api/admin/scheduler', methods=['GET'])
+def get_scheduler_status_endpoint():
+    """Get the scheduler leader and the last run, duration and rows touched of each job"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': get_scheduler_status()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error getting scheduler status: {str(e)}'
+        }), 500
+
+# Notification Retention
+@app.route('/api/admin/notifications/purge', methods=['POST'])
+def purge_notifications_endpoint():
+    """Purge notifications outside the retention policy in small batches
+
+    Optional JSON body: days (read notifications to keep), unread_days and
+    dry_run. Rows go to NOTIFICATION_ARCHIVE_PATH when that is configured.
+    """
+    data = request.get_json(silent=True) or {}
+    days = data.get('days')
+    unread_days = data.get('unread_days')
+    for name, value in (('days', days), ('unread_days', unread_days)):
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+            return jsonify({
+                'success': False,
+                'message': f'{name} must be a positive integer'
+            }), 400
+    
+    try:
+        report = purge_notifications(days, unread_days, dry_run=bool(data.get('dry_run')))
+        return jsonify({
+            'success': True,
+            'message': 'Dry run completed' if report['dry_run'] else 'Notifications purged successfully',
+            'data': report
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error purging notifications: {str(e)}'
+        }), 500
+
 # Notifications Management
 @app.route('/api/notifications/<recipient_type>', methods=['GET'])
 def get_notifications_endpoint(recipient_type):
-    """Get notifications for a recipient type (admin/intern)"""
+    """Get a page of notifications for a recipient type (admin/intern) with the unread count
+
+    before_id pages back through older notifications; since_id returns only
+    those newer than the last one the client has seen, oldest first.
+    """
     recipient_id = request.args.get('recipient_id', type=int)
     limit = request.args.get('limit', 50, type=int)
     unread_only = request.args.get('unread_only', 'false').lower() == 'true'
+    before_id = request.args.get('before_id', type=int)
+    since_id = request.args.get('since_id', type=int)
     
     if recipient_type not in ['admin', 'intern']:
         return jsonify({
@@ -1057,11 +1308,19 @@ def get_notifications_endpoint(recipient_type):
             'message': 'Invalid recipient type'
         }), 400
     
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({
+            'success': False,
+            'message': f'limit must be between 1 and {MAX_PAGE_SIZE}'
+        }), 400
+    
     try:
-        notifications = get_notifications(recipient_type, recipient_id, limit, unread_only)
+        inbox = get_notification_inbox(recipient_type, recipient_id, limit, unread_only, before_id, since_id)
         return jsonify({
             'success': True,
-            'data': notifications
+            'data': inbox['notifications'],
+            'unread_count': inbox['unread_count'],
+            'pagination': inbox['pagination']
         })
     except Exception as e:
         return jsonify({
@@ -1092,6 +1351,34 @@ def get_unread_notification_count_endpoint(recipient_type):
             'message': f'Error getting unread count: {str(e)}'
         }), 500
 
+@app.route('/api/notifications/<recipient_type>/stream', methods=['GET'])
+def stream_notifications_endpoint(recipient_type):
+    """Push new notifications and unread count changes as server-sent events"""
+    recipient_id = request.args.get('recipient_id', type=int)
+    
+    if recipient_type not in ['admin', 'intern']:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid recipient type'
+        }), 400
+    
+    # EventSource sends Last-Event-ID when it reconnects; last_event_id lets a
+    # new page resume from the notifications it already loaded
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_id = int(last_event_id) if last_event_id else get_latest_notification_id()
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid Last-Event-ID'
+        }), 400
+    
+    events = notification_events(recipient_type, recipient_id, last_id, current_app.json.dumps)
+    return current_app.response_class(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/notifications/<int:notification_id>/read', methods=['PUT'])
 def mark_notification_read_endpoint(notification_id):
     """Mark a notification as read"""
@@ -1151,6 +1438,22 @@ def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'message': 'SmartCard AI API is running'})
 
+# Metrics endpoint
+@app.route('/api/admin/metrics', methods=['GET'])
+def get_metrics():
+    """Get runtime metrics for this worker process"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'db_pool': db_pool.get_pool_stats(),
+            'write_queue': write_queue.get_write_queue_stats(),
+            'compression': get_compression_stats(),
+            'static_assets': static_assets.stats(),
+            'read_cache': read_cache.stats(),
+            'notification_stream': get_stream_stats()
+        }
+    })
+
 # Default route to serve frontend
 @app.route('/')
 def index():
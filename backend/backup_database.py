@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Consistent online backups of the SQLite database.
+
+Backups use the SQLite online backup API, so pages still sitting in the WAL
+file are included and the copy is a consistent snapshot. Pages are copied a
+few at a time with a short pause between steps to keep the source readable
+and writable for the app. A write from another connection makes SQLite
+restart the copy, so after BACKUP_MAX_RESTARTS restarts the rest is copied
+in one unpaced step, which writers cannot interrupt. A backup that is still
+running after BACKUP_MAX_SECONDS fails. Every copy is checked with PRAGMA
+integrity_check before it is kept, and old backups are rotated out.
+
+    python backup_database.py              # create a backup and rotate
+    python backup_database.py --list       # list existing backups
+    python backup_database.py --keep 14    # retain the newest 14 backups
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import database
+
+BACKUP_DIR = os.environ.get('BACKUP_DIR', os.path.join(os.path.dirname(__file__), 'backups'))
+BACKUP_PREFIX = 'smartcard_backup_'
+
+# Pages copied per backup step and pause between steps
+BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', '256'))
+BACKUP_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP', '0.01'))
+
+# Restarts of the paced copy before the unpaced pass, and the longest a backup may run
+BACKUP_MAX_RESTARTS = int(os.environ.get('BACKUP_MAX_RESTARTS', '3'))
+BACKUP_MAX_SECONDS = float(os.environ.get('BACKUP_MAX_SECONDS', '600'))
+
+# Rotation: keep the newest BACKUP_RETENTION backups, and none older than BACKUP_MAX_AGE_DAYS (0 = no age limit)
+BACKUP_RETENTION = int(os.environ.get('BACKUP_RETENTION', '7'))
+BACKUP_MAX_AGE_DAYS = int(os.environ.get('BACKUP_MAX_AGE_DAYS', '0'))
+
+
+def verify_backup(path):
+    """Run PRAGMA integrity_check on a backup file, returning the problems found"""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        results = [row[0] for row in conn.execute('PRAGMA integrity_check').fetchall()]
+    finally:
+        conn.close()
+    return [] if results == ['ok'] else results
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def create_backup(backup_dir=None, pages_per_step=None, step_sleep=None, max_restarts=None, max_seconds=None):
+    """Copy the live database into a new, verified backup file
+
+    Returns a dict describing the backup. Raises if the copy fails, runs
+    past max_seconds or does not pass the integrity check, leaving no
+    partial file behind.
+    """
+    backup_dir = backup_dir or BACKUP_DIR
+    pages_per_step = pages_per_step or BACKUP_PAGES_PER_STEP
+    step_sleep = BACKUP_STEP_SLEEP if step_sleep is None else step_sleep
+    max_restarts = BACKUP_MAX_RESTARTS if max_restarts is None else max_restarts
+    max_seconds = max_seconds or BACKUP_MAX_SECONDS
+    os.makedirs(backup_dir, exist_ok=True)
+
+    name = f'{BACKUP_PREFIX}{datetime.now().strftime("%Y%m%d_%H%M%S_%f")}.db'
+    path = os.path.join(backup_dir, name)
+    partial_path = path + '.partial'
+
+    steps = 0
+    restarts = 0
+    last_remaining = None
+    unpaced = False
+
+    def pause_between_steps(status, remaining, total):
+        nonlocal steps, restarts, last_remaining
+        steps += 1
+        # SQLite starts over after a write from another connection: the remaining pages go back up
+        if last_remaining is not None and remaining >= last_remaining:
+            restarts += 1
+        last_remaining = remaining
+        if time.perf_counter() - started > max_seconds:
+            raise Exception(f"Backup did not finish within {max_seconds:g}s ({restarts} restarts)")
+        if remaining and restarts >= max_restarts:
+            raise _TooManyRestarts()
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    started = time.perf_counter()
+    source = sqlite3.connect(database.DB_PATH, timeout=30.0)
+    target = sqlite3.connect(partial_path)
+    try:
+        try:
+            source.backup(target, pages=pages_per_step, progress=pause_between_steps)
+        except _TooManyRestarts:
+            # One step holds a read snapshot for the whole copy, so writes cannot restart it
+            unpaced = True
+            source.backup(target)
+            steps += 1
+        # Keep the backup self-contained in a single file
+        target.execute('PRAGMA journal_mode=DELETE')
+        target.close()
+
+        problems = verify_backup(partial_path)
+        if problems:
+            raise Exception(f"Backup failed integrity check: {'; '.join(problems[:5])}")
+
+        os.replace(partial_path, path)
+    except Exception as e:
+        print(f"Database error in create_backup: {str(e)}")
+        target.close()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    finally:
+        source.close()
+
+    return {
+        'name': name,
+        'path': path,
+        'size_bytes': os.path.getsize(path),
+        'steps': steps,
+        'restarts': restarts,
+        'unpaced_final_pass': unpaced,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        'integrity_check': 'ok',
+    }
+
+
+def list_backups(backup_dir=None):
+    """List backups in a directory, newest first"""
+    backup_dir = backup_dir or BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+
+    backups = []
+    for name in os.listdir(backup_dir):
+        if not (name.startswith(BACKUP_PREFIX) and name.endswith('.db')):
+            continue
+        path = os.path.join(backup_dir, name)
+        stat = os.stat(path)
+        backups.append({
+            'name': name,
+            'path': path,
+            'size_bytes': stat.st_size,
+            'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'mtime': stat.st_mtime,
+        })
+    backups.sort(key=lambda backup: backup['mtime'], reverse=True)
+    for backup in backups:
+        del backup['mtime']
+    return backups
+
+
+def rotate_backups(backup_dir=None, keep=None, max_age_days=None):
+    """Delete backups beyond the retention count or older than the age limit
+
+    keep must be at least 1, so the newest backup always survives.
+    """
+    keep = BACKUP_RETENTION if keep is None else keep
+    if keep < 1:
+        raise ValueError('keep must be at least 1')
+    max_age_days = BACKUP_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+
+    removed = []
+    for index, backup in enumerate(list_backups(backup_dir)):
+        too_many = index >= keep
+        too_old = cutoff is not None and os.path.getmtime(backup['path']) < cutoff
+        if too_many or too_old:
+            os.remove(backup['path'])
+            removed.append(backup['name'])
+    return removed
+
+
+def backup_and_rotate(backup_dir=None, keep=None):
+    """Create a verified backup, then apply the retention policy"""
+    keep = BACKUP_RETENTION if keep is None else keep
+    if keep < 1:
+        raise ValueError('keep must be at least 1')
+    backup = create_backup(backup_dir)
+    backup['rotated_out'] = rotate_backups(backup_dir, keep)
+    return backup
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Back up the SmartCard database')
+    parser.add_argument('--dir', help=f'backup directory (default {BACKUP_DIR})')
+    parser.add_argument('--keep', type=int, help=f'number of backups to retain (default {BACKUP_RETENTION})')
+    parser.add_argument('--list', action='store_true', help='list existing backups and exit')
+    args = parser.parse_args()
+    if args.keep is not None and args.keep < 1:
+        parser.error('--keep must be at least 1')
+
+    if args.list:
+        for backup in list_backups(args.dir):
+            print(f"{backup['created_at']}  {backup['size_bytes']:>12}  {backup['name']}")
+        return
+
+    backup = backup_and_rotate(args.dir, args.keep)
+    print(f"Created {backup['path']} ({backup['size_bytes']} bytes, {backup['steps']} steps, "
+          f"{backup['restarts']} restarts, {backup['duration_ms']} ms, integrity ok)")
+    for name in backup['rotated_out']:
+        print(f"Removed old backup {name}")
+
+
+if __name__ == "__main__":
+    main()
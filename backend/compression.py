@@ -0,0 +1,335 @@
+"""
+Negotiated gzip/brotli compression of response bodies.
+
+The customer list and the React bundle are several megabytes of highly
+repetitive text. CompressionMiddleware wraps the WSGI app and compresses
+textual responses for clients that accept it: with brotli when the brotli
+package is installed and the client prefers it, with gzip otherwise.
+
+Bodies with a Content-Length below the size threshold are passed through.
+Bodies without one (generator responses) are buffered up to the threshold;
+past it they are compressed as they are produced, with each chunk flushed
+so the client sees data as soon as the app yields it. Server-sent event
+streams are never compressed.
+"""
+import os
+import threading
+import time
+import zlib
+from functools import lru_cache
+from itertools import chain
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1').lower() in ('1', 'true', 'yes')
+
+# Smallest body worth compressing, and the gzip (1-9) / brotli (0-11) levels
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml',
+    'application/x-ndjson', 'application/manifest+json', 'image/svg+xml',
+)
+# Streams that must reach the client event by event
+UNBUFFERED_TYPES = ('text/event-stream',)
+UNCOMPRESSED_STATUSES = (204, 206, 304)
+
+
+AVAILABLE_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding, available=AVAILABLE_ENCODINGS):
+    """Pick the preferred coding in available ('br', 'gzip' or None) for an Accept-Encoding value"""
+    weights = {}
+    for item in accept_encoding.lower().split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding == 'x-gzip':
+            coding = 'gzip'
+        if coding:
+            weights[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in available:  # in order of preference
+        quality = weights.get(coding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def is_compressible(content_type):
+    """Whether a response of this Content-Type is text worth compressing"""
+    content_type = (content_type or '').lower()
+    if content_type.startswith(UNBUFFERED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.split(';')[0].endswith(('+json', '+xml'))
+
+
+def compress_body(data, encoding, gzip_level=COMPRESSION_LEVEL, brotli_quality=COMPRESSION_BROTLI_QUALITY):
+    """Compress a complete body in one go with gzip or brotli"""
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    return brotli.compress(data, quality=brotli_quality)
+
+
+class _Compressor:
+    """Incremental gzip or brotli encoder"""
+    __slots__ = ('_obj', '_gzip')
+
+    def __init__(self, encoding):
+        self._gzip = encoding == 'gzip'
+        if self._gzip:
+            self._obj = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            self._obj = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._obj.compress(data) if self._gzip else self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH) if self._gzip else self._obj.flush()
+
+    def finish(self):
+        return self._obj.flush() if self._gzip else self._obj.finish()
+
+
+class _Stats:
+    """Compression metrics for this worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = {}
+        self.streamed = 0
+        self.skipped_small = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def record(self, encoding, bytes_in, bytes_out, seconds, streamed=False):
+        with self._lock:
+            self.responses[encoding] = self.responses.get(encoding, 0) + 1
+            self.streamed += streamed
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.seconds += seconds
+
+    def record_small(self):
+        with self._lock:
+            self.skipped_small += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'enabled': COMPRESSION_ENABLED,
+                'brotli_available': brotli is not None,
+                'min_size': COMPRESSION_MIN_SIZE,
+                'level': COMPRESSION_LEVEL,
+                'brotli_quality': COMPRESSION_BROTLI_QUALITY,
+                'responses': dict(self.responses),
+                'streamed': self.streamed,
+                'skipped_small': self.skipped_small,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'bytes_saved': self.bytes_in - self.bytes_out,
+                'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else 0.0,
+                'time_ms': round(self.seconds * 1000, 2),
+            }
+
+
+_stats = _Stats()
+
+
+def get_compression_stats():
+    """Compression metrics for the current process"""
+    return _stats.snapshot()
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _with_vary(headers):
+    """Add Accept-Encoding to the Vary header"""
+    vary = _header(headers, 'Vary')
+    if vary is None:
+        return headers + [('Vary', 'Accept-Encoding')]
+    if 'accept-encoding' in vary.lower() or vary.strip() == '*':
+        return headers
+    return [(k, f'{v}, Accept-Encoding' if k.lower() == 'vary' else v) for k, v in headers]
+
+
+def _compressed_headers(headers, encoding, length=None):
+    """Headers for the encoded body: new encoding and length, weak ETag"""
+    result = []
+    for key, value in headers:
+        lowered = key.lower()
+        if lowered == 'content-length':
+            continue
+        if lowered == 'etag' and not value.startswith('W/'):
+            # The encoded bytes differ from the identity representation
+            value = f'W/{value}'
+        result.append((key, value))
+    result.append(('Content-Encoding', encoding))
+    if length is not None:
+        result.append(('Content-Length', str(length)))
+    return _with_vary(result)
+
+
+class _ClosingIterator:
+    """Yield buffered chunks, then the rest of app_iter; close app_iter when done"""
+
+    def __init__(self, chunks, app_iter, rest=None):
+        self._chunks = chunks
+        self._app_iter = app_iter
+        self._rest = rest
+
+    def __iter__(self):
+        yield from self._chunks
+        if self._rest is not None:
+            yield from self._rest
+
+    def close(self):
+        _close(self._app_iter)
+
+
+class CompressionMiddleware:
+    """WSGI middleware compressing eligible responses"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        encoding = None
+        if COMPRESSION_ENABLED and environ.get('REQUEST_METHOD') != 'HEAD':
+            encoding = negotiate_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return self.app(environ, start_response)
+
+        state = {}
+        written = []
+
+        def deferred_start_response(status, headers, exc_info=None):
+            if exc_info is not None and state.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            state['status'] = status
+            state['headers'] = list(headers)
+            state['exc_info'] = exc_info
+            return written.append
+
+        app_iter = self.app(environ, deferred_start_response)
+        chunks = iter(app_iter)
+        try:
+            # start_response may legitimately be deferred until the first chunk
+            while 'status' not in state:
+                written.append(next(chunks))
+        except StopIteration:
+            pass
+        except BaseException:
+            _close(app_iter)
+            raise
+
+        def begin(headers):
+            state['sent'] = True
+            start_response(state['status'], headers, state['exc_info'])
+
+        headers = state['headers']
+        if not self._eligible(state['status'], headers):
+            begin(headers)
+            return _ClosingIterator(written, app_iter, chunks)
+        headers = _with_vary(headers)
+
+        length = _header(headers, 'Content-Length')
+        if length is not None and length.isdigit() and int(length) < COMPRESSION_MIN_SIZE:
+            _stats.record_small()
+            begin(headers)
+            return _ClosingIterator(written, app_iter, chunks)
+
+        try:
+            size = sum(len(chunk) for chunk in written)
+            exhausted = False
+            # Buffer until the body is known to be big enough (or complete)
+            while size < COMPRESSION_MIN_SIZE or length is not None:
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                written.append(chunk)
+                size += len(chunk)
+        except BaseException:
+            _close(app_iter)
+            raise
+
+        if exhausted and size < COMPRESSION_MIN_SIZE:
+            _stats.record_small()
+            begin(headers)
+            return _ClosingIterator(written, app_iter)
+
+        if exhausted:
+            started = time.perf_counter()
+            compressor = _Compressor(encoding)
+            body = compressor.compress(b''.join(written)) + compressor.finish()
+            _stats.record(encoding, size, len(body), time.perf_counter() - started)
+            _close(app_iter)
+            begin(_compressed_headers(headers, encoding, len(body)))
+            return [body]
+
+        begin(_compressed_headers(headers, encoding))
+        return _ClosingIterator((), app_iter, self._stream(encoding, written, chunks))
+
+    @staticmethod
+    def _eligible(status, headers):
+        if int(status.split(' ', 1)[0]) in UNCOMPRESSED_STATUSES or status.startswith('1'):
+            return False
+        if _header(headers, 'Content-Encoding') not in (None, 'identity'):
+            return False
+        if 'no-transform' in (_header(headers, 'Cache-Control') or '').lower():
+            return False
+        return is_compressible(_header(headers, 'Content-Type'))
+
+    @staticmethod
+    def _stream(encoding, buffered, chunks):
+        """Compress chunks as they are produced, flushing after each one"""
+        compressor = _Compressor(encoding)
+        bytes_in = bytes_out = 0
+        seconds = 0.0
+        try:
+            for chunk in chain((b''.join(buffered),), chunks):
+                if not chunk:
+                    continue
+                started = time.perf_counter()
+                data = compressor.compress(chunk) + compressor.flush()
+                seconds += time.perf_counter() - started
+                bytes_in += len(chunk)
+                bytes_out += len(data)
+                yield data
+            data = compressor.finish()
+            bytes_out += len(data)
+            yield data
+        finally:
+            _stats.record(encoding, bytes_in, bytes_out, seconds, streamed=True)
+
+
+def _close(app_iter):
+    close = getattr(app_iter, 'close', None)
+    if close is not None:
+        close()
@@ -1,18 +1,20 @@
 import sqlite3
 import os
 import json
+import base64
+import time
 from datetime import datetime
+import db_pool
+import write_queue
+from row_decoder import decode_rows
+from read_cache import ReadCache, copy_page
 
 # Database path
 DB_PATH = os.path.join(os.path.dirname(__file__), 'smartcard.db')
 
-def init_database():
-    """Initialize the database with required tables"""
-    conn = sqlite3.connect(DB_PATH, timeout=30.0)
-    cursor = conn.cursor()
-    
-    # Create tables if they don't exist (simple approach)
-    cursor.execute('''
+# Canonical table definitions, in creation order
+TABLE_SCHEMAS = {
+    'free_trial_requests': '''
         CREATE TABLE IF NOT EXISTS free_trial_requests (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             first_name TEXT NOT NULL,
@@ -26,18 +28,18 @@ def init_database():
             primary_use_case_type TEXT DEFAULT 'predefined',
             custom_primary_use_case TEXT,
             account_type TEXT NOT NULL,
-            
+        
             -- Demo-specific fields
             selected_integrations TEXT, -- JSON array
             custom_integration TEXT,
             demo_use_case_type TEXT DEFAULT 'predefined',
             custom_demo_use_case TEXT,
             demo_testing_use_case TEXT,
-            
+        
             -- New dashboard tracking columns
             dashboards_requested INTEGER DEFAULT 0,
             dashboards_delivered INTEGER DEFAULT 0,
-            
+        
             -- Project tracking fields
             use_cases_list TEXT, -- JSON array of use cases
             integrations_list TEXT, -- JSON array of integrations
@@ -45,27 +47,26 @@ def init_database():
             project_info TEXT, -- JSON object with project details
             customer_feedback TEXT,
             next_steps TEXT,
-            
+        
             -- New note fields
             admin_note TEXT,
             intern_note TEXT,
-            
+        
             -- API credentials for delivered projects
             api_username TEXT,
             api_password TEXT,
             api_key TEXT,
             api_endpoint TEXT,
-            
+        
             status TEXT DEFAULT 'pending',
             assigned_intern_id INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (assigned_intern_id) REFERENCES interns (id)
         )
-    ''')
-    
-    # Create updated interns table with additional fields
-    cursor.execute('''
+    ''',
+    # Updated interns table with additional fields
+    'interns': '''
         CREATE TABLE IF NOT EXISTS interns (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -83,10 +84,9 @@ def init_database():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-    ''')
-    
-    # Create demo credentials table for demo access
-    cursor.execute('''
+    ''',
+    # Demo credentials table for demo access
+    'demo_credentials': '''
         CREATE TABLE IF NOT EXISTS demo_credentials (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             email TEXT NOT NULL UNIQUE,
@@ -106,10 +106,9 @@ def init_database():
             intern_note TEXT,
             FOREIGN KEY (assigned_intern_id) REFERENCES interns (id)
         )
-    ''')
-    
-    # Create notifications table
-    cursor.execute('''
+    ''',
+    # Notifications table
+    'notifications': '''
         CREATE TABLE IF NOT EXISTS notifications (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             recipient_type TEXT NOT NULL, -- 'admin' or 'intern'
@@ -122,24 +121,632 @@ def init_database():
             related_entity_type TEXT, -- 'customer', 'intern', 'demo', 'status_change', etc.
             related_entity_id INTEGER -- ID of the related entity
         )
-    ''')
+    ''',
+    # Per-inbox notification totals, maintained by the trg_notifications_counts_* triggers.
+    # recipient_key is recipient_id, or 0 for the admin inbox (recipient_id NULL)
+    'notification_counters': '''
+        CREATE TABLE IF NOT EXISTS notification_counters (
+            recipient_type TEXT NOT NULL,
+            recipient_key INTEGER NOT NULL,
+            unread INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (recipient_type, recipient_key)
+        ) WITHOUT ROWID
+    ''',
+    # Per-table change counters, bumped by the trg_*_version_* triggers
+    'table_versions': '''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''',
+    # Leader lease of the maintenance scheduler (scheduler.py); expires_at is unix time
+    'scheduler_leases': '''
+        CREATE TABLE IF NOT EXISTS scheduler_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''',
+    # Due time and last outcome of each scheduled job, shared by every worker
+    'scheduler_jobs': '''
+        CREATE TABLE IF NOT EXISTS scheduler_jobs (
+            name TEXT PRIMARY KEY,
+            next_run_at REAL,
+            last_started_at REAL,
+            last_duration_ms REAL,
+            last_rows INTEGER,
+            last_status TEXT, -- 'ok' or 'error'
+            last_error TEXT,
+            last_holder TEXT,
+            runs INTEGER NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0
+        )
+    ''',
+}
+
+# Tables whose every insert, update and delete bumps their table_versions row
+VERSIONED_TABLES = ('free_trial_requests', 'interns', 'demo_credentials', 'notifications')
+
+def init_database():
+    """Initialize the database with required tables, pending migrations and indexes"""
+    from migrate_database import run_migrations, LATEST_VERSION
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'")
+    is_new_database = cursor.fetchone()[0] == 0
+    
+    # Create tables if they don't exist (simple approach)
+    for statement in TABLE_SCHEMAS.values():
+        cursor.execute(statement)
+    cursor.executemany('INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)',
+                       [(table,) for table in VERSIONED_TABLES])
+    if is_new_database:
+        # Fresh databases already have the latest schema
+        cursor.execute(f'PRAGMA user_version = {LATEST_VERSION}')
+    conn.commit()
+    
+    # Bring databases created by older schemas up to date
+    run_migrations(conn)
+    
+    create_indexes(cursor)
+    create_triggers(cursor)
     
     conn.commit()
     conn.close()
 
-def get_db_connection():
-    """Get database connection with optimized settings"""
-    conn = sqlite3.connect(DB_PATH, timeout=30.0)  # 30 second timeout
-    conn.row_factory = sqlite3.Row  # This allows us to access columns by name
+# Secondary indexes for the hot lookup columns: (name, CREATE statement).
+# Indexes named idx_* that are no longer declared here are dropped on startup.
+INDEXES = [
+    # Intern assignment lookups and the newest-first list views
+    ('idx_ftr_assigned_intern_created', '''
+        CREATE INDEX IF NOT EXISTS idx_ftr_assigned_intern_created
+        ON free_trial_requests (assigned_intern_id, created_at DESC)
+    '''),
+    # Admin list sort keys, with id as the tie-breaker for keyset pagination
+    ('idx_ftr_created_id', '''
+        CREATE INDEX IF NOT EXISTS idx_ftr_created_id
+        ON free_trial_requests (created_at, id)
+    '''),
+    ('idx_ftr_company_id', '''
+        CREATE INDEX IF NOT EXISTS idx_ftr_company_id
+        ON free_trial_requests (company, id)
+    '''),
+    ('idx_interns_created_id', '''
+        CREATE INDEX IF NOT EXISTS idx_interns_created_id
+        ON interns (created_at, id)
+    '''),
+    ('idx_interns_name_id', '''
+        CREATE INDEX IF NOT EXISTS idx_interns_name_id
+        ON interns (name, id)
+    '''),
+    ('idx_demo_assigned_intern_created', '''
+        CREATE INDEX IF NOT EXISTS idx_demo_assigned_intern_created
+        ON demo_credentials (assigned_intern_id, created_at DESC)
+    '''),
+    ('idx_demo_created_id', '''
+        CREATE INDEX IF NOT EXISTS idx_demo_created_id
+        ON demo_credentials (created_at, id)
+    '''),
+    ('idx_demo_company_id', '''
+        CREATE INDEX IF NOT EXISTS idx_demo_company_id
+        ON demo_credentials (company, id)
+    '''),
+    # Expiry sweep only ever looks at active demos
+    ('idx_demo_active_expires', '''
+        CREATE INDEX IF NOT EXISTS idx_demo_active_expires
+        ON demo_credentials (expires_at) WHERE is_active = 1
+    '''),
+    # Notification inbox per recipient, paged and polled by id
+    ('idx_notifications_recipient_id', '''
+        CREATE INDEX IF NOT EXISTS idx_notifications_recipient_id
+        ON notifications (recipient_type, recipient_id, id)
+    '''),
+    # Unread-only inbox views skip read rows (the rowid makes this ordered by id too)
+    ('idx_notifications_unread', '''
+        CREATE INDEX IF NOT EXISTS idx_notifications_unread
+        ON notifications (recipient_type, recipient_id) WHERE read_status = 0
+    '''),
+]
+
+def create_indexes(cursor):
+    """Create the declared secondary indexes and drop retired ones (safe to run on every startup)"""
+    declared = {name for name, _ in INDEXES}
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx\\_%' ESCAPE '\\'")
+    for (name,) in cursor.fetchall():
+        if name not in declared:
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+    
+    for name, statement in INDEXES:
+        cursor.execute(statement)
+
+# Triggers keeping interns.assigned_count, completed_count and success_rate in
+# step with free_trial_requests and demo_credentials: (name, CREATE statement).
+# assigned_count counts assigned requests plus assigned demo accounts;
+# completed_count counts assigned requests whose status is 'completed'.
+TRIGGERS = [
+    ('trg_ftr_insert_intern_counts', '''
+        CREATE TRIGGER IF NOT EXISTS trg_ftr_insert_intern_counts
+        AFTER INSERT ON free_trial_requests
+        WHEN NEW.assigned_intern_id IS NOT NULL
+        BEGIN
+            UPDATE interns
+            SET assigned_count = assigned_count + 1,
+                completed_count = completed_count + (NEW.status IS 'completed')
+            WHERE id = NEW.assigned_intern_id;
+        END
+    '''),
+    ('trg_ftr_update_intern_counts', '''
+        CREATE TRIGGER IF NOT EXISTS trg_ftr_update_intern_counts
+        AFTER UPDATE OF assigned_intern_id, status ON free_trial_requests
+        WHEN OLD.assigned_intern_id IS NOT NEW.assigned_intern_id OR OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE interns
+            SET assigned_count = assigned_count - 1,
+                completed_count = completed_count - (OLD.status IS 'completed')
+            WHERE id = OLD.assigned_intern_id;
+            UPDATE interns
+            SET assigned_count = assigned_count + 1,
+                completed_count = completed_count + (NEW.status IS 'completed')
+            WHERE id = NEW.assigned_intern_id;
+        END
+    '''),
+    ('trg_ftr_delete_intern_counts', '''
+        CREATE TRIGGER IF NOT EXISTS trg_ftr_delete_intern_counts
+        AFTER DELETE ON free_trial_requests
+        WHEN OLD.assigned_intern_id IS NOT NULL
+        BEGIN
+            UPDATE interns
+            SET assigned_count = assigned_count - 1,
+                completed_count = completed_count - (OLD.status IS 'completed')
+            WHERE id = OLD.assigned_intern_id;
+        END
+    '''),
+    ('trg_demo_insert_intern_counts', '''
+        CREATE TRIGGER IF NOT EXISTS trg_demo_insert_intern_counts
+        AFTER INSERT ON demo_credentials
+        WHEN NEW.assigned_intern_id IS NOT NULL
+        BEGIN
+            UPDATE interns SET assigned_count = assigned_count + 1 WHERE id = NEW.assigned_intern_id;
+        END
+    '''),
+    ('trg_demo_update_intern_counts', '''
+        CREATE TRIGGER IF NOT EXISTS trg_demo_update_intern_counts
+        AFTER UPDATE OF assigned_intern_id ON demo_credentials
+        WHEN OLD.assigned_intern_id IS NOT NEW.assigned_intern_id
+        BEGIN
+            UPDATE interns SET assigned_count = assigned_count - 1 WHERE id = OLD.assigned_intern_id;
+            UPDATE interns SET assigned_count = assigned_count + 1 WHERE id = NEW.assigned_intern_id;
+        END
+    '''),
+    ('trg_demo_delete_intern_counts', '''
+        CREATE TRIGGER IF NOT EXISTS trg_demo_delete_intern_counts
+        AFTER DELETE ON demo_credentials
+        WHEN OLD.assigned_intern_id IS NOT NULL
+        BEGIN
+            UPDATE interns SET assigned_count = assigned_count - 1 WHERE id = OLD.assigned_intern_id;
+        END
+    '''),
+    # Success rate follows whenever either counter changes
+    ('trg_interns_success_rate', '''
+        CREATE TRIGGER IF NOT EXISTS trg_interns_success_rate
+        AFTER UPDATE OF assigned_count, completed_count ON interns
+        BEGIN
+            UPDATE interns
+            SET success_rate = CASE
+                    WHEN NEW.assigned_count > 0 THEN NEW.completed_count * 100.0 / NEW.assigned_count
+                    ELSE 0.0
+                END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = NEW.id;
+        END
+    '''),
+    # Unread and total notifications per inbox, so the unread badge reads one row.
+    # Bulk updates such as mark-all-read fire the update trigger once per changed row.
+    ('trg_notifications_counts_insert', '''
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_counts_insert
+        AFTER INSERT ON notifications
+        BEGIN
+            INSERT INTO notification_counters (recipient_type, recipient_key, unread, total)
+            VALUES (NEW.recipient_type, IFNULL(NEW.recipient_id, 0), NEW.read_status IS 0, 1)
+            ON CONFLICT (recipient_type, recipient_key) DO UPDATE
+            SET unread = unread + excluded.unread, total = total + 1;
+        END
+    '''),
+    ('trg_notifications_counts_update', '''
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_counts_update
+        AFTER UPDATE OF read_status, recipient_type, recipient_id ON notifications
+        WHEN OLD.read_status IS NOT NEW.read_status
+            OR OLD.recipient_type IS NOT NEW.recipient_type
+            OR OLD.recipient_id IS NOT NEW.recipient_id
+        BEGIN
+            UPDATE notification_counters
+            SET unread = unread - (OLD.read_status IS 0), total = total - 1
+            WHERE recipient_type = OLD.recipient_type AND recipient_key = IFNULL(OLD.recipient_id, 0);
+            INSERT INTO notification_counters (recipient_type, recipient_key, unread, total)
+            VALUES (NEW.recipient_type, IFNULL(NEW.recipient_id, 0), NEW.read_status IS 0, 1)
+            ON CONFLICT (recipient_type, recipient_key) DO UPDATE
+            SET unread = unread + excluded.unread, total = total + 1;
+        END
+    '''),
+    ('trg_notifications_counts_delete', '''
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_counts_delete
+        AFTER DELETE ON notifications
+        BEGIN
+            UPDATE notification_counters
+            SET unread = unread - (OLD.read_status IS 0), total = total - 1
+            WHERE recipient_type = OLD.recipient_type AND recipient_key = IFNULL(OLD.recipient_id, 0);
+        END
+    '''),
+] + [
+    # Change counters for conditional GETs and the notification stream
+    (f'trg_{table}_version_{event.lower()}', f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+        AFTER {event} ON {table}
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+        END
+    ''')
+    for table in VERSIONED_TABLES
+    for event in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+def create_triggers(cursor):
+    """Create the declared triggers, replacing changed definitions and dropping retired ones"""
+    declared = {name: ' '.join(statement.split()) for name, statement in TRIGGERS}
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg\\_%' ESCAPE '\\'")
+    for name, sql in cursor.fetchall():
+        current = ' '.join(sql.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS', 1).split())
+        if declared.get(name) != current:
+            cursor.execute(f'DROP TRIGGER IF EXISTS "{name}"')
+    
+    for name, statement in TRIGGERS:
+        cursor.execute(statement)
+
+def reconcile_intern_counters(cursor=None):
+    """Recompute every intern's assigned_count, completed_count and success_rate in one pass
+
+    Returns the number of interns whose stored counters were wrong.
+    """
+    def reconcile(cursor):
+        cursor.execute('''
+            SELECT i.id, i.assigned_count, i.completed_count, i.success_rate,
+                   COALESCE(c.assigned, 0) as assigned, COALESCE(c.completed, 0) as completed
+            FROM interns i
+            LEFT JOIN (
+                SELECT intern_id, SUM(assigned) as assigned, SUM(completed) as completed
+                FROM (
+                    SELECT assigned_intern_id as intern_id, 1 as assigned, status IS 'completed' as completed
+                    FROM free_trial_requests WHERE assigned_intern_id IS NOT NULL
+                    UNION ALL
+                    SELECT assigned_intern_id, 1, 0
+                    FROM demo_credentials WHERE assigned_intern_id IS NOT NULL
+                )
+                GROUP BY intern_id
+            ) c ON c.intern_id = i.id
+        ''')
+        repairs = []
+        for row in cursor.fetchall():
+            success_rate = row['completed'] * 100.0 / row['assigned'] if row['assigned'] > 0 else 0.0
+            stored = (row['assigned_count'], row['completed_count'], row['success_rate'])
+            if stored != (row['assigned'], row['completed'], success_rate):
+                repairs.append((row['assigned'], row['completed'], row['id']))
+        # The success rate trigger recomputes success_rate for each repaired row
+        cursor.executemany('''
+            UPDATE interns SET assigned_count = ?, completed_count = ? WHERE id = ?
+        ''', repairs)
+        return len(repairs)
+    
+    # Join the caller's transaction when one is passed in
+    if cursor is not None:
+        return reconcile(cursor)
+    
+    try:
+        return execute_write(reconcile)
+        
+    except Exception as e:
+        print(f"Database error in reconcile_intern_counters: {str(e)}")
+        raise Exception("Database error occurred while reconciling intern counters")
+
+def reconcile_notification_counters(cursor=None):
+    """Recompute every inbox's unread and total notification counts in one pass
+
+    Returns the number of inboxes whose stored counters were wrong.
+    """
+    def reconcile(cursor):
+        cursor.execute('''
+            SELECT recipient_type, recipient_key, SUM(unread) as unread, SUM(total) as total
+            FROM (
+                SELECT recipient_type, IFNULL(recipient_id, 0) as recipient_key,
+                       read_status IS 0 as unread, 1 as total
+                FROM notifications
+                UNION ALL
+                -- Inboxes whose notifications are all gone must count zero
+                SELECT recipient_type, recipient_key, 0, 0
+                FROM notification_counters
+            )
+            GROUP BY recipient_type, recipient_key
+        ''')
+        actual = cursor.fetchall()
+        cursor.execute('SELECT recipient_type, recipient_key, unread, total FROM notification_counters')
+        stored = {(row[0], row[1]): (row[2], row[3]) for row in cursor.fetchall()}
+        repairs = [
+            (row['recipient_type'], row['recipient_key'], row['unread'], row['total'])
+            for row in actual
+            if stored.get((row['recipient_type'], row['recipient_key'])) != (row['unread'], row['total'])
+        ]
+        cursor.executemany('''
+            INSERT OR REPLACE INTO notification_counters (recipient_type, recipient_key, unread, total)
+            VALUES (?, ?, ?, ?)
+        ''', repairs)
+        return len(repairs)
     
-    # Optimize for concurrency and performance
-    conn.execute('PRAGMA journal_mode=WAL')
-    conn.execute('PRAGMA synchronous=NORMAL')
-    conn.execute('PRAGMA cache_size=10000')
-    conn.execute('PRAGMA temp_store=memory')
-    conn.execute('PRAGMA busy_timeout=30000')  # 30 second busy timeout
+    # Join the caller's transaction when one is passed in
+    if cursor is not None:
+        return reconcile(cursor)
     
-    return conn
+    try:
+        return execute_write(reconcile)
+        
+    except Exception as e:
+        print(f"Database error in reconcile_notification_counters: {str(e)}")
+        raise Exception("Database error occurred while reconciling notification counters")
+
+def get_db_connection():
+    """Get a pooled database connection (request-scoped inside Flask)
+
+    Connections are opened once per pool slot with the concurrency PRAGMAs
+    applied, and calling close() returns them to the pool.
+    """
+    return db_pool.checkout(DB_PATH)
+
+# A demo account is active until it expires, whether or not the expiry sweep
+# has cleared is_active yet. expires_at is written by datetime.now() (server
+# local time, with microseconds), so it is compared with a local timestamp
+# that keeps the fraction of a second.
+DEMO_NOW_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+DEMO_LAPSED_SQL = f"is_active = 1 AND expires_at <= {DEMO_NOW_SQL}"
+
+def demo_active_sql(alias):
+    """SQL expression for whether a demo account is active right now"""
+    return f"({alias}.is_active = 1 AND {alias}.expires_at > {DEMO_NOW_SQL})"
+
+def get_table_versions(tables):
+    """Get the change counters of the given VERSIONED_TABLES as {table: version}
+
+    Whether a demo account is active also depends on the clock, so the
+    demo_credentials version is paired with the number of demos that have
+    expired but not been swept yet, which changes the moment one expires.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        query = f'''
+            SELECT table_name, version FROM table_versions
+            WHERE table_name IN ({', '.join('?' * len(tables))})
+        '''
+        if 'demo_credentials' in tables:
+            query += f'''
+            UNION ALL
+            SELECT 'demo_credentials:lapsed', COUNT(*) FROM demo_credentials WHERE {DEMO_LAPSED_SQL}
+        '''
+        cursor.execute(query, list(tables))
+        versions = dict(cursor.fetchall())
+        if 'demo_credentials:lapsed' in versions:
+            versions['demo_credentials'] = (versions.get('demo_credentials'), versions.pop('demo_credentials:lapsed'))
+        return versions
+    finally:
+        conn.close()
+
+# Rarely changing read models, revalidated against table_versions on every call
+read_cache = ReadCache(get_table_versions)
+
+def execute_write(operation):
+    """Run operation(cursor) in a write transaction and return its result
+
+    With DB_WRITE_QUEUE enabled the operation is handed to this process's
+    single writer thread and group-committed with other queued writes;
+    otherwise it runs on a pooled connection and commits immediately.
+    """
+    if write_queue.WRITE_QUEUE_ENABLED:
+        return write_queue.get_write_queue(DB_PATH).submit(operation)
+    
+    conn = get_db_connection()
+    try:
+        result = operation(conn.cursor())
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# Sortable columns of the admin list views. Every sort key has a (column, id)
+# index, so a page is a single index range scan however deep it is.
+PAGE_SORTS = {
+    'free_trial_requests': ('created_at', 'company'),
+    'interns': ('created_at', 'name'),
+    'demo_credentials': ('created_at', 'company'),
+}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_page_cursor(sort_value, row_id):
+    """Encode the sort key of the last row on a page as an opaque 'after' token"""
+    raw = json.dumps([sort_value, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_page_cursor(token):
+    """Decode an 'after' token into (sort_value, row_id), raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid pagination cursor')
+    # Only values SQLite can bind: a list, object or out-of-range integer would fail at query time
+    if isinstance(sort_value, bool) or not isinstance(sort_value, (str, int, float, type(None))):
+        raise ValueError('Invalid pagination cursor')
+    if isinstance(row_id, bool) or not isinstance(row_id, int):
+        raise ValueError('Invalid pagination cursor')
+    if any(isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63 for value in (sort_value, row_id)):
+        raise ValueError('Invalid pagination cursor')
+    return sort_value, row_id
+
+def fetch_page(cursor, table, select_sql, alias, limit=None, after=None, sort='created_at', order='desc'):
+    """Run a list query in stable (sort, id) order, optionally one keyset page at a time
+
+    select_sql is the SELECT ... FROM ... part of the query with the listed
+    table aliased as alias. Without a limit every row is returned and the
+    pagination info is None. With a limit, up to limit rows following the
+    'after' cursor are returned with the cursor of the next page and, on the
+    first page, the total row count. Rows are returned as LazyRow mappings.
+    """
+    if sort not in PAGE_SORTS[table] or order not in ('asc', 'desc'):
+        raise ValueError(f"Unsupported sort order for {table}: {sort} {order}")
+
+    direction = order.upper()
+    query = select_sql
+    params = []
+    if after is not None:
+        after_value, after_id = decode_page_cursor(after)
+        query += f" WHERE ({alias}.{sort}, {alias}.id) {'<' if order == 'desc' else '>'} (?, ?)"
+        params += [after_value, after_id]
+    query += f' ORDER BY {alias}.{sort} {direction}, {alias}.id {direction}'
+
+    if limit is None:
+        cursor.execute(query, params)
+        return decode_table_rows(table, cursor, cursor.fetchall()), None
+
+    # One extra row tells us whether another page follows
+    cursor.execute(query + ' LIMIT ?', params + [limit + 1])
+    rows = decode_table_rows(table, cursor, cursor.fetchall())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    pagination = {
+        'limit': limit,
+        'sort': sort,
+        'order': order,
+        'has_more': has_more,
+        'next_after': encode_page_cursor(rows[-1][sort], rows[-1]['id']) if has_more else None,
+    }
+    if after is None:
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        pagination['total'] = cursor.fetchone()[0]
+    return rows, pagination
+
+# How each admin list view reads its table: the alias used in list queries,
+# fields that come from a join, and fields only returned when a fields=
+# projection names them (credentials the list views never display).
+LIST_VIEWS = {
+    'free_trial_requests': {
+        'alias': 'ftr',
+        'join': 'LEFT JOIN interns i ON ftr.assigned_intern_id = i.id',
+        'joined_fields': {'intern_name': 'i.name'},
+        'hidden_fields': ('api_password', 'api_key'),
+        'computed_fields': {},
+    },
+    'interns': {
+        'alias': 'i',
+        'join': '',
+        'joined_fields': {},
+        'hidden_fields': (),
+        'computed_fields': {},
+    },
+    'demo_credentials': {
+        'alias': 'dc',
+        'join': 'LEFT JOIN interns i ON dc.assigned_intern_id = i.id',
+        'joined_fields': {'assigned_intern_name': 'i.name'},
+        'hidden_fields': (),
+        # Evaluated at read time so expired demos never show as active
+        'computed_fields': {'is_active': demo_active_sql('dc')},
+    },
+    # No admin list of its own, but exports project it the same way
+    'notifications': {
+        'alias': 'n',
+        'join': '',
+        'joined_fields': {},
+        'hidden_fields': (),
+        'computed_fields': {},
+    },
+}
+
+# TEXT columns that hold JSON documents, with the factory for the value used
+# when a column is empty or not valid JSON (None keeps the stored value)
+JSON_COLUMNS = {
+    'free_trial_requests': {
+        'selected_integrations': None,
+        'use_cases_list': None,
+        'integrations_list': None,
+        'ld_session_dates': None,
+        'project_info': None,
+    },
+    'interns': {
+        'integrations': None,
+    },
+    'demo_credentials': {
+        'selected_integrations': list,
+    },
+}
+
+def decode_table_rows(table, cursor, rows):
+    """Build result rows for a table whose JSON columns decode on first use"""
+    return decode_rows(cursor, rows, JSON_COLUMNS[table])
+
+_table_columns = {}
+
+def table_columns(table):
+    """Get the column names of a table as declared in TABLE_SCHEMAS"""
+    if table not in _table_columns:
+        mem = sqlite3.connect(':memory:')
+        try:
+            mem.execute(TABLE_SCHEMAS[table])
+            _table_columns[table] = [row[1] for row in mem.execute(f'PRAGMA table_info({table})')]
+        finally:
+            mem.close()
+    return _table_columns[table]
+
+def resolve_list_fields(table, fields=None, extra_fields=()):
+    """Validate a fields= projection for a list view and return the fields to load
+
+    Without a projection every field except the view's hidden fields is
+    returned. extra_fields are computed by the caller rather than selected.
+    Raises ValueError naming any unknown field.
+    """
+    view = LIST_VIEWS[table]
+    available = table_columns(table) + list(view['joined_fields']) + list(extra_fields)
+    if fields is None:
+        return [field for field in available if field not in view['hidden_fields']]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
+
+def list_select_sql(table, fields, sort='created_at'):
+    """Build the SELECT ... FROM part of a list query for the projected fields
+
+    id and the sort column are always selected so that pages can be keyed,
+    and the join is only added when a joined field was asked for.
+    """
+    view = LIST_VIEWS[table]
+    alias = view['alias']
+    columns = table_columns(table)
+    selected = [field for field in fields if field in columns]
+    selected += [field for field in ('id', sort) if field not in selected]
+
+    computed = view['computed_fields']
+    expressions = [f'{computed[field]} AS {field}' if field in computed else f'{alias}.{field}'
+                   for field in selected]
+    joined = [field for field in fields if field in view['joined_fields']]
+    expressions += [f"{view['joined_fields'][field]} AS {field}" for field in joined]
+
+    query = f"SELECT {', '.join(expressions)} FROM {table} {alias}"
+    if joined:
+        query += f" {view['join']}"
+    return query
 
 def create_free_trial_request(data):
     """Create a new free trial request"""
@@ -282,120 +889,99 @@ def update_intern_note(request_id, intern_note):
         conn.close()
 
 def get_all_free_trial_requests():
-    """Get all free trial requests"""
+    """Get all free trial requests (without API credentials, as in the admin list)"""
+    return list_free_trial_requests()[0]
+
+def list_free_trial_requests(limit=None, after=None, sort='created_at', order='desc', fields=None):
+    """Get free trial requests in a stable order, optionally one keyset page at a time
+
+    fields limits the columns selected and JSON-decoded (see resolve_list_fields).
+    Returns (requests, pagination); pagination is None without a limit.
+    """
+    fields = resolve_list_fields('free_trial_requests', fields)
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT ftr.*, i.name as intern_name
-        FROM free_trial_requests ftr
-        LEFT JOIN interns i ON ftr.assigned_intern_id = i.id
-        ORDER BY ftr.created_at DESC
-    ''')
+    try:
+        requests, pagination = fetch_page(cursor, 'free_trial_requests',
+                                          list_select_sql('free_trial_requests', fields, sort),
+                                          'ftr', limit, after, sort, order)
+    finally:
+        conn.close()
     
-    requests = cursor.fetchall()
-    conn.close()
+    return requests, pagination
+
+def get_free_trial_request(request_id):
+    """Get one free trial request with every column, including the API credentials"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
     
-    # Convert to dict and parse JSON fields
-    result = []
-    for request in requests:
-        request_dict = dict(request)
-        
-        # Parse JSON fields
-        try:
-            if request_dict.get('selected_integrations'):
-                request_dict['selected_integrations'] = json.loads(request_dict['selected_integrations'])
-            if request_dict.get('use_cases_list'):
-                request_dict['use_cases_list'] = json.loads(request_dict['use_cases_list'])
-            if request_dict.get('integrations_list'):
-                request_dict['integrations_list'] = json.loads(request_dict['integrations_list'])
-            if request_dict.get('ld_session_dates'):
-                request_dict['ld_session_dates'] = json.loads(request_dict['ld_session_dates'])
-            if request_dict.get('project_info'):
-                request_dict['project_info'] = json.loads(request_dict['project_info'])
-        except json.JSONDecodeError:
-            # If JSON parsing fails, keep as string
-            pass
-            
-        result.append(request_dict)
+    try:
+        cursor.execute('''
+            SELECT ftr.*, i.name as intern_name
+            FROM free_trial_requests ftr
+            LEFT JOIN interns i ON ftr.assigned_intern_id = i.id
+            WHERE ftr.id = ?
+        ''', (request_id,))
+        requests = decode_table_rows('free_trial_requests', cursor, cursor.fetchall())
+    finally:
+        conn.close()
     
-    return result
+    return requests[0] if requests else None
 
 def get_requests_for_intern(intern_id):
     """Get all requests assigned to a specific intern"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT * FROM free_trial_requests 
-        WHERE assigned_intern_id = ?
-        ORDER BY created_at DESC
-    ''', (intern_id,))
-    
-    requests = cursor.fetchall()
-    conn.close()
-    
-    # Convert to dict and parse JSON fields
-    result = []
-    for request in requests:
-        request_dict = dict(request)
+    try:
+        cursor.execute('''
+            SELECT * FROM free_trial_requests 
+            WHERE assigned_intern_id = ?
+            ORDER BY created_at DESC
+        ''', (intern_id,))
         
-        # Parse JSON fields
-        try:
-            if request_dict.get('selected_integrations'):
-                request_dict['selected_integrations'] = json.loads(request_dict['selected_integrations'])
-            if request_dict.get('use_cases_list'):
-                request_dict['use_cases_list'] = json.loads(request_dict['use_cases_list'])
-            if request_dict.get('integrations_list'):
-                request_dict['integrations_list'] = json.loads(request_dict['integrations_list'])
-            if request_dict.get('ld_session_dates'):
-                request_dict['ld_session_dates'] = json.loads(request_dict['ld_session_dates'])
-            if request_dict.get('project_info'):
-                request_dict['project_info'] = json.loads(request_dict['project_info'])
-        except json.JSONDecodeError:
-            # If JSON parsing fails, keep as string
-            pass
-            
-        result.append(request_dict)
+        requests = decode_table_rows('free_trial_requests', cursor, cursor.fetchall())
+    finally:
+        conn.close()
     
-    return result
+    return requests
 
 def get_all_interns():
     """Get all interns"""
+    return list_interns()[0]
+
+def list_interns(limit=None, after=None, sort='created_at', order='desc', fields=None):
+    """Get interns in a stable order, optionally one keyset page at a time
+
+    fields limits the columns selected and JSON-decoded (see resolve_list_fields).
+    Returns (interns, pagination); pagination is None without a limit.
+    """
+    fields = resolve_list_fields('interns', fields)
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT * FROM interns ORDER BY created_at DESC')
-    
-    interns = cursor.fetchall()
-    conn.close()
-    
-    # Convert to dict and parse JSON fields
-    result = []
-    for intern in interns:
-        intern_dict = dict(intern)
-        
-        # Parse JSON fields
-        try:
-            if intern_dict.get('integrations'):
-                intern_dict['integrations'] = json.loads(intern_dict['integrations'])
-        except json.JSONDecodeError:
-            # If JSON parsing fails, keep as string
-            pass
-            
-        result.append(intern_dict)
+    try:
+        interns, pagination = fetch_page(cursor, 'interns', list_select_sql('interns', fields, sort), 'i',
+                                         limit, after, sort, order)
+    finally:
+        conn.close()
     
-    return result
+    return interns, pagination
 
 def get_intern_by_credentials(username, password):
     """Get intern by username and password for login"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT * FROM interns WHERE username = ? AND password = ?', (username, password))
-    
-    intern = cursor.fetchone()
-    conn.close()
+    try:
+        cursor.execute('SELECT * FROM interns WHERE username = ? AND password = ?', (username, password))
+        
+        intern = cursor.fetchone()
+    finally:
+        conn.close()
     
     return dict(intern) if intern else None
 
@@ -404,29 +990,31 @@ def get_intern_customer_companies(intern_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Get companies from customer requests
-    cursor.execute('''
-        SELECT DISTINCT company 
-        FROM free_trial_requests 
-        WHERE assigned_intern_id = ?
-        ORDER BY company
-    ''', (intern_id,))
-    
-    customer_companies = cursor.fetchall()
-    
-    # Get companies from demo accounts
-    cursor.execute('''
-        SELECT DISTINCT company 
-        FROM demo_credentials 
-        WHERE assigned_intern_id = ?
-        ORDER BY company
-    ''', (intern_id,))
-    
-    demo_companies = cursor.fetchall()
-    
-    # Combine and return unique companies
-    all_companies = [company[0] for company in customer_companies + demo_companies]
-    conn.close()
+    try:
+        # Get companies from customer requests
+        cursor.execute('''
+            SELECT DISTINCT company 
+            FROM free_trial_requests 
+            WHERE assigned_intern_id = ?
+            ORDER BY company
+        ''', (intern_id,))
+        
+        customer_companies = cursor.fetchall()
+        
+        # Get companies from demo accounts
+        cursor.execute('''
+            SELECT DISTINCT company 
+            FROM demo_credentials 
+            WHERE assigned_intern_id = ?
+            ORDER BY company
+        ''', (intern_id,))
+        
+        demo_companies = cursor.fetchall()
+        
+        # Combine and return unique companies
+        all_companies = [company[0] for company in customer_companies + demo_companies]
+    finally:
+        conn.close()
     
     return list(set(all_companies))  # Remove duplicates
 
@@ -435,30 +1023,18 @@ def get_intern_customer_requests(intern_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT * FROM free_trial_requests 
-        WHERE assigned_intern_id = ?
-        ORDER BY created_at DESC
-    ''', (intern_id,))
-    
-    requests = cursor.fetchall()
-    conn.close()
-    
-    # Convert to dict and parse JSON fields
-    result = []
-    for request in requests:
-        request_dict = dict(request)
+    try:
+        cursor.execute('''
+            SELECT * FROM free_trial_requests 
+            WHERE assigned_intern_id = ?
+            ORDER BY created_at DESC
+        ''', (intern_id,))
         
-        # Parse JSON fields
-        try:
-            if request_dict.get('selected_integrations'):
-                request_dict['selected_integrations'] = json.loads(request_dict['selected_integrations'])
-        except json.JSONDecodeError:
-            request_dict['selected_integrations'] = []
-            
-        result.append(request_dict)
+        requests = decode_table_rows('free_trial_requests', cursor, cursor.fetchall())
+    finally:
+        conn.close()
     
-    return result
+    return requests
 
 
 
@@ -467,222 +1043,203 @@ def get_intern_assigned_count(intern_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Count customer requests
-    cursor.execute('''
-        SELECT COUNT(*) FROM free_trial_requests 
-        WHERE assigned_intern_id = ?
-    ''', (intern_id,))
-    
-    customer_count = cursor.fetchone()[0]
-    
-    # Count demo accounts
-    cursor.execute('''
-        SELECT COUNT(*) FROM demo_credentials 
-        WHERE assigned_intern_id = ?
-    ''', (intern_id,))
-    
-    demo_count = cursor.fetchone()[0]
-    
-    conn.close()
+    try:
+        # Maintained by the intern counter triggers
+        cursor.execute('SELECT assigned_count FROM interns WHERE id = ?', (intern_id,))
+        result = cursor.fetchone()
+    finally:
+        conn.close()
     
-    return customer_count + demo_count
+    return result[0] if result else 0
 
-def create_intern_record(data):
-    """Create a new intern"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Prepare integrations data
-    integrations = None
-    if data.get('integrations'):
-        integrations = json.dumps(data.get('integrations'))
-    
-    cursor.execute('''
-        INSERT INTO interns (name, username, password, email, phone, whatsapp, specialization, integrations, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        data.get('name'),
-        data.get('username'),
-        data.get('password'),
-        data.get('email'),
-        data.get('phone', ''),
-        data.get('whatsapp', ''),
-        data.get('specialization'),
-        integrations,
-        data.get('status', 'active')
-    ))
-    
-    intern_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    
-    return intern_id
+def get_interns_with_assignments():
+    """Get all interns with their customer companies, customer requests and demo accounts"""
+    return list_interns_with_assignments()[0]
+
+# Intern list fields computed from the interns' assigned requests and demos
+INTERN_ASSIGNMENT_FIELDS = ('customer_companies', 'customer_requests', 'demo_accounts')
+
+@read_cache.cached('interns', 'free_trial_requests', 'demo_credentials', copy=copy_page)
+def list_interns_with_assignments(limit=None, after=None, sort='created_at', order='desc', fields=None):
+    """Get interns with their customer companies, customer requests and demo accounts
+
+    Runs a fixed number of queries regardless of how many interns exist and
+    groups the assigned rows in Python by assigned_intern_id. With a limit
+    only the assignments of the interns on the requested page are loaded,
+    and a fields projection without any INTERN_ASSIGNMENT_FIELDS skips them.
+    Results are cached per page and fields until any of the three tables
+    changes (or a demo expires). Returns (interns, pagination); pagination
+    is None without a limit.
+    """
+    fields = resolve_list_fields('interns', fields, INTERN_ASSIGNMENT_FIELDS)
+    interns, pagination = list_interns(limit, after, sort, order,
+                                       [field for field in fields if field not in INTERN_ASSIGNMENT_FIELDS])
+    if not any(field in fields for field in INTERN_ASSIGNMENT_FIELDS):
+        return interns, pagination
+
+    if pagination is None:
+        assigned_filter, params = 'IS NOT NULL', []
+    else:
+        params = [intern['id'] for intern in interns]
+        assigned_filter = f"IN ({', '.join('?' * len(params))})"
 
-def update_intern_credentials(intern_id, username, password):
-    """Update intern credentials in database"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    
+
     try:
-        cursor.execute('''
-            UPDATE interns 
-            SET username = ?, password = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (username, password, intern_id))
-        
-        conn.commit()
-        
+        hidden = LIST_VIEWS['free_trial_requests']['hidden_fields']
+        request_columns = [column for column in table_columns('free_trial_requests') if column not in hidden]
+        cursor.execute(f'''
+            SELECT {', '.join(request_columns)}
+            FROM free_trial_requests
+            WHERE assigned_intern_id {assigned_filter}
+            ORDER BY created_at DESC
+        ''', params)
+        requests = decode_table_rows('free_trial_requests', cursor, cursor.fetchall())
+
+        cursor.execute(f'''
+            SELECT dc.id, dc.email, dc.username, dc.password, dc.first_name, dc.last_name,
+                   dc.company, dc.phone, dc.industry_domain, dc.selected_integrations,
+                   dc.created_at, dc.expires_at, {demo_active_sql('dc')} AS is_active, dc.assigned_intern_id,
+                   dc.admin_note, dc.intern_note, i.name as assigned_intern_name
+            FROM demo_credentials dc
+            LEFT JOIN interns i ON dc.assigned_intern_id = i.id
+            WHERE dc.assigned_intern_id {assigned_filter}
+            ORDER BY dc.created_at DESC
+        ''', params)
+        demos = decode_table_rows('demo_credentials', cursor, cursor.fetchall())
+
     except Exception as e:
-        conn.rollback()
-        print(f"Database error in update_intern_credentials: {str(e)}")
-        raise Exception("Database error occurred while updating intern credentials")
+        print(f"Database error in list_interns_with_assignments: {str(e)}")
+        raise Exception("Database error occurred while fetching intern assignments")
     finally:
         conn.close()
 
-def assign_intern_to_request(request_id, intern_id):
-    """Assign an intern to a free trial request (handles reassignment)"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    requests_by_intern = {}
+    for request in requests:
+        requests_by_intern.setdefault(request['assigned_intern_id'], []).append(request)
+
+    demos_by_intern = {}
+    for account in demos:
+        demos_by_intern.setdefault(account['assigned_intern_id'], []).append(account)
+
+    for intern in interns:
+        intern_requests = requests_by_intern.get(intern['id'], [])
+        intern_demos = demos_by_intern.get(intern['id'], [])
+
+        if 'customer_companies' in fields:
+            intern['customer_companies'] = sorted({item['company'] for item in intern_requests + intern_demos})
+        if 'customer_requests' in fields:
+            intern['customer_requests'] = intern_requests
+        if 'demo_accounts' in fields:
+            intern['demo_accounts'] = intern_demos
+
+    return interns, pagination
+
+def create_intern_record(data):
+    """Create a new intern"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
     try:
-        # First, get the current assignment to handle reassignment
-        cursor.execute('''
-            SELECT assigned_intern_id FROM free_trial_requests WHERE id = ?
-        ''', (request_id,))
-        result = cursor.fetchone()
-        current_intern_id = result[0] if result else None
-        
-        # If there's a current intern assigned, decrease their count
-        if current_intern_id:
-            cursor.execute('''
-                UPDATE interns 
-                SET assigned_count = assigned_count - 1, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (current_intern_id,))
+        # Prepare integrations data
+        integrations = None
+        if data.get('integrations'):
+            integrations = json.dumps(data.get('integrations'))
         
-        # Update the request assignment
-        if intern_id and intern_id != "":  # Check for empty string too
-            # Assign new intern
-            cursor.execute('''
-                UPDATE free_trial_requests 
-                SET assigned_intern_id = ?, status = 'assigned', updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (intern_id, request_id))
-            
-            # Update new intern's assigned count
-            cursor.execute('''
-                UPDATE interns 
-                SET assigned_count = assigned_count + 1, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (intern_id,))
-        else:
-            # Unassign (set to null)
-            cursor.execute('''
-                UPDATE free_trial_requests 
-                SET assigned_intern_id = NULL, status = 'pending', updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (request_id,))
+        cursor.execute('''
+            INSERT INTO interns (name, username, password, email, phone, whatsapp, specialization, integrations, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            data.get('name'),
+            data.get('username'),
+            data.get('password'),
+            data.get('email'),
+            data.get('phone', ''),
+            data.get('whatsapp', ''),
+            data.get('specialization'),
+            integrations,
+            data.get('status', 'active')
+        ))
         
+        intern_id = cursor.lastrowid
         conn.commit()
-        
-    except Exception as e:
+    except Exception:
         conn.rollback()
-        print(f"Database error in assign_intern_to_request: {str(e)}")
-        raise Exception("Database error occurred while assigning intern")
+        raise
     finally:
         conn.close()
+    
+    return intern_id
 
-def update_intern_success_rate(intern_id):
-    """Update intern success rate based on completed vs assigned count"""
+def update_intern_credentials(intern_id, username, password):
+    """Update intern credentials in database"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute('''
-            SELECT assigned_count, completed_count FROM interns WHERE id = ?
-        ''', (intern_id,))
+            UPDATE interns 
+            SET username = ?, password = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (username, password, intern_id))
+        
+        conn.commit()
         
-        result = cursor.fetchone()
-        if result:
-            assigned_count, completed_count = result
-            success_rate = (completed_count / assigned_count * 100) if assigned_count > 0 else 0.0
-            
-            cursor.execute('''
-                UPDATE interns 
-                SET success_rate = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (success_rate, intern_id))
-            
-            conn.commit()
-            
     except Exception as e:
         conn.rollback()
-        print(f"Database error in update_intern_success_rate: {str(e)}")
-        raise Exception("Database error occurred while updating success rate")
+        print(f"Database error in update_intern_credentials: {str(e)}")
+        raise Exception("Database error occurred while updating intern credentials")
     finally:
         conn.close()
 
-def update_request_status(request_id, status):
-    """Update the status of a free trial request and update intern stats if completed"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Get current status and assigned intern
+def assign_request_in_transaction(cursor, request_id, intern_id):
+    """Assign (or unassign) an intern on a free trial request within the caller's transaction"""
+    # Intern counters follow the assignment through the trg_ftr_* triggers
+    if intern_id and intern_id != "":  # Check for empty string too
+        # Assign new intern
+        cursor.execute('''
+            UPDATE free_trial_requests 
+            SET assigned_intern_id = ?, status = 'assigned', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (intern_id, request_id))
+    else:
+        # Unassign (set to null)
         cursor.execute('''
-            SELECT status, assigned_intern_id FROM free_trial_requests WHERE id = ?
+            UPDATE free_trial_requests 
+            SET assigned_intern_id = NULL, status = 'pending', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
         ''', (request_id,))
-        result = cursor.fetchone()
-        
-        if result:
-            old_status, intern_id = result
-            
-            # Update request status
-            cursor.execute('''
-                UPDATE free_trial_requests 
-                SET status = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (status, request_id))
-            
-            # If status changed to completed and intern is assigned
-            if status == 'completed' and old_status != 'completed' and intern_id:
-                cursor.execute('''
-                    UPDATE interns 
-                    SET completed_count = completed_count + 1, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (intern_id,))
-                
-                conn.commit()
-                # Update success rate after committing the count change
-                conn.close()
-                update_intern_success_rate(intern_id)
-                return
-            
-            # If status changed from completed to something else
-            elif old_status == 'completed' and status != 'completed' and intern_id:
-                cursor.execute('''
-                    UPDATE interns 
-                    SET completed_count = CASE 
-                        WHEN completed_count > 0 THEN completed_count - 1 
-                        ELSE 0 
-                    END, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (intern_id,))
-                
-                conn.commit()
-                # Update success rate after committing the count change
-                conn.close()
-                update_intern_success_rate(intern_id)
-                return
+
+def assign_intern_to_request(request_id, intern_id):
+    """Assign an intern to a free trial request (handles reassignment)"""
+    try:
+        execute_write(lambda cursor: assign_request_in_transaction(cursor, request_id, intern_id))
         
-        conn.commit()
+    except Exception as e:
+        print(f"Database error in assign_intern_to_request: {str(e)}")
+        raise Exception("Database error occurred while assigning intern")
+
+def update_request_status_in_transaction(cursor, request_id, status):
+    """Update a free trial request's status within the caller's transaction
+
+    The assigned intern's completed_count and success_rate follow through the
+    trg_ftr_update_intern_counts trigger.
+    """
+    cursor.execute('''
+        UPDATE free_trial_requests 
+        SET status = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (status, request_id))
+
+def update_request_status(request_id, status):
+    """Update the status of a free trial request and update intern stats if completed"""
+    try:
+        execute_write(lambda cursor: update_request_status_in_transaction(cursor, request_id, status))
         
     except Exception as e:
-        conn.rollback()
         print(f"Database error in update_request_status: {str(e)}")
         raise Exception("Database error occurred while updating request status")
-    finally:
-        conn.close()
 
 def create_demo_credentials(data):
     """Create demo credentials with 10-day expiry"""
@@ -751,37 +1308,43 @@ def create_demo_credentials(data):
     finally:
         conn.close()
 
+@read_cache.cached('free_trial_requests')
 def get_companies_assigned_to_interns():
     """Get list of company names that are assigned to any intern"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT DISTINCT company 
-        FROM free_trial_requests 
-        WHERE assigned_intern_id IS NOT NULL
-        ORDER BY company
-    ''')
-    
-    companies = cursor.fetchall()
-    conn.close()
+    try:
+        cursor.execute('''
+            SELECT DISTINCT company 
+            FROM free_trial_requests 
+            WHERE assigned_intern_id IS NOT NULL
+            ORDER BY company
+        ''')
+        
+        companies = cursor.fetchall()
+    finally:
+        conn.close()
     
     return [company[0] for company in companies]
 
+@read_cache.cached('free_trial_requests', 'demo_credentials')
 def get_all_companies():
     """Get all company names from free trial requests and demo credentials"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT DISTINCT company FROM free_trial_requests
-        UNION
-        SELECT DISTINCT company FROM demo_credentials
-        ORDER BY company
-    ''')
-    
-    companies = cursor.fetchall()
-    conn.close()
+    try:
+        cursor.execute('''
+            SELECT DISTINCT company FROM free_trial_requests
+            UNION
+            SELECT DISTINCT company FROM demo_credentials
+            ORDER BY company
+        ''')
+        
+        companies = cursor.fetchall()
+    finally:
+        conn.close()
     
     return [company[0] for company in companies]
 
@@ -808,7 +1371,7 @@ def update_dashboard_counts(request_id, dashboards_requested, dashboards_deliver
 
 def delete_customer_record(customer_id):
     """Delete a customer record"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db_connection()
     try:
         cursor = conn.cursor()
         cursor.execute('DELETE FROM free_trial_requests WHERE id = ?', (customer_id,))
@@ -827,7 +1390,7 @@ def delete_customer_record(customer_id):
 
 def delete_intern_record(intern_id):
     """Delete an intern record"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db_connection()
     try:
         cursor = conn.cursor()
         
@@ -855,7 +1418,7 @@ def delete_intern_record(intern_id):
 
 def update_customer_basic_info(customer_id, customer_data):
     """Update basic customer information"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db_connection()
     try:
         cursor = conn.cursor()
         
@@ -895,7 +1458,7 @@ def update_customer_basic_info(customer_id, customer_data):
 
 def update_intern_basic_info(intern_id, intern_data):
     """Update basic intern information"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db_connection()
     try:
         cursor = conn.cursor()
         
@@ -928,44 +1491,34 @@ def update_intern_basic_info(intern_id, intern_data):
 
 def get_all_demo_accounts():
     """Get all demo accounts"""
+    return list_demo_accounts()[0]
+
+def list_demo_accounts(limit=None, after=None, sort='created_at', order='desc', fields=None):
+    """Get demo accounts in a stable order, optionally one keyset page at a time
+
+    fields limits the columns selected and JSON-decoded (see resolve_list_fields).
+    Returns (demo_accounts, pagination); pagination is None without a limit.
+    """
+    fields = resolve_list_fields('demo_credentials', fields)
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute('''
-            SELECT dc.id, dc.email, dc.username, dc.password, dc.first_name, dc.last_name, 
-                   dc.company, dc.phone, dc.industry_domain, dc.selected_integrations, 
-                   dc.created_at, dc.expires_at, dc.is_active, dc.assigned_intern_id,
-                   dc.admin_note, dc.intern_note, i.name as assigned_intern_name
-            FROM demo_credentials dc
-            LEFT JOIN interns i ON dc.assigned_intern_id = i.id
-            ORDER BY dc.created_at DESC
-        ''')
-        
-        demo_accounts = []
-        for row in cursor.fetchall():
-            account = dict(row)
-            # Parse integrations JSON
-            if account['selected_integrations']:
-                try:
-                    account['selected_integrations'] = json.loads(account['selected_integrations'])
-                except:
-                    account['selected_integrations'] = []
-            else:
-                account['selected_integrations'] = []
-            demo_accounts.append(account)
-        
-        return demo_accounts
+        rows, pagination = fetch_page(cursor, 'demo_credentials',
+                                      list_select_sql('demo_credentials', fields, sort),
+                                      'dc', limit, after, sort, order)
+        return rows, pagination
         
     except Exception as e:
-        print(f"Database error in get_all_demo_accounts: {str(e)}")
+        print(f"Database error in list_demo_accounts: {str(e)}")
         raise Exception("Database error occurred while fetching demo accounts")
     finally:
         conn.close()
 
 def delete_demo_account(demo_id):
     """Delete a demo account"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db_connection()
     try:
         cursor = conn.cursor()
         cursor.execute('DELETE FROM demo_credentials WHERE id = ?', (demo_id,))
@@ -984,7 +1537,7 @@ def delete_demo_account(demo_id):
 
 def update_demo_account(demo_id, demo_data):
     """Update demo account information"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db_connection()
     try:
         cursor = conn.cursor()
         
@@ -1027,7 +1580,7 @@ def regenerate_demo_credentials(demo_id):
     import string
     from datetime import datetime, timedelta
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db_connection()
     try:
         cursor = conn.cursor()
         
@@ -1069,78 +1622,111 @@ def regenerate_demo_credentials(demo_id):
     finally:
         conn.close()
 
+def assign_demo_in_transaction(cursor, demo_id, intern_id):
+    """Assign (or unassign) an intern on a demo account within the caller's transaction"""
+    # Allow None to unassign intern
+    cursor.execute('''
+        UPDATE demo_credentials 
+        SET assigned_intern_id = ?
+        WHERE id = ?
+    ''', (intern_id, demo_id))
+    
+    if cursor.rowcount == 0:
+        raise Exception("Demo account not found")
+
 def assign_intern_to_demo(demo_id, intern_id):
     """Assign an intern to a demo account"""
-    conn = sqlite3.connect(DB_PATH)
     try:
-        cursor = conn.cursor()
-        
-        # Allow None to unassign intern
-        cursor.execute('''
-            UPDATE demo_credentials 
-            SET assigned_intern_id = ?
-            WHERE id = ?
-        ''', (intern_id, demo_id))
-        
-        if cursor.rowcount == 0:
-            raise Exception("Demo account not found")
-        
-        conn.commit()
+        execute_write(lambda cursor: assign_demo_in_transaction(cursor, demo_id, intern_id))
         
     except Exception as e:
-        conn.rollback()
         print(f"Database error in assign_intern_to_demo: {str(e)}")
         raise Exception("Database error occurred while assigning intern to demo")
-    finally:
-        conn.close()
+
+def update_demo_admin_note_in_transaction(cursor, demo_id, admin_note):
+    """Update a demo account's admin note within the caller's transaction"""
+    cursor.execute('''
+        UPDATE demo_credentials 
+        SET admin_note = ?
+        WHERE id = ?
+    ''', (admin_note, demo_id))
+    
+    if cursor.rowcount == 0:
+        raise Exception("Demo account not found")
 
 def update_demo_admin_note(demo_id, admin_note):
     """Update admin note for a demo account"""
-    conn = sqlite3.connect(DB_PATH)
     try:
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE demo_credentials 
-            SET admin_note = ?
-            WHERE id = ?
-        ''', (admin_note, demo_id))
-        
-        if cursor.rowcount == 0:
-            raise Exception("Demo account not found")
-        
-        conn.commit()
+        execute_write(lambda cursor: update_demo_admin_note_in_transaction(cursor, demo_id, admin_note))
         
     except Exception as e:
-        conn.rollback()
         print(f"Database error in update_demo_admin_note: {str(e)}")
         raise Exception("Database error occurred while updating demo admin note")
-    finally:
-        conn.close()
+
+def update_demo_intern_note_in_transaction(cursor, demo_id, intern_note):
+    """Update a demo account's intern note within the caller's transaction"""
+    cursor.execute('''
+        UPDATE demo_credentials 
+        SET intern_note = ?
+        WHERE id = ?
+    ''', (intern_note, demo_id))
+    
+    if cursor.rowcount == 0:
+        raise Exception("Demo account not found")
 
 def update_demo_intern_note(demo_id, intern_note):
     """Update intern note for a demo account"""
-    conn = sqlite3.connect(DB_PATH)
     try:
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE demo_credentials 
-            SET intern_note = ?
-            WHERE id = ?
-        ''', (intern_note, demo_id))
-        
-        if cursor.rowcount == 0:
-            raise Exception("Demo account not found")
-        
-        conn.commit()
+        execute_write(lambda cursor: update_demo_intern_note_in_transaction(cursor, demo_id, intern_note))
         
     except Exception as e:
-        conn.rollback()
         print(f"Database error in update_demo_intern_note: {str(e)}")
         raise Exception("Database error occurred while updating demo intern note")
-    finally:
-        conn.close()
+
+# Rows cleared per write transaction when the expiry sweep runs on a time budget
+DEMO_EXPIRY_BATCH = 500
+
+def expire_demo_accounts(max_seconds=None):
+    """Clear is_active on demo accounts that have expired since the last sweep and return how many
+
+    Reads already treat expired demos as inactive; this only keeps the
+    stored flag compact. It walks idx_demo_active_expires, so it touches
+    the lapsed rows and nothing else. With max_seconds the rows are cleared
+    DEMO_EXPIRY_BATCH at a time and the sweep stops once the time is up;
+    the next sweep picks up the rest.
+    """
+    def expire(cursor):
+        cursor.execute(f'''
+            UPDATE demo_credentials 
+            SET is_active = 0 
+            WHERE {DEMO_LAPSED_SQL}
+        ''')
+        return cursor.rowcount
+    
+    def expire_batch(cursor):
+        cursor.execute(f'''
+            UPDATE demo_credentials 
+            SET is_active = 0 
+            WHERE id IN (SELECT id FROM demo_credentials WHERE {DEMO_LAPSED_SQL} LIMIT ?)
+        ''', (DEMO_EXPIRY_BATCH,))
+        return cursor.rowcount
+    
+    try:
+        if max_seconds is None:
+            return execute_write(expire)
+        
+        deadline = time.monotonic() + max_seconds
+        expired = 0
+        while time.monotonic() < deadline:
+            count = execute_write(expire_batch)
+            expired += count
+            if count < DEMO_EXPIRY_BATCH:
+                break
+        return expired
+        
+    except Exception as e:
+        print(f"Database error in expire_demo_accounts: {str(e)}")
+        raise Exception("Database error occurred while expiring demo accounts")
 
 def get_demo_accounts_for_intern(intern_id):
     """Get demo accounts assigned to a specific intern"""
@@ -1148,10 +1734,10 @@ def get_demo_accounts_for_intern(intern_id):
     cursor = conn.cursor()
     
     try:
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT dc.id, dc.email, dc.username, dc.password, dc.first_name, dc.last_name, 
                    dc.company, dc.phone, dc.industry_domain, dc.selected_integrations, 
-                   dc.created_at, dc.expires_at, dc.is_active, dc.assigned_intern_id,
+                   dc.created_at, dc.expires_at, {demo_active_sql('dc')} AS is_active, dc.assigned_intern_id,
                    dc.admin_note, dc.intern_note, i.name as assigned_intern_name
             FROM demo_credentials dc
             LEFT JOIN interns i ON dc.assigned_intern_id = i.id
@@ -1159,20 +1745,7 @@ def get_demo_accounts_for_intern(intern_id):
             ORDER BY dc.created_at DESC
         ''', (intern_id,))
         
-        demo_accounts = []
-        for row in cursor.fetchall():
-            account = dict(row)
-            # Parse integrations JSON
-            if account['selected_integrations']:
-                try:
-                    account['selected_integrations'] = json.loads(account['selected_integrations'])
-                except:
-                    account['selected_integrations'] = []
-            else:
-                account['selected_integrations'] = []
-            demo_accounts.append(account)
-        
-        return demo_accounts
+        return decode_table_rows('demo_credentials', cursor, cursor.fetchall())
         
     except Exception as e:
         print(f"Database error in get_demo_accounts_for_intern: {str(e)}")
@@ -1180,67 +1753,445 @@ def get_demo_accounts_for_intern(intern_id):
     finally:
         conn.close()
 
+def add_notification(cursor, recipient_type, recipient_id, title, message, notification_type='info', related_entity_type=None, related_entity_id=None):
+    """Insert a notification within the caller's transaction and return its id"""
+    cursor.execute('''
+        INSERT INTO notifications (
+            recipient_type, recipient_id, title, message, type, 
+            related_entity_type, related_entity_id
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        recipient_type, recipient_id, title, message, notification_type,
+        related_entity_type, related_entity_id
+    ))
+    return cursor.lastrowid
+
 def create_notification(recipient_type, recipient_id, title, message, notification_type='info', related_entity_type=None, related_entity_id=None):
     """Create a new notification"""
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO notifications (
-                recipient_type, recipient_id, title, message, type, 
-                related_entity_type, related_entity_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            recipient_type, recipient_id, title, message, notification_type,
+        return execute_write(lambda cursor: add_notification(
+            cursor, recipient_type, recipient_id, title, message, notification_type,
             related_entity_type, related_entity_id
         ))
         
-        notification_id = cursor.lastrowid
-        conn.commit()
-        
-        return notification_id
-        
     except Exception as e:
-        conn.rollback()
         print(f"Database error in create_notification: {str(e)}")
         raise Exception("Database error occurred while creating notification")
-    finally:
-        conn.close()
 
-def get_notifications(recipient_type, recipient_id=None, limit=50, unread_only=False):
-    """Get notifications for a recipient"""
-    conn = get_db_connection()
+# Units of work: a mutation, the reads its notifications need and the
+# notification inserts themselves all commit in a single transaction.
+
+def assign_intern_to_request_with_notifications(request_id, intern_id):
+    """Assign (or unassign) an intern on a request and notify admin and intern in one transaction"""
+    def assign(cursor):
+        assign_request_in_transaction(cursor, request_id, intern_id)
+        
+        cursor.execute('''
+            SELECT ftr.first_name, ftr.last_name, ftr.company, i.name as intern_name
+            FROM free_trial_requests ftr
+            LEFT JOIN interns i ON i.id = ?
+            WHERE ftr.id = ?
+        ''', (intern_id, request_id))
+        customer = cursor.fetchone()
+        
+        if intern_id and customer:
+            if customer['intern_name']:
+                # Notify admin
+                add_notification(
+                    cursor, 'admin', None,
+                    'Intern Assigned',
+                    f'{customer["intern_name"]} has been assigned to {customer["first_name"]} {customer["last_name"]} from {customer["company"]}',
+                    'success', 'assignment', request_id
+                )
+                
+                # Notify intern
+                add_notification(
+                    cursor, 'intern', intern_id,
+                    'New Assignment',
+                    f'You have been assigned to {customer["first_name"]} {customer["last_name"]} from {customer["company"]}',
+                    'info', 'assignment', request_id
+                )
+        elif customer:
+            # Unassignment notification
+            add_notification(
+                cursor, 'admin', None,
+                'Intern Unassigned',
+                f'Intern has been unassigned from {customer["first_name"]} {customer["last_name"]} from {customer["company"]}',
+                'warning', 'unassignment', request_id
+            )
+    
     try:
-        cursor = conn.cursor()
+        execute_write(assign)
         
-        query = '''
-            SELECT id, recipient_type, recipient_id, title, message, type, 
-                   read_status, created_at, related_entity_type, related_entity_id
-            FROM notifications 
-            WHERE recipient_type = ?
-        '''
-        params = [recipient_type]
+    except Exception as e:
+        print(f"Database error in assign_intern_to_request_with_notifications: {str(e)}")
+        raise Exception("Database error occurred while assigning intern")
+
+def update_request_status_with_notifications(request_id, status):
+    """Update a request's status and notify admin and the assigned intern in one transaction"""
+    def update(cursor):
+        update_request_status_in_transaction(cursor, request_id, status)
         
-        if recipient_id is not None:
-            query += ' AND recipient_id = ?'
-            params.append(recipient_id)
-        else:
-            query += ' AND recipient_id IS NULL'
+        cursor.execute('''
+            SELECT first_name, last_name, company, assigned_intern_id 
+            FROM free_trial_requests WHERE id = ?
+        ''', (request_id,))
+        customer = cursor.fetchone()
+        
+        if customer:
+            message = f'Status for {customer["first_name"]} {customer["last_name"]} from {customer["company"]} changed to {status}'
             
-        if unread_only:
-            query += ' AND read_status = 0'
+            # Notify admin
+            add_notification(cursor, 'admin', None, 'Status Updated', message, 'info', 'status_change', request_id)
             
-        query += ' ORDER BY created_at DESC LIMIT ?'
-        params.append(limit)
+            # Notify assigned intern if any
+            if customer['assigned_intern_id']:
+                add_notification(
+                    cursor, 'intern', customer['assigned_intern_id'], 'Status Updated', message,
+                    'info', 'status_change', request_id
+                )
+    
+    try:
+        execute_write(update)
         
-        cursor.execute(query, params)
+    except Exception as e:
+        print(f"Database error in update_request_status_with_notifications: {str(e)}")
+        raise Exception("Database error occurred while updating request status")
+
+def assign_intern_to_demo_with_notifications(demo_id, intern_id):
+    """Assign (or unassign) an intern on a demo account and notify admin and intern in one transaction"""
+    def assign(cursor):
+        assign_demo_in_transaction(cursor, demo_id, intern_id)
         
-        notifications = []
-        for row in cursor.fetchall():
-            notifications.append(dict(row))
+        cursor.execute('''
+            SELECT dc.first_name, dc.last_name, dc.company, i.name as intern_name
+            FROM demo_credentials dc
+            LEFT JOIN interns i ON i.id = ?
+            WHERE dc.id = ?
+        ''', (intern_id, demo_id))
+        demo_account = cursor.fetchone()
+        
+        if intern_id and demo_account:
+            if demo_account['intern_name']:
+                # Notify admin
+                add_notification(
+                    cursor, 'admin', None,
+                    'Intern Assigned to Demo',
+                    f'{demo_account["intern_name"]} has been assigned to demo account for {demo_account["first_name"]} {demo_account["last_name"]} from {demo_account["company"]}',
+                    'success', 'demo_assignment', demo_id
+                )
+                
+                # Notify intern
+                add_notification(
+                    cursor, 'intern', intern_id,
+                    'New Demo Assignment',
+                    f'You have been assigned to demo account for {demo_account["first_name"]} {demo_account["last_name"]} from {demo_account["company"]}',
+                    'info', 'demo_assignment', demo_id
+                )
+        elif demo_account:
+            # Unassignment notification
+            add_notification(
+                cursor, 'admin', None,
+                'Intern Unassigned from Demo',
+                f'Intern has been unassigned from demo account for {demo_account["first_name"]} {demo_account["last_name"]} from {demo_account["company"]}',
+                'info', 'demo_unassignment', demo_id
+            )
+    
+    try:
+        execute_write(assign)
+        
+    except Exception as e:
+        print(f"Database error in assign_intern_to_demo_with_notifications: {str(e)}")
+        raise Exception("Database error occurred while assigning intern to demo")
+
+def update_demo_admin_note_with_notifications(demo_id, admin_note):
+    """Update a demo account's admin note and notify the assigned intern and admin in one transaction"""
+    def update(cursor):
+        update_demo_admin_note_in_transaction(cursor, demo_id, admin_note)
+        
+        cursor.execute('''
+            SELECT first_name, last_name, company, assigned_intern_id
+            FROM demo_credentials
+            WHERE id = ?
+        ''', (demo_id,))
+        demo_details = cursor.fetchone()
+        
+        if demo_details['assigned_intern_id']:
+            # Notify assigned intern about admin note update
+            add_notification(
+                cursor, 'intern', demo_details['assigned_intern_id'],
+                'Admin Note Added to Demo',
+                f'Admin added a note to demo account: {demo_details["first_name"]} {demo_details["last_name"]} from {demo_details["company"]}',
+                'info', 'demo_admin_note', demo_id
+            )
+        
+        # Also notify admin (for activity tracking)
+        add_notification(
+            cursor, 'admin', None,
+            'Demo Admin Note Updated',
+            f'Admin note updated for demo account: {demo_details["first_name"]} {demo_details["last_name"]} from {demo_details["company"]}',
+            'success', 'demo_admin_note', demo_id
+        )
+    
+    try:
+        execute_write(update)
+        
+    except Exception as e:
+        print(f"Database error in update_demo_admin_note_with_notifications: {str(e)}")
+        raise Exception("Database error occurred while updating demo admin note")
+
+def update_demo_intern_note_with_notifications(demo_id, intern_id, intern_note):
+    """Update a demo account's intern note and notify admin in one transaction"""
+    def update(cursor):
+        update_demo_intern_note_in_transaction(cursor, demo_id, intern_note)
+        
+        cursor.execute('''
+            SELECT dc.first_name, dc.last_name, dc.company, i.name as intern_name
+            FROM demo_credentials dc
+            LEFT JOIN interns i ON i.id = ?
+            WHERE dc.id = ?
+        ''', (intern_id, demo_id))
+        demo_details = cursor.fetchone()
+        
+        if demo_details['intern_name']:
+            # Notify admin about intern note update
+            add_notification(
+                cursor, 'admin', None,
+                'Demo Account Note Updated',
+                f'{demo_details["intern_name"]} updated their note for demo account: {demo_details["first_name"]} {demo_details["last_name"]} from {demo_details["company"]}',
+                'info', 'demo_note_update', demo_id
+            )
+    
+    try:
+        execute_write(update)
+        
+    except Exception as e:
+        print(f"Database error in update_demo_intern_note_with_notifications: {str(e)}")
+        raise Exception("Database error occurred while updating demo intern note")
+
+# Bulk mutations of the admin lists. Each runs in one write transaction with
+# executemany; intern counters follow through the usual triggers and every
+# recipient gets one notification per call instead of one per row.
+MAX_BULK_IDS = 1000
+
+# Ids per IN (...) list, below SQLite's historical 999-variable limit
+ID_CHUNK_SIZE = 500
+
+# Companies named in a coalesced notification before "and N more"
+NOTIFICATION_NAMES_SHOWN = 3
+
+def fetch_rows_by_id(cursor, select_sql, ids):
+    """Run select_sql, whose WHERE clause ends in 'id IN ({ids})', over ids in chunks"""
+    rows = []
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        chunk = ids[start:start + ID_CHUNK_SIZE]
+        cursor.execute(select_sql.format(ids=', '.join('?' * len(chunk))), chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+def describe_rows(rows, plural, prefix=''):
+    """'Jane Doe from Acme' for one row, '12 customers (Acme, Beta, Gamma and 9 more)' for several"""
+    if len(rows) == 1:
+        row = rows[0]
+        return f'{prefix}{row["first_name"]} {row["last_name"]} from {row["company"]}'
+    companies = [row['company'] for row in rows[:NOTIFICATION_NAMES_SHOWN]]
+    more = len(rows) - len(companies)
+    return f"{len(rows)} {plural} ({', '.join(companies)}{f' and {more} more' if more else ''})"
+
+def bulk_result(ids, rows):
+    """Summary returned by the bulk operations: rows changed and requested ids that do not exist"""
+    found = {row['id'] for row in rows}
+    return {'updated': len(rows), 'not_found': [row_id for row_id in ids if row_id not in found]}
+
+def get_intern_name(cursor, intern_id):
+    cursor.execute('SELECT name FROM interns WHERE id = ?', (intern_id,))
+    intern = cursor.fetchone()
+    if not intern:
+        raise ValueError('Intern not found')
+    return intern['name']
+
+def bulk_assign_requests(request_ids, intern_id):
+    """Assign an intern to (or with intern_id None, unassign) many free trial requests at once
+
+    Returns {'updated': n, 'not_found': [ids]}. Raises ValueError for an unknown intern.
+    """
+    def assign(cursor):
+        intern_name = get_intern_name(cursor, intern_id) if intern_id else None
+        rows = fetch_rows_by_id(cursor, '''
+            SELECT id, first_name, last_name, company FROM free_trial_requests WHERE id IN ({ids})
+        ''', request_ids)
+        if not rows:
+            return bulk_result(request_ids, rows)
+        
+        related_id = rows[0]['id'] if len(rows) == 1 else None
+        if intern_id:
+            cursor.executemany('''
+                UPDATE free_trial_requests 
+                SET assigned_intern_id = ?, status = 'assigned', updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', [(intern_id, row['id']) for row in rows])
+            
+            customers = describe_rows(rows, 'customers')
+            add_notification(
+                cursor, 'admin', None, 'Intern Assigned',
+                f'{intern_name} has been assigned to {customers}', 'success', 'assignment', related_id
+            )
+            add_notification(
+                cursor, 'intern', intern_id, 'New Assignment',
+                f'You have been assigned to {customers}', 'info', 'assignment', related_id
+            )
+        else:
+            cursor.executemany('''
+                UPDATE free_trial_requests 
+                SET assigned_intern_id = NULL, status = 'pending', updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', [(row['id'],) for row in rows])
+            
+            add_notification(
+                cursor, 'admin', None, 'Intern Unassigned',
+                f'Intern has been unassigned from {describe_rows(rows, "customers")}',
+                'warning', 'unassignment', related_id
+            )
+        return bulk_result(request_ids, rows)
+    
+    try:
+        return execute_write(assign)
+        
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Database error in bulk_assign_requests: {str(e)}")
+        raise Exception("Database error occurred while assigning interns in bulk")
+
+def bulk_update_request_status(request_ids, status):
+    """Set the status of many free trial requests at once
+
+    The admin gets one notification and each assigned intern one covering
+    their own requests. Returns {'updated': n, 'not_found': [ids]}.
+    """
+    def update(cursor):
+        rows = fetch_rows_by_id(cursor, '''
+            SELECT id, first_name, last_name, company, assigned_intern_id
+            FROM free_trial_requests WHERE id IN ({ids})
+        ''', request_ids)
+        if not rows:
+            return bulk_result(request_ids, rows)
+        
+        cursor.executemany('''
+            UPDATE free_trial_requests 
+            SET status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', [(status, row['id']) for row in rows])
         
-        return notifications
+        add_notification(
+            cursor, 'admin', None, 'Status Updated',
+            f'Status for {describe_rows(rows, "customers")} changed to {status}',
+            'info', 'status_change', rows[0]['id'] if len(rows) == 1 else None
+        )
+        
+        rows_by_intern = {}
+        for row in rows:
+            if row['assigned_intern_id']:
+                rows_by_intern.setdefault(row['assigned_intern_id'], []).append(row)
+        for assigned_intern_id, intern_rows in rows_by_intern.items():
+            add_notification(
+                cursor, 'intern', assigned_intern_id, 'Status Updated',
+                f'Status for {describe_rows(intern_rows, "customers")} changed to {status}',
+                'info', 'status_change', intern_rows[0]['id'] if len(intern_rows) == 1 else None
+            )
+        return bulk_result(request_ids, rows)
+    
+    try:
+        return execute_write(update)
+        
+    except Exception as e:
+        print(f"Database error in bulk_update_request_status: {str(e)}")
+        raise Exception("Database error occurred while updating request statuses in bulk")
+
+def bulk_delete_requests(request_ids):
+    """Delete many customer records at once; returns {'updated': n, 'not_found': [ids]}"""
+    def delete(cursor):
+        rows = fetch_rows_by_id(cursor, 'SELECT id FROM free_trial_requests WHERE id IN ({ids})', request_ids)
+        cursor.executemany('DELETE FROM free_trial_requests WHERE id = ?', [(row['id'],) for row in rows])
+        return bulk_result(request_ids, rows)
+    
+    try:
+        return execute_write(delete)
+        
+    except Exception as e:
+        print(f"Database error in bulk_delete_requests: {str(e)}")
+        raise Exception("Database error occurred while deleting customer records in bulk")
+
+def bulk_assign_demos(demo_ids, intern_id):
+    """Assign an intern to (or with intern_id None, unassign) many demo accounts at once
+
+    Returns {'updated': n, 'not_found': [ids]}. Raises ValueError for an unknown intern.
+    """
+    def assign(cursor):
+        intern_name = get_intern_name(cursor, intern_id) if intern_id else None
+        rows = fetch_rows_by_id(cursor, '''
+            SELECT id, first_name, last_name, company FROM demo_credentials WHERE id IN ({ids})
+        ''', demo_ids)
+        if not rows:
+            return bulk_result(demo_ids, rows)
+        
+        cursor.executemany('''
+            UPDATE demo_credentials 
+            SET assigned_intern_id = ?
+            WHERE id = ?
+        ''', [(intern_id, row['id']) for row in rows])
+        
+        related_id = rows[0]['id'] if len(rows) == 1 else None
+        demos = describe_rows(rows, 'demo accounts', 'demo account for ')
+        if intern_id:
+            add_notification(
+                cursor, 'admin', None, 'Intern Assigned to Demo',
+                f'{intern_name} has been assigned to {demos}', 'success', 'demo_assignment', related_id
+            )
+            add_notification(
+                cursor, 'intern', intern_id, 'New Demo Assignment',
+                f'You have been assigned to {demos}', 'info', 'demo_assignment', related_id
+            )
+        else:
+            add_notification(
+                cursor, 'admin', None, 'Intern Unassigned from Demo',
+                f'Intern has been unassigned from {demos}', 'info', 'demo_unassignment', related_id
+            )
+        return bulk_result(demo_ids, rows)
+    
+    try:
+        return execute_write(assign)
+        
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Database error in bulk_assign_demos: {str(e)}")
+        raise Exception("Database error occurred while assigning interns to demos in bulk")
+
+def bulk_delete_demos(demo_ids):
+    """Delete many demo accounts at once; returns {'updated': n, 'not_found': [ids]}"""
+    def delete(cursor):
+        rows = fetch_rows_by_id(cursor, 'SELECT id FROM demo_credentials WHERE id IN ({ids})', demo_ids)
+        cursor.executemany('DELETE FROM demo_credentials WHERE id = ?', [(row['id'],) for row in rows])
+        return bulk_result(demo_ids, rows)
+    
+    try:
+        return execute_write(delete)
+        
+    except Exception as e:
+        print(f"Database error in bulk_delete_demos: {str(e)}")
+        raise Exception("Database error occurred while deleting demo accounts in bulk")
+
+def get_notifications(recipient_type, recipient_id=None, limit=50, unread_only=False, before_id=None, since_id=None):
+    """Get a recipient's notifications, newest first
+
+    before_id and since_id bound the ids returned (exclusive), so older pages
+    are fetched with before_id and new arrivals with since_id.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        return fetch_notifications(cursor, recipient_type, recipient_id, limit, unread_only, before_id, since_id)
         
     except Exception as e:
         print(f"Database error in get_notifications: {str(e)}")
@@ -1248,74 +2199,170 @@ def get_notifications(recipient_type, recipient_id=None, limit=50, unread_only=F
     finally:
         conn.close()
 
-def mark_notification_as_read(notification_id):
-    """Mark a notification as read"""
+def fetch_notifications(cursor, recipient_type, recipient_id, limit, unread_only=False, before_id=None, since_id=None):
+    """Read up to limit notifications, walking the (recipient, id) index
+
+    Newest first, except after since_id, where they are read oldest first
+    so that a caller stopped by the limit can carry on from the last id.
+    """
+    query = '''
+        SELECT id, recipient_type, recipient_id, title, message, type, 
+               read_status, created_at, related_entity_type, related_entity_id
+        FROM notifications 
+        WHERE recipient_type = ? AND recipient_id IS ?
+    '''
+    params = [recipient_type, recipient_id]
+    
+    if unread_only:
+        query += ' AND read_status = 0'
+    if before_id is not None:
+        query += ' AND id < ?'
+        params.append(before_id)
+    if since_id is not None:
+        query += ' AND id > ?'
+        params.append(since_id)
+    
+    query += f" ORDER BY id {'ASC' if since_id is not None else 'DESC'} LIMIT ?"
+    params.append(limit)
+    
+    cursor.execute(query, params)
+    return [dict(row) for row in cursor.fetchall()]
+
+def get_notification_inbox(recipient_type, recipient_id=None, limit=50, unread_only=False, before_id=None, since_id=None):
+    """Get one page of a recipient's inbox together with its unread count
+
+    Returns {'notifications', 'unread_count', 'pagination'}. pagination has
+    has_more (older notifications exist within the requested bounds),
+    next_before_id to fetch them, and latest_id, the since_id for the next
+    poll. A poll with nothing new costs one index probe and one counter read.
+
+    With since_id the notifications come oldest first, has_more means newer
+    ones are still waiting and latest_id is the highest id returned, so
+    polling again from latest_id until has_more is false misses nothing.
+    """
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
         
+        notifications = fetch_notifications(cursor, recipient_type, recipient_id, limit + 1, unread_only,
+                                             before_id, since_id)
+        has_more = len(notifications) > limit
+        notifications = notifications[:limit]
+        
+        cursor.execute('''
+            SELECT unread FROM notification_counters
+            WHERE recipient_type = ? AND recipient_key = ?
+        ''', (recipient_type, recipient_id if recipient_id is not None else 0))
+        row = cursor.fetchone()
+        
+        if since_id is not None:
+            next_before_id = None
+            latest_id = notifications[-1]['id'] if notifications else since_id
+        else:
+            next_before_id = notifications[-1]['id'] if has_more else None
+            latest_id = notifications[0]['id'] if notifications else None
+        
+        return {
+            'notifications': notifications,
+            'unread_count': row[0] if row else 0,
+            'pagination': {
+                'limit': limit,
+                'has_more': has_more,
+                'next_before_id': next_before_id,
+                'latest_id': latest_id,
+            },
+        }
+        
+    except Exception as e:
+        print(f"Database error in get_notification_inbox: {str(e)}")
+        raise Exception("Database error occurred while fetching notifications")
+    finally:
+        conn.close()
+
+def get_notifications_since(recipient_type, recipient_id=None, since_id=0, limit=100):
+    """Get a recipient's notifications with an id above since_id, oldest first"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id, recipient_type, recipient_id, title, message, type, 
+                   read_status, created_at, related_entity_type, related_entity_id
+            FROM notifications 
+            WHERE recipient_type = ? AND recipient_id IS ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (recipient_type, recipient_id, since_id, limit))
+        
+        return [dict(row) for row in cursor.fetchall()]
+        
+    except Exception as e:
+        print(f"Database error in get_notifications_since: {str(e)}")
+        raise Exception("Database error occurred while fetching notifications")
+    finally:
+        conn.close()
+
+def get_latest_notification_id():
+    """Get the highest notification id in use (0 when there are none)"""
+    conn = get_db_connection()
+    try:
+        return conn.execute('SELECT IFNULL(MAX(id), 0) FROM notifications').fetchone()[0]
+    finally:
+        conn.close()
+
+def mark_notification_as_read(notification_id):
+    """Mark a notification as read"""
+    def mark_read(cursor):
         cursor.execute('''
             UPDATE notifications 
             SET read_status = 1 
             WHERE id = ?
         ''', (notification_id,))
-        
-        conn.commit()
+    
+    try:
+        execute_write(mark_read)
         
     except Exception as e:
-        conn.rollback()
         print(f"Database error in mark_notification_as_read: {str(e)}")
         raise Exception("Database error occurred while marking notification as read")
-    finally:
-        conn.close()
 
 def mark_all_notifications_as_read(recipient_type, recipient_id=None):
     """Mark all notifications as read for a recipient"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        
+    def mark_all_read(cursor):
+        # Only touch unread rows, so the counter trigger fires once per change
         if recipient_id is not None:
             cursor.execute('''
                 UPDATE notifications 
                 SET read_status = 1 
-                WHERE recipient_type = ? AND recipient_id = ?
+                WHERE recipient_type = ? AND recipient_id = ? AND read_status IS NOT 1
             ''', (recipient_type, recipient_id))
         else:
             cursor.execute('''
                 UPDATE notifications 
                 SET read_status = 1 
-                WHERE recipient_type = ? AND recipient_id IS NULL
+                WHERE recipient_type = ? AND recipient_id IS NULL AND read_status IS NOT 1
             ''', (recipient_type,))
-        
-        conn.commit()
+    
+    try:
+        execute_write(mark_all_read)
         
     except Exception as e:
-        conn.rollback()
         print(f"Database error in mark_all_notifications_as_read: {str(e)}")
         raise Exception("Database error occurred while marking all notifications as read")
-    finally:
-        conn.close()
 
 def get_unread_notification_count(recipient_type, recipient_id=None):
-    """Get count of unread notifications for a recipient"""
+    """Get count of unread notifications for a recipient from its trigger-maintained counter"""
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
         
-        if recipient_id is not None:
-            cursor.execute('''
-                SELECT COUNT(*) FROM notifications 
-                WHERE recipient_type = ? AND recipient_id = ? AND read_status = 0
-            ''', (recipient_type, recipient_id))
-        else:
-            cursor.execute('''
-                SELECT COUNT(*) FROM notifications 
-                WHERE recipient_type = ? AND recipient_id IS NULL AND read_status = 0
-            ''', (recipient_type,))
+        cursor.execute('''
+            SELECT unread FROM notification_counters
+            WHERE recipient_type = ? AND recipient_key = ?
+        ''', (recipient_type, recipient_id if recipient_id is not None else 0))
         
-        count = cursor.fetchone()[0]
-        return count
+        row = cursor.fetchone()
+        return row[0] if row else 0
         
     except Exception as e:
         print(f"Database error in get_unread_notification_count: {str(e)}")
@@ -0,0 +1,248 @@
+import sqlite3
+import os
+import time
+import queue
+import threading
+import weakref
+from flask import g, has_app_context
+
+# Pool configuration (per gunicorn worker process)
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '30'))
+
+# How often a checkout waiting for a free connection looks for leaked ones
+RECLAIM_POLL = 0.5
+
+# PRAGMAs applied once when a connection is opened, not on every checkout
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=10000',
+    'PRAGMA temp_store=memory',
+    'PRAGMA busy_timeout=30000',  # 30 second busy timeout
+)
+
+# Callables run on every newly opened connection, e.g. to install a trace callback
+connect_hooks = []
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def connect(db_path):
+    """Open a connection with the standard row factory and PRAGMAs applied"""
+    conn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # This allows us to access columns by name
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    for hook in connect_hooks:
+        hook(conn)
+    return conn
+
+
+class PooledConnection:
+    """Thin wrapper around a pooled sqlite3 connection.
+
+    Behaves like sqlite3.Connection, except close() hands the connection
+    back to its pool. Request-bound connections ignore close() and are
+    released by the Flask teardown handler instead. A connection that is
+    never closed goes back to the pool when the wrapper is garbage
+    collected, so a missed close() cannot use up the pool for good.
+    """
+
+    def __init__(self, pool, conn, request_bound=False):
+        self._pool = pool
+        self._conn = conn
+        self._request_bound = request_bound
+        self._finalizer = weakref.finalize(self, pool.reclaim, conn)
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a released connection.')
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    def close(self):
+        """Return the connection to the pool (no-op while bound to a request)"""
+        if not self._request_bound:
+            self.release()
+
+    def release(self):
+        """Give the underlying connection back to the pool"""
+        if self._conn is not None:
+            self._finalizer.detach()
+            conn, self._conn = self._conn, None
+            self._pool.put(conn)
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections for a single process"""
+
+    def __init__(self, db_path, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._reclaimed = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._leaked = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def get(self):
+        """Check out a raw connection, opening one if the pool is not yet full"""
+        self._put_reclaimed()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = connect(self.db_path)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                started = time.perf_counter()
+                deadline = started + self.timeout
+                while conn is None:
+                    # Wake up now and then to put back connections reclaimed in the meantime
+                    try:
+                        conn = self._idle.get(timeout=max(min(RECLAIM_POLL, deadline - time.perf_counter()), 0))
+                    except queue.Empty:
+                        if time.perf_counter() >= deadline:
+                            with self._lock:
+                                self._timeouts += 1
+                            raise Exception(f"Timed out after {self.timeout}s waiting for a database connection")
+                        self._put_reclaimed()
+                waited = time.perf_counter() - started
+                with self._lock:
+                    self._waits += 1
+                    self._wait_time_total += waited
+                    self._wait_time_max = max(self._wait_time_max, waited)
+
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        return conn
+
+    def put(self, conn):
+        """Return a raw connection to the pool"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection - drop it so a fresh one is opened next time
+            conn.close()
+            with self._lock:
+                self._in_use -= 1
+                self._created -= 1
+            return
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    def reclaim(self, conn):
+        """Finalizer of a PooledConnection collected without being closed
+
+        Garbage collection can run while this thread holds self._lock, so the
+        connection is only queued here (SimpleQueue.put is reentrant) and put
+        back by the next get().
+        """
+        self._reclaimed.put(conn)
+
+    def _put_reclaimed(self):
+        while True:
+            try:
+                conn = self._reclaimed.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self._leaked += 1
+            print(f"Database connection for {self.db_path} was never closed; returned to the pool")
+            self.put(conn)
+
+    def stats(self):
+        """Pool sizing metrics for this worker"""
+        with self._lock:
+            return {
+                'pid': self.pid,
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'peak_in_use': self._peak_in_use,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'leaked': self._leaked,
+                'wait_time_total_ms': round(self._wait_time_total * 1000, 3),
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 3),
+            }
+
+
+def get_pool(db_path):
+    """Get the pool for db_path in the current process (rebuilt after fork)"""
+    pid = os.getpid()
+    pool = _pools.get(db_path)
+    if pool is None or pool.pid != pid:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None or pool.pid != pid:
+                pool = ConnectionPool(db_path)
+                _pools[db_path] = pool
+    return pool
+
+
+def checkout(db_path):
+    """Get a pooled connection, shared for the rest of the request when inside Flask"""
+    pool = get_pool(db_path)
+    if has_app_context():
+        bound = g.get('_db_connections')
+        if bound is None:
+            bound = g._db_connections = {}
+        conn = bound.get(db_path)
+        if conn is None:
+            conn = bound[db_path] = PooledConnection(pool, pool.get(), request_bound=True)
+        return conn
+    return PooledConnection(pool, pool.get())
+
+
+def release_request_connections(exception=None):
+    """Flask teardown handler returning request-bound connections to their pools"""
+    bound = g.pop('_db_connections', None)
+    if bound:
+        for conn in bound.values():
+            conn.release()
+
+
+def get_pool_stats():
+    """Metrics for every pool owned by the current process"""
+    pid = os.getpid()
+    return [pool.stats() for pool in list(_pools.values()) if pool.pid == pid]
+
+
+def init_app(app):
+    """Register request-scoped connection teardown on a Flask app"""
+    app.teardown_appcontext(release_request_connections)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Streaming export of customers, demo accounts and notifications as CSV or NDJSON.
+
+The rows are read from a single SQLite cursor EXPORT_FETCH_SIZE at a time
+and written out chunk by chunk, so memory stays flat however large the
+table is. The cursor runs on a connection of its own rather than a pooled
+one, so a slow download never holds up other requests, and it reads one
+snapshot of the table from the first row to the last.
+
+Columns are chosen like the fields= projection of the list views (customer
+API credentials only when named). Rows can be filtered by status, intern and
+a created_at range, where from is inclusive and to exclusive:
+
+    python export_records.py customers --from 2026-09-01 --to 2026-10-01 -o september.csv
+    python export_records.py demos --status active --format ndjson
+    python export_records.py notifications --intern 3 --fields id,title,created_at
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime
+
+import database
+import db_pool
+
+# Rows fetched from the cursor and written out per chunk
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', '500'))
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# Per kind: the table, its export order and how the status and intern filters apply
+EXPORT_KINDS = {
+    'customers': {
+        'table': 'free_trial_requests',
+        'order_by': 'ftr.created_at, ftr.id',
+        'statuses': None,  # any value of the status column
+        'intern_filter': 'ftr.assigned_intern_id = ?',
+    },
+    'demos': {
+        'table': 'demo_credentials',
+        'order_by': 'dc.created_at, dc.id',
+        'statuses': {
+            'active': database.demo_active_sql('dc'),
+            'expired': f"NOT {database.demo_active_sql('dc')}",
+        },
+        'intern_filter': 'dc.assigned_intern_id = ?',
+    },
+    'notifications': {
+        'table': 'notifications',
+        'order_by': 'n.id',
+        'statuses': {
+            'unread': 'n.read_status = 0',
+            'read': 'n.read_status = 1',
+        },
+        'intern_filter': "n.recipient_type = 'intern' AND n.recipient_id = ?",
+    },
+}
+
+
+def parse_timestamp(value, name):
+    """Normalise an ISO 8601 date or time to the 'YYYY-MM-DD HH:MM:SS' form created_at is stored in"""
+    try:
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date or time')
+
+
+def build_export_query(kind, fields=None, status=None, intern_id=None, created_from=None, created_to=None):
+    """Validate an export and return (sql, params, fields)
+
+    Raises ValueError for an unknown kind, field or status, or a malformed date.
+    """
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"kind must be one of: {', '.join(EXPORT_KINDS)}")
+    spec = EXPORT_KINDS[kind]
+    table = spec['table']
+    fields = database.resolve_list_fields(table, fields)
+    alias = database.LIST_VIEWS[table]['alias']
+
+    where, params = [], []
+    if status is not None:
+        if spec['statuses'] is None:
+            where.append(f'{alias}.status = ?')
+            params.append(status)
+        elif status in spec['statuses']:
+            where.append(spec['statuses'][status])
+        else:
+            raise ValueError(f"status must be one of: {', '.join(spec['statuses'])}")
+    if intern_id is not None:
+        where.append(spec['intern_filter'])
+        params.append(intern_id)
+    if created_from is not None:
+        where.append(f'{alias}.created_at >= ?')
+        params.append(parse_timestamp(created_from, 'from'))
+    if created_to is not None:
+        where.append(f'{alias}.created_at < ?')
+        params.append(parse_timestamp(created_to, 'to'))
+
+    sql = database.list_select_sql(table, fields)
+    if where:
+        sql += f" WHERE {' AND '.join(where)}"
+    sql += f" ORDER BY {spec['order_by']}"
+    return sql, params, fields
+
+
+def _json_value(value):
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def export_chunks(kind, sql, params, fields, file_format, dumps=json.dumps, fetch_size=None):
+    """Generate the export as text chunks, one per fetchmany batch
+
+    Runs outside the request context: the connection is opened here and
+    closed when the last chunk has been sent or the client goes away.
+    JSON columns are embedded as JSON in NDJSON and left as text in CSV.
+    """
+    fetch_size = fetch_size or EXPORT_FETCH_SIZE
+    json_columns = database.JSON_COLUMNS.get(EXPORT_KINDS[kind]['table'], {})
+    json_fields = [field for field in fields if field in json_columns]
+    conn = db_pool.connect(database.DB_PATH)
+    try:
+        cursor = conn.execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        positions = [names.index(field) for field in fields]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        if file_format == 'csv':
+            writer.writerow(fields)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            if file_format == 'csv':
+                writer.writerows([row[i] for i in positions] for row in rows)
+            else:
+                for row in rows:
+                    record = {field: row[i] for field, i in zip(fields, positions)}
+                    for field in json_fields:
+                        record[field] = _json_value(record[field])
+                    buffer.write(dumps(record))
+                    buffer.write('\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated file
+        print(f"Database error in export_chunks: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
+
+def export_filename(kind, file_format):
+    return f"{kind}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{file_format}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export customers, demo accounts or notifications')
+    parser.add_argument('kind', choices=list(EXPORT_KINDS))
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--fields', help='comma-separated columns (default: all but credentials)')
+    parser.add_argument('--status', help='customer status, active/expired for demos, read/unread for notifications')
+    parser.add_argument('--intern', type=int, help='only rows assigned (or, for notifications, sent) to this intern')
+    parser.add_argument('--from', dest='created_from', help='created at or after this date/time')
+    parser.add_argument('--to', dest='created_to', help='created before this date/time')
+    parser.add_argument('-o', '--output', help='file to write (default: standard output)')
+    args = parser.parse_args()
+
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()] if args.fields else None
+    try:
+        sql, params, fields = build_export_query(args.kind, fields, args.status, args.intern,
+                                                 args.created_from, args.created_to)
+    except ValueError as ve:
+        parser.error(str(ve))
+
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        for chunk in export_chunks(args.kind, sql, params, fields, args.format):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
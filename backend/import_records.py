@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Streaming import of customers and demo accounts from CSV or NDJSON.
+
+The file is read one line at a time, so memory stays flat however many rows
+it holds. Each row is validated on its own; valid rows are written
+IMPORT_BATCH_SIZE at a time with executemany, one short write transaction
+per batch, and invalid ones are listed in the report with their line
+number (the first IMPORT_MAX_ERRORS of them; the rest are only counted).
+
+Columns are the table's own names (first_name, last_name, email, company,
+phone, industry_domain, ...), as a CSV header or as NDJSON keys. Rows whose
+email already exists, in the table or earlier in the file, are handled by
+the conflict policy:
+
+    skip      keep the existing row (default)
+    update    overwrite it with the non-empty values from the file
+    error     report the row as an error
+
+Batches already written stay written if a later one fails, so a re-run with
+the skip policy picks up where an interrupted import stopped. A dry run only
+validates: duplicates within the file are then caught inside a batch only.
+
+    python import_records.py customers customers.csv
+    python import_records.py demos demos.ndjson --on-conflict update
+    python import_records.py customers - --format ndjson --dry-run < customers.ndjson
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import secrets
+import sqlite3
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+
+import database
+
+# Rows written per transaction and row errors listed in the report
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', '1000'))
+
+# Unknown column names listed in the report
+MAX_IGNORED_COLUMNS = 50
+
+# Demo accounts expire this long after they are imported unless expires_at is given
+DEMO_VALIDITY = timedelta(days=10)
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+CONFLICT_POLICIES = ('skip', 'update', 'error')
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Per kind: target table, the columns a file may set, those it must set and
+# the values used for missing optional ones on insert
+IMPORT_KINDS = {
+    'customers': {
+        'table': 'free_trial_requests',
+        'label': 'customer record',
+        'columns': ('first_name', 'last_name', 'email', 'company', 'phone', 'industry_domain',
+                    'account_type', 'primary_use_case', 'selected_integrations', 'custom_integration',
+                    'status', 'assigned_intern_id', 'admin_note'),
+        'required': ('first_name', 'last_name', 'email', 'company'),
+        'defaults': {'phone': '', 'industry_domain': '', 'account_type': 'ld'},
+    },
+    'demos': {
+        'table': 'demo_credentials',
+        'label': 'demo account',
+        'columns': ('first_name', 'last_name', 'email', 'company', 'phone', 'industry_domain',
+                    'selected_integrations', 'expires_at', 'assigned_intern_id', 'admin_note'),
+        'required': ('first_name', 'last_name', 'email', 'company'),
+        'defaults': {'phone': '', 'industry_domain': '', 'selected_integrations': '[]'},
+    },
+}
+
+
+def detect_format(filename=None, content_type=None):
+    """Guess the format from a file name or content type; None when neither tells"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv' or (content_type or '').startswith('text/csv'):
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl') or (content_type or '').startswith(('application/x-ndjson',
+                                                                             'application/jsonl')):
+        return 'ndjson'
+    return None
+
+
+def decode_lines(stream):
+    """Yield the lines of a binary stream as text, keeping line endings for the csv module"""
+    first = True
+    for line in stream:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8-sig' if first else 'utf-8')
+        elif first:
+            line = line.lstrip('\ufeff')
+        first = False
+        yield line
+
+
+def read_records(lines, file_format):
+    """Yield (line number, record dict or None, parse error or None) for each row"""
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, 'Row has more fields than the header'
+            else:
+                yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'Line is not valid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'Line is not a JSON object'
+        else:
+            yield line_number, record, None
+
+
+def clean_value(value):
+    """Strip strings and turn empty values into None"""
+    if isinstance(value, str):
+        value = value.strip()
+    return None if value in ('', None) else value
+
+
+def parse_integrations(value):
+    """A JSON array, a list, or names separated by ';' or ',' -> JSON array text"""
+    if isinstance(value, str):
+        if value.startswith('['):
+            value = json.loads(value)
+        else:
+            value = [name.strip() for name in re.split('[;,]', value) if name.strip()]
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError('selected_integrations must be a list of names')
+    return json.dumps(value)
+
+
+def validate_record(record, spec, intern_ids):
+    """Return the row's column values (None where missing) or raise ValueError"""
+    values = {}
+    for column in spec['columns']:
+        value = clean_value(record.get(column))
+        if isinstance(value, (dict, list)) and column != 'selected_integrations':
+            raise ValueError(f'{column} must be a single value')
+        values[column] = value
+
+    for column in spec['required']:
+        if values[column] is None:
+            raise ValueError(f'{column} is required')
+    if not EMAIL_PATTERN.match(str(values['email'])):
+        raise ValueError('email is not a valid address')
+
+    for column, value in values.items():
+        if value is None or column in ('assigned_intern_id', 'selected_integrations', 'expires_at'):
+            continue
+        values[column] = str(value)
+
+    if values['selected_integrations'] is not None:
+        try:
+            values['selected_integrations'] = parse_integrations(values['selected_integrations'])
+        except ValueError:
+            raise ValueError('selected_integrations must be a list of names')
+
+    if values['assigned_intern_id'] is not None:
+        try:
+            intern_id = int(values['assigned_intern_id'])
+        except (TypeError, ValueError):
+            raise ValueError('assigned_intern_id must be an integer')
+        if intern_id not in intern_ids:
+            raise ValueError(f'Intern {intern_id} not found')
+        values['assigned_intern_id'] = intern_id
+
+    if 'expires_at' in values and values['expires_at'] is not None:
+        try:
+            values['expires_at'] = datetime.fromisoformat(str(values['expires_at']))
+        except ValueError:
+            raise ValueError('expires_at must be an ISO 8601 date or time')
+    return values
+
+
+def generate_demo_username(first_name):
+    """A username like create_demo_credentials makes, with a 64-bit random suffix"""
+    return f"demo_{first_name.lower()[:4]}{secrets.token_hex(8)}"
+
+
+def generate_demo_login(first_name):
+    """Username and password for an imported demo account (see unique_demo_usernames)"""
+    username = generate_demo_username(first_name)
+    password = ''.join(secrets.choice(string.ascii_lowercase + string.digits) for _ in range(8))
+    return username, password
+
+
+def unique_demo_usernames(cursor, spec, parameters):
+    """Regenerate any generated username already taken, in the table or the batch
+
+    Runs inside the batch's write transaction, so no other writer can take
+    a username between this check and the insert.
+    """
+    position = len(spec['columns'])
+    first_name = spec['columns'].index('first_name')
+    used = set()
+    pending = parameters
+    while pending:
+        usernames = [row[position] for row in pending]
+        cursor.execute(f'''
+            SELECT username FROM demo_credentials WHERE username IN ({', '.join('?' * len(usernames))})
+        ''', usernames)
+        taken = {row['username'] for row in cursor.fetchall()}
+        retry = []
+        for row in pending:
+            if row[position] in taken or row[position] in used:
+                row[position] = generate_demo_username(row[first_name])
+                retry.append(row)
+            else:
+                used.add(row[position])
+        pending = retry
+
+
+def upsert_sql(kind, spec, policy):
+    """INSERT for one row; with the update policy, existing rows take the file's non-empty values"""
+    columns = list(spec['columns'])
+    if kind == 'customers':
+        updatable = [column for column in columns if column != 'email']
+        touch = ', updated_at = CURRENT_TIMESTAMP'
+    else:
+        columns += ['username', 'password']
+        updatable = [column for column in spec['columns'] if column != 'email']
+        touch = ''
+
+    sql = f'''
+        INSERT INTO {spec['table']} ({', '.join(columns)})
+        VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT (email) DO '''
+    if policy != 'update':
+        return sql + 'NOTHING'
+    assignments = ', '.join(f'{column} = COALESCE(?, {column})' for column in updatable)
+    return sql + f'UPDATE SET {assignments}{touch}'
+
+
+def insert_parameters(kind, spec, values):
+    """Values for the INSERT, with defaults for the optional columns left empty"""
+    row = {column: spec['defaults'].get(column) if values[column] is None else values[column]
+           for column in spec['columns']}
+    if kind == 'customers':
+        if row['status'] is None:
+            row['status'] = 'assigned' if row['assigned_intern_id'] else 'pending'
+        return [row[column] for column in spec['columns']]
+    if row['expires_at'] is None:
+        row['expires_at'] = datetime.now() + DEMO_VALIDITY
+    return [row[column] for column in spec['columns']] + list(generate_demo_login(row['first_name']))
+
+
+class ImportReport:
+    """Counts and the first IMPORT_MAX_ERRORS row errors of one import"""
+
+    def __init__(self, kind, policy, dry_run, max_errors):
+        self.kind = kind
+        self.policy = policy
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+        self.ignored_columns = set()
+        self.batches = 0
+        self.aborted = None
+        # intern id -> rows newly assigned to them, for one notification each
+        self.assigned = {}
+
+    def add_error(self, line, email, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'email': email, 'error': message})
+
+    def to_dict(self, duration_ms):
+        return {
+            'kind': self.kind,
+            'on_conflict': self.policy,
+            'dry_run': self.dry_run,
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'errors': self.error_count,
+            'error_rows': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+            'ignored_columns': sorted(self.ignored_columns),
+            'batches': self.batches,
+            'complete': self.aborted is None,
+            'aborted': self.aborted,
+            'duration_ms': duration_ms,
+        }
+
+
+def write_batch(kind, spec, policy, batch, report):
+    """Classify a batch against existing emails and write it in one transaction"""
+    def classify(cursor):
+        emails = list({values['email'] for _, values in batch})
+        cursor.execute(f'''
+            SELECT email FROM {spec['table']} WHERE email IN ({', '.join('?' * len(emails))})
+        ''', emails)
+        existing = {row['email'] for row in cursor.fetchall()}
+
+        accepted, outcome = [], {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': [], 'assigned': {}}
+        for line, values in batch:
+            email = values['email']
+            if email in existing:
+                if policy == 'skip':
+                    outcome['skipped'] += 1
+                    continue
+                if policy == 'error':
+                    outcome['errors'].append((line, email, 'A record with this email already exists'))
+                    continue
+                outcome['updated'] += 1
+            else:
+                existing.add(email)
+                outcome['inserted'] += 1
+            accepted.append(values)
+            if values['assigned_intern_id']:
+                assigned = outcome['assigned']
+                assigned[values['assigned_intern_id']] = assigned.get(values['assigned_intern_id'], 0) + 1
+        return accepted, outcome
+
+    def write(cursor):
+        accepted, outcome = classify(cursor)
+        if accepted and not report.dry_run:
+            parameters = []
+            for values in accepted:
+                row = insert_parameters(kind, spec, values)
+                if policy == 'update':
+                    row += [values[column] for column in spec['columns'] if column != 'email']
+                parameters.append(row)
+            if kind == 'demos':
+                unique_demo_usernames(cursor, spec, parameters)
+            cursor.executemany(upsert_sql(kind, spec, policy), parameters)
+        return outcome
+
+    try:
+        if report.dry_run:
+            conn = database.get_db_connection()
+            try:
+                outcome = write(conn.cursor())
+            finally:
+                conn.close()
+        else:
+            outcome = database.execute_write(write)
+    except sqlite3.Error as e:
+        print(f"Database error in import_records: {str(e)}")
+        for line, values in batch:
+            report.add_error(line, values['email'], 'Database error, batch not imported')
+        return
+
+    report.batches += 1
+    report.inserted += outcome['inserted']
+    report.updated += outcome['updated']
+    report.skipped += outcome['skipped']
+    for line, email, message in outcome['errors']:
+        report.add_error(line, email, message)
+    for intern_id, count in outcome['assigned'].items():
+        report.assigned[intern_id] = report.assigned.get(intern_id, 0) + count
+
+
+def notify_import(spec, report, source):
+    """One admin notification for the import, and one per intern with rows assigned to them"""
+    label = spec['label']
+    if report.dry_run or not (report.inserted or report.updated):
+        return
+    database.create_notification(
+        'admin', None, f"{label.title()}s Imported",
+        f"{report.inserted} {label}(s) added and {report.updated} updated from {source}"
+        f"{f', {report.error_count} row(s) rejected' if report.error_count else ''}",
+        'success', 'import'
+    )
+    for intern_id, count in report.assigned.items():
+        database.create_notification(
+            'intern', intern_id, 'New Assignments',
+            f'You have been assigned {count} {label}(s) from an import', 'info', 'assignment'
+        )
+
+
+def import_records(kind, stream, file_format, on_conflict='skip', dry_run=False, batch_size=None,
+                   max_errors=None, source='an upload'):
+    """Import customers or demo accounts from a CSV or NDJSON stream of bytes or text lines
+
+    Returns a report with the rows inserted, updated and skipped, and the
+    line, email and reason of every rejected row up to max_errors.
+    Raises ValueError for an unknown kind, format or conflict policy.
+    """
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"kind must be one of: {', '.join(IMPORT_KINDS)}")
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"on_conflict must be one of: {', '.join(CONFLICT_POLICIES)}")
+    spec = IMPORT_KINDS[kind]
+    batch_size = min(batch_size or IMPORT_BATCH_SIZE, database.ID_CHUNK_SIZE)
+    report = ImportReport(kind, on_conflict, dry_run, IMPORT_MAX_ERRORS if max_errors is None else max_errors)
+    started = time.perf_counter()
+
+    conn = database.get_db_connection()
+    try:
+        intern_ids = {row['id'] for row in conn.execute('SELECT id FROM interns').fetchall()}
+    finally:
+        conn.close()
+
+    known = set(spec['columns'])
+    batch = []
+    try:
+        for line, record, error in read_records(decode_lines(stream), file_format):
+            report.rows += 1
+            if error:
+                report.add_error(line, None, error)
+                continue
+            if len(report.ignored_columns) < MAX_IGNORED_COLUMNS:
+                report.ignored_columns.update(str(key) for key in record if key not in known)
+            try:
+                batch.append((line, validate_record(record, spec, intern_ids)))
+            except ValueError as ve:
+                email = clean_value(record.get('email'))
+                report.add_error(line, email if isinstance(email, str) else None, str(ve))
+                continue
+            if len(batch) >= batch_size:
+                write_batch(kind, spec, on_conflict, batch, report)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        report.aborted = f'Could not read the file after row {report.rows}: {str(e)}'
+    if batch:
+        write_batch(kind, spec, on_conflict, batch, report)
+
+    notify_import(spec, report, source)
+    return report.to_dict(round((time.perf_counter() - started) * 1000, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import customers or demo accounts from CSV or NDJSON')
+    parser.add_argument('kind', choices=list(IMPORT_KINDS))
+    parser.add_argument('path', help="file to import, or - for standard input")
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help='default: from the file extension')
+    parser.add_argument('--on-conflict', choices=CONFLICT_POLICIES, default='skip',
+                        help='what to do with rows whose email already exists (default skip)')
+    parser.add_argument('--batch-size', type=int, help=f'rows per transaction (default {IMPORT_BATCH_SIZE})')
+    parser.add_argument('--dry-run', action='store_true', help='validate the file without writing')
+    args = parser.parse_args()
+
+    file_format = args.format or detect_format(args.path)
+    if not file_format:
+        parser.error('cannot tell the format from the file name; pass --format')
+
+    if args.path == '-':
+        report = import_records(args.kind, sys.stdin.buffer, file_format, args.on_conflict, args.dry_run,
+                                args.batch_size, source='standard input')
+    else:
+        with open(args.path, 'rb') as stream:
+            report = import_records(args.kind, stream, file_format, args.on_conflict, args.dry_run,
+                                    args.batch_size, source=os.path.basename(args.path))
+
+    verb = 'Would import' if report['dry_run'] else 'Imported'
+    print(f"{verb} {report['rows']} row(s) in {report['duration_ms']} ms: {report['inserted']} added, "
+          f"{report['updated']} updated, {report['skipped']} skipped, {report['errors']} rejected")
+    for error in report['error_rows']:
+        print(f"  line {error['line']}: {error['error']}" + (f" ({error['email']})" if error['email'] else ''))
+    if report['errors_truncated']:
+        print(f"  ... and {report['errors'] - len(report['error_rows'])} more")
+    if report['ignored_columns']:
+        print(f"Ignored column(s): {', '.join(report['ignored_columns'])}")
+    if report['aborted']:
+        print(report['aborted'])
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
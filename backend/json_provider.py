@@ -0,0 +1,76 @@
+"""
+JSON encoding for API responses.
+
+List endpoints return thousands of rows, and Flask's default provider spends
+more time serializing them than SQLite spends reading them: it sorts every
+object's keys and goes through the pure-Python default hook for each row.
+The providers here never sort keys or pretty-print, serialize result rows
+(LazyRow and sqlite3.Row) like dicts, dates and datetimes as ISO 8601 and
+bytes as base64. When orjson is installed it does the encoding; otherwise
+the stdlib encoder is used with the same output rules.
+
+Set JSON_ENCODER=stdlib to force the stdlib encoder.
+"""
+import base64
+import os
+import sqlite3
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+from row_decoder import LazyRow
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'auto').lower()
+
+
+def _default(o):
+    """Convert values the encoders do not handle natively"""
+    if isinstance(o, LazyRow):
+        return o.to_dict()
+    if isinstance(o, sqlite3.Row):
+        return dict(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (bytes, bytearray, memoryview)):
+        return base64.b64encode(o).decode('ascii')
+    return DefaultJSONProvider.default(o)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Stdlib json encoder with unsorted, compact output"""
+    default = staticmethod(_default)
+    sort_keys = False
+    compact = True
+
+
+class OrjsonJSONProvider(StdlibJSONProvider):
+    """orjson encoder; output matches StdlibJSONProvider apart from whitespace and escaping"""
+    options = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Formatting options (indent, sort_keys, ...) are a stdlib feature
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self.options)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def get_json_provider_class():
+    """Pick the fastest available provider unless JSON_ENCODER says otherwise"""
+    if orjson is not None and JSON_ENCODER != 'stdlib':
+        return OrjsonJSONProvider
+    return StdlibJSONProvider
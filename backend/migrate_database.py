@@ -1,162 +1,229 @@
 #!/usr/bin/env python3
 """
-Database migration script to add unique constraint to email field
+Incremental schema migrations keyed on PRAGMA user_version.
+
+Each migration runs in its own IMMEDIATE transaction together with the
+user_version bump, so a failed step leaves the database untouched. Columns
+are added with ALTER TABLE (a metadata-only change); a table is only rebuilt
+when SQLite cannot express the change in place, and then rows are copied with
+batched INSERT ... SELECT inside the same transaction.
+
+init_database() applies pending migrations on startup. Run this script to
+apply them by hand or to see the current schema version:
+
+    python migrate_database.py [--status]
+
+Intern and notification counters are kept up to date by triggers. To
+repair them by hand:
+
+    python migrate_database.py --reconcile-counters
 """
 import sqlite3
-import os
-import shutil
-from datetime import datetime
+import sys
+import time
 
-DB_PATH = os.path.join(os.path.dirname(__file__), 'smartcard.db')
-BACKUP_PATH = os.path.join(os.path.dirname(__file__), f'smartcard_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db')
+import database
 
-def migrate_database():
-    """Migrate database to add unique constraint to email field"""
-    
-    # Check if database exists
-    if not os.path.exists(DB_PATH):
-        print("No existing database found. Creating new database with proper schema.")
-        from database import init_database
-        init_database()
-        return
-    
-    # Create backup
-    print(f"Creating backup: {BACKUP_PATH}")
-    shutil.copy2(DB_PATH, BACKUP_PATH)
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+# Rows copied per INSERT ... SELECT statement during a table rebuild
+REBUILD_BATCH_SIZE = 5000
+
+
+def get_schema_version(conn):
+    """Get the schema version stored in the database header"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def canonical_columns(table):
+    """Get PRAGMA table_info rows for a table as declared in database.TABLE_SCHEMAS"""
+    mem = sqlite3.connect(':memory:')
     try:
-        # Check if the table already has unique constraint on email
-        cursor.execute("PRAGMA table_info(free_trial_requests)")
-        columns = cursor.fetchall()
-        
-        # Check if email column exists and if it has unique constraint
-        email_column_info = None
-        for column in columns:
-            if column[1] == 'email':  # column[1] is the column name
-                email_column_info = column
-                break
-        
-        if email_column_info:
-            # Check for unique constraint by trying to get indices
-            cursor.execute("PRAGMA index_list(free_trial_requests)")
-            indices = cursor.fetchall()
-            
-            has_unique_email = False
-            for index in indices:
-                if index[2] == 1:  # unique index
-                    cursor.execute(f"PRAGMA index_info({index[1]})")
-                    index_columns = cursor.fetchall()
-                    for col in index_columns:
-                        cursor.execute("PRAGMA table_info(free_trial_requests)")
-                        table_columns = cursor.fetchall()
-                        if table_columns[col[1]][1] == 'email':  # column name is email
-                            has_unique_email = True
-                            break
-            
-            if has_unique_email:
-                print("Database already has unique constraint on email. No migration needed.")
-                conn.close()
-                return
-        
-        print("Migrating database to add unique constraint on email...")
-        
-        # Get all existing data
-        cursor.execute("SELECT * FROM free_trial_requests")
-        existing_requests = cursor.fetchall()
-        
-        cursor.execute("SELECT * FROM interns")
-        existing_interns = cursor.fetchall()
-        
-        # Drop existing tables
-        cursor.execute("DROP TABLE IF EXISTS free_trial_requests")
-        cursor.execute("DROP TABLE IF EXISTS interns")
-        
-        # Recreate tables with proper schema
-        cursor.execute('''
-            CREATE TABLE free_trial_requests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                email TEXT NOT NULL UNIQUE,
-                company TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                industry_domain TEXT NOT NULL,
-                smartcard_usage TEXT,
-                primary_use_case TEXT,
-                account_type TEXT NOT NULL,
-                status TEXT DEFAULT 'pending',
-                assigned_intern_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (assigned_intern_id) REFERENCES interns (id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE interns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                email TEXT NOT NULL,
-                specialization TEXT NOT NULL,
-                assigned_count INTEGER DEFAULT 0,
-                completed_count INTEGER DEFAULT 0,
-                success_rate REAL DEFAULT 0.0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Insert existing data back (remove duplicates for requests based on email)
-        seen_emails = set()
-        unique_requests = []
-        
-        for request in existing_requests:
-            email = request[3]  # email is at index 3
-            if email not in seen_emails:
-                seen_emails.add(email)
-                unique_requests.append(request)
-            else:
-                print(f"Removing duplicate request for email: {email}")
-        
-        # Insert unique requests
-        for request in unique_requests:
-            cursor.execute('''
-                INSERT INTO free_trial_requests (
-                    id, first_name, last_name, email, company, phone, 
-                    industry_domain, smartcard_usage, primary_use_case, 
-                    account_type, status, assigned_intern_id, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', request)
-        
-        # Insert existing interns
-        for intern in existing_interns:
-            cursor.execute('''
-                INSERT INTO interns (
-                    id, name, username, password, email, specialization,
-                    assigned_count, completed_count, success_rate, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', intern)
-        
+        mem.execute(database.TABLE_SCHEMAS[table])
+        return mem.execute(f'PRAGMA table_info({table})').fetchall()
+    finally:
+        mem.close()
+
+
+def existing_columns(cursor, table):
+    """Get the column names a table currently has"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [row[1] for row in cursor.fetchall()]
+
+
+def rebuild_table(cursor, table):
+    """Recreate a table with its canonical schema, copying rows in rowid batches
+
+    Must run inside the caller's transaction. Columns missing from the old
+    table take their declared defaults; columns no longer declared are dropped.
+    Returns (rows_before, rows_copied).
+    """
+    staging = f'{table}__rebuild'
+    old_columns = existing_columns(cursor, table)
+    new_columns = [row[1] for row in canonical_columns(table)]
+    shared = ', '.join(column for column in new_columns if column in old_columns)
+
+    create_statement = database.TABLE_SCHEMAS[table].replace(
+        f'CREATE TABLE IF NOT EXISTS {table}', f'CREATE TABLE {staging}', 1)
+    cursor.execute(f'DROP TABLE IF EXISTS {staging}')
+    cursor.execute(create_statement)
+
+    cursor.execute(f'SELECT COUNT(*), MIN(rowid), MAX(rowid) FROM {table}')
+    rows_before, low, high = cursor.fetchone()
+    rows_copied = 0
+    if rows_before:
+        for start in range(low, high + 1, REBUILD_BATCH_SIZE):
+            cursor.execute(f'''
+                INSERT INTO {staging} ({shared})
+                SELECT {shared} FROM {table}
+                WHERE rowid BETWEEN ? AND ?
+                ORDER BY rowid
+            ''', (start, start + REBUILD_BATCH_SIZE - 1))
+            rows_copied += cursor.rowcount
+
+    cursor.execute(f'DROP TABLE {table}')
+    cursor.execute(f'ALTER TABLE {staging} RENAME TO {table}')
+    return rows_before, rows_copied
+
+
+def add_missing_columns(cursor):
+    """Add columns declared in TABLE_SCHEMAS that older databases lack"""
+    for table in database.TABLE_SCHEMAS:
+        present = existing_columns(cursor, table)
+        missing = [row for row in canonical_columns(table) if row[1] not in present]
+        if not missing:
+            continue
+
+        # ALTER TABLE ADD COLUMN cannot add NOT NULL columns without a
+        # default or columns with a non-constant default
+        needs_rebuild = any(
+            (notnull and default is None) or (default or '').upper().startswith('CURRENT_')
+            for _, _, _, notnull, default, _ in missing
+        )
+        if needs_rebuild:
+            rebuild_table(cursor, table)
+            print(f"  rebuilt {table} to add {', '.join(row[1] for row in missing)}")
+            continue
+
+        for _, name, column_type, notnull, default, _ in missing:
+            definition = f'{name} {column_type}'
+            if notnull:
+                definition += ' NOT NULL'
+            if default is not None:
+                definition += f' DEFAULT {default}'
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {definition}')
+        print(f"  added {', '.join(row[1] for row in missing)} to {table}")
+
+
+def retired_step(cursor):
+    """A withdrawn migration: its version is kept so databases past it stay in step"""
+
+
+def install_intern_counter_triggers(cursor):
+    """Install the intern counter triggers and repair counters that drifted before them"""
+    database.create_triggers(cursor)
+    repaired = database.reconcile_intern_counters(cursor)
+    print(f"  repaired counters for {repaired} intern(s)")
+
+
+def install_notification_counter_triggers(cursor):
+    """Install the notification counter triggers and count the existing notifications"""
+    database.create_triggers(cursor)
+    repaired = database.reconcile_notification_counters(cursor)
+    print(f"  counted notifications for {repaired} inbox(es)")
+
+
+# Ordered migrations: (version, description, step). Append new steps with the
+# next version number; never edit or reorder a released step.
+MIGRATIONS = [
+    (1, 'Add columns missing from databases created by older schemas', add_missing_columns),
+    (2, 'No schema change (withdrawn step)', retired_step),
+    (3, 'Maintain intern counters with triggers', install_intern_counter_triggers),
+    (4, 'Maintain notification counters with triggers', install_notification_counter_triggers),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def run_migrations(conn):
+    """Apply pending migrations in order, each in its own transaction"""
+    cursor = conn.cursor()
+    if conn.in_transaction:
         conn.commit()
-        print("Migration completed successfully!")
-        print(f"Processed {len(unique_requests)} unique requests (removed {len(existing_requests) - len(unique_requests)} duplicates)")
-        print(f"Processed {len(existing_interns)} interns")
-        
-    except Exception as e:
-        print(f"Migration failed: {str(e)}")
-        conn.rollback()
-        # Restore backup
-        if os.path.exists(BACKUP_PATH):
-            print("Restoring backup...")
-            shutil.copy2(BACKUP_PATH, DB_PATH)
-        raise e
+
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if get_schema_version(conn) >= version:
+            continue
+
+        started = time.perf_counter()
+        # Take the write lock first and re-check, in case another worker got here
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            print(f"Applying migration {version}: {description}")
+            step(cursor)
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Migration {version} failed: {str(e)}")
+            raise
+        print(f"Migration {version} applied in {time.perf_counter() - started:.3f}s")
+        applied.append(version)
+
+    return applied
+
+
+def migrate_database():
+    """Create missing tables, apply pending migrations and ensure indexes"""
+    conn = database.get_db_connection()
+    try:
+        before = get_schema_version(conn)
     finally:
         conn.close()
 
+    database.init_database()
+
+    conn = database.get_db_connection()
+    try:
+        after = get_schema_version(conn)
+    finally:
+        conn.close()
+
+    if after == before:
+        print(f"Database is up to date at schema version {after}.")
+    else:
+        print(f"Migrated database from schema version {before} to {after}.")
+
+
+def print_status():
+    """Print the current and latest schema versions with any pending migrations"""
+    conn = database.get_db_connection()
+    try:
+        current = get_schema_version(conn)
+    finally:
+        conn.close()
+
+    print(f"Database: {database.DB_PATH}")
+    print(f"Schema version: {current} (latest {LATEST_VERSION})")
+    for version, description, _ in MIGRATIONS:
+        if version > current:
+            print(f"  pending {version}: {description}")
+
+
+def reconcile_counters():
+    """Recompute intern and notification counters from the data"""
+    repaired = database.reconcile_intern_counters()
+    print(f"Repaired counters for {repaired} intern(s).")
+    repaired = database.reconcile_notification_counters()
+    print(f"Repaired notification counters for {repaired} inbox(es).")
+
+
 if __name__ == "__main__":
-    migrate_database()
+    if '--status' in sys.argv[1:]:
+        print_status()
+    elif '--reconcile-counters' in sys.argv[1:]:
+        reconcile_counters()
+    else:
+        migrate_database()
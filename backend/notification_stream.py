@@ -0,0 +1,170 @@
+"""
+Server-sent event stream of a recipient's notifications.
+
+Every insert, update or delete on notifications bumps its table_versions
+counter, whichever gunicorn worker makes the write. Each worker runs one
+watcher thread that reads that counter every SSE_POLL_INTERVAL seconds
+while at least one stream is open and wakes the worker's streams when it
+changes. A stream then fetches the recipient's notifications newer than the
+last one it sent and, if it moved, the unread count. Idle clients therefore
+cost one primary-key read per worker per interval instead of two requests
+each every 30 seconds.
+
+Events sent:
+
+    event: notification   id: <notification id>   data: <notification JSON>
+    event: count          data: {"count": <unread count>}
+
+plus a comment line every SSE_HEARTBEAT seconds to keep proxies from
+closing the connection. A stream ends after SSE_MAX_DURATION seconds. The
+browser then reconnects with Last-Event-ID set to the last notification id
+it received, and the new stream resumes from there.
+
+Each open stream holds a worker thread, so run gunicorn with the gthread or
+gevent worker class.
+"""
+import os
+import threading
+import time
+
+import database
+
+SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL_MS', '250')) / 1000
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', '15'))
+SSE_MAX_DURATION = float(os.environ.get('SSE_MAX_DURATION', '300'))
+
+# Client reconnect delay, and most notifications sent per query while catching up
+SSE_RETRY_MS = 3000
+SSE_BATCH_SIZE = 100
+
+
+class NotificationWatcher:
+    """Per-process watcher publishing the notifications change counter to local streams"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.version = None
+        self._condition = threading.Condition()
+        self._subscribers = 0
+        self._polls = 0
+        self._changes = 0
+        self._thread = threading.Thread(target=self._run, name='notification-watcher', daemon=True)
+        self._thread.start()
+
+    def _read_version(self):
+        return database.get_table_versions(('notifications',)).get('notifications')
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._subscribers:
+                    self._condition.wait()
+            try:
+                version = self._read_version()
+            except Exception as e:
+                print(f"Notification watcher error: {str(e)}")
+                version = self.version
+            with self._condition:
+                self._polls += 1
+                if version != self.version:
+                    self.version = version
+                    self._changes += 1
+                    self._condition.notify_all()
+            time.sleep(SSE_POLL_INTERVAL)
+
+    def subscribe(self):
+        """Register an open stream and return the current version"""
+        with self._condition:
+            if not self._subscribers:
+                # Not polled while idle, so the last known version may be stale
+                self.version = self._read_version()
+            self._subscribers += 1
+            self._condition.notify_all()
+            return self.version
+
+    def unsubscribe(self):
+        with self._condition:
+            self._subscribers -= 1
+
+    def wait(self, version, timeout):
+        """Block until the version differs from version or timeout passes; return the current version"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def stats(self):
+        """Stream metrics for this worker"""
+        with self._condition:
+            return {
+                'pid': self.pid,
+                'streams': self._subscribers,
+                'polls': self._polls,
+                'changes': self._changes,
+                'poll_interval_ms': SSE_POLL_INTERVAL * 1000,
+            }
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher():
+    """Get the watcher for the current process (restarted after fork)"""
+    global _watcher
+    watcher = _watcher
+    if watcher is None or watcher.pid != os.getpid():
+        with _watcher_lock:
+            watcher = _watcher
+            if watcher is None or watcher.pid != os.getpid():
+                watcher = _watcher = NotificationWatcher()
+    return watcher
+
+
+def get_stream_stats():
+    """Metrics for the current process's watcher (None before the first stream)"""
+    watcher = _watcher
+    if watcher is None or watcher.pid != os.getpid():
+        return None
+    return watcher.stats()
+
+
+def _event(event, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event}')
+    lines.extend(f'data: {line}' for line in data.splitlines())
+    return '\n'.join(lines) + '\n\n'
+
+
+def notification_events(recipient_type, recipient_id, last_id, dumps):
+    """Generate the event stream for one inbox, starting after notification last_id
+
+    Runs outside the request context, so every database call checks a
+    connection out of the pool and returns it straight away.
+    """
+    watcher = get_watcher()
+    version = watcher.subscribe()
+    try:
+        yield f'retry: {SSE_RETRY_MS}\n\n'
+        deadline = time.monotonic() + SSE_MAX_DURATION
+        sent_count = None
+        while True:
+            notifications = database.get_notifications_since(recipient_type, recipient_id, last_id, SSE_BATCH_SIZE)
+            for notification in notifications:
+                last_id = notification['id']
+                yield _event('notification', dumps(notification), last_id)
+            count = database.get_unread_notification_count(recipient_type, recipient_id)
+            if count != sent_count:
+                sent_count = count
+                yield _event('count', dumps({'count': count}))
+            if len(notifications) == SSE_BATCH_SIZE:
+                continue  # still catching up
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            current = watcher.wait(version, min(SSE_HEARTBEAT, remaining))
+            if current == version:
+                yield ': heartbeat\n\n'
+            version = current
+    finally:
+        watcher.unsubscribe()
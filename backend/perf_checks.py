@@ -0,0 +1,1736 @@
+#!/usr/bin/env python3
+"""
+Performance checks and benchmarks for the backend.
+
+Every check runs against a throwaway database in a temporary directory, never
+against smartcard.db. Run a single check by name, or all checks with no
+arguments:
+
+    python perf_checks.py interns-query-count
+    python perf_checks.py query-plans
+    python perf_checks.py write-queue
+    python perf_checks.py write-queue-failures
+    python perf_checks.py connection-leaks
+    python perf_checks.py intern-counters
+    python perf_checks.py pagination
+    python perf_checks.py list-projection
+    python perf_checks.py row-decoder
+    python perf_checks.py json-encoder
+    python perf_checks.py conditional-get
+    python perf_checks.py compression
+    python perf_checks.py static-assets
+    python perf_checks.py read-cache
+    python perf_checks.py notification-counters
+    python perf_checks.py notification-stream
+    python perf_checks.py notification-inbox
+    python perf_checks.py notification-retention
+    python perf_checks.py scheduler
+    python perf_checks.py backup
+    python perf_checks.py demo-expiry
+    python perf_checks.py bulk-mutations
+    python perf_checks.py bulk-import
+    python perf_checks.py bulk-export
+"""
+import gc
+import io
+import multiprocessing
+import os
+import random
+import signal
+import sqlite3
+import sys
+import tempfile
+import json
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import backup_database
+import database
+import db_pool
+import import_records
+import purge_notifications
+from read_cache import copy_page
+import scheduler
+import write_queue
+
+# Checks start their own schedulers; keep the app's from running jobs on their databases
+scheduler.SCHEDULER_ENABLED = False
+
+
+def use_temp_database():
+    """Point database.py at a fresh, empty database file and create the schema"""
+    tmp_dir = tempfile.mkdtemp(prefix='smartcard_perf_')
+    database.DB_PATH = os.path.join(tmp_dir, 'perf.db')
+    database.init_database()
+    return database.DB_PATH
+
+
+def seed_interns(count, requests_per_intern=3, demos_per_intern=2):
+    """Insert interns, each with assigned customer requests and demo accounts"""
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        expires_at = datetime.now() + timedelta(days=10)
+        offset = cursor.execute('SELECT COUNT(*) FROM interns').fetchone()[0]
+        for n in range(offset, offset + count):
+            cursor.execute('''
+                INSERT INTO interns (name, username, password, email, specialization, integrations)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (f'Intern {n}', f'intern{n}', 'secret', f'intern{n}@example.com', 'analytics', '["Slack"]'))
+            intern_id = cursor.lastrowid
+            for r in range(requests_per_intern):
+                cursor.execute('''
+                    INSERT INTO free_trial_requests (
+                        first_name, last_name, email, company, phone, industry_domain,
+                        account_type, selected_integrations, status, assigned_intern_id
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', ('Customer', str(r), f'customer{n}_{r}@example.com', f'Company {n % 7}', '555-0100',
+                      'retail', 'ld', '["HubSpot"]', 'assigned', intern_id))
+            for d in range(demos_per_intern):
+                cursor.execute('''
+                    INSERT INTO demo_credentials (
+                        email, username, password, first_name, last_name, company, phone,
+                        industry_domain, selected_integrations, expires_at, assigned_intern_id
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (f'demo{n}_{d}@example.com', f'demo{n}_{d}', 'secret', 'Demo', str(d), f'Company {n % 5}',
+                      '555-0101', 'retail', '["Zoom"]', expires_at, intern_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# SQL statements executed on pooled connections while a measurement is running
+_traced_statements = []
+
+
+def _trace_connection(conn):
+    conn.set_trace_callback(_traced_statements.append)
+
+
+db_pool.connect_hooks.append(_trace_connection)
+
+
+def count_queries(func):
+    """Run func and return how many SQL statements it executed"""
+    del _traced_statements[:]
+    func()
+    count = len(_traced_statements)
+    del _traced_statements[:]
+    return count
+
+
+def check_interns_query_count():
+    """GET /api/admin/interns must run the same number of queries for 5 or 200 interns"""
+    use_temp_database()
+    from app import app
+    client = app.test_client()
+
+    def fetch():
+        response = client.get('/api/admin/interns')
+        assert response.status_code == 200, response.data
+
+    results = {}
+    seeded = 0
+    for total in (5, 50, 200):
+        seed_interns(total - seeded)
+        seeded = total
+        results[total] = count_queries(fetch)
+        print(f"  {total:>4} interns -> {results[total]} queries")
+
+    if len(set(results.values())) != 1:
+        print("FAIL: query count grows with the number of interns")
+        return False
+    print("OK: query count is constant")
+    return True
+
+
+def exercise_database_functions():
+    """Call every query function in database.py once against seeded data"""
+    seed_interns(20)
+    intern_id = 1
+    request_id = 1
+    demo_id = 1
+
+    database.get_all_free_trial_requests()
+    database.get_requests_for_intern(intern_id)
+    database.get_all_interns()
+    database.get_intern_by_credentials('intern0', 'secret')
+    database.get_intern_customer_companies(intern_id)
+    database.get_intern_customer_requests(intern_id)
+    database.get_intern_assigned_count(intern_id)
+    database.get_interns_with_assignments()
+    database.get_companies_assigned_to_interns()
+    database.get_all_companies()
+    database.get_all_demo_accounts()
+    database.get_demo_accounts_for_intern(intern_id)
+    for table, list_rows in (('free_trial_requests', database.list_free_trial_requests),
+                             ('interns', database.list_interns_with_assignments),
+                             ('demo_credentials', database.list_demo_accounts)):
+        for sort in database.PAGE_SORTS[table]:
+            for order in ('asc', 'desc'):
+                _, pagination = list_rows(limit=5, sort=sort, order=order)
+                list_rows(limit=5, after=pagination['next_after'], sort=sort, order=order)
+
+    database.update_project_details(request_id, {'dashboards_requested': 2})
+    database.update_intern_note(request_id, 'note')
+    database.update_intern_credentials(intern_id, 'intern0', 'secret')
+    database.assign_intern_to_request(request_id, 2)
+    database.update_request_status(request_id, 'completed')
+    database.update_request_status(request_id, 'assigned')
+    database.update_dashboard_counts(request_id, 3, 1)
+    database.update_customer_basic_info(request_id, {
+        'first_name': 'Customer', 'last_name': 'Renamed', 'email': 'renamed@example.com',
+        'company': 'Company 1', 'phone': '555-0100', 'industry_domain': 'retail',
+    })
+    database.create_demo_credentials({
+        'firstName': 'Plan', 'lastName': 'Check', 'email': 'plan@example.com', 'company': 'Plan Co',
+        'phone': '555-0102', 'industryDomain': 'retail',
+    })
+    database.update_demo_account(demo_id, {
+        'first_name': 'Demo', 'last_name': 'Renamed', 'email': 'demo-renamed@example.com',
+        'company': 'Company 2', 'phone': '555-0101', 'industry_domain': 'retail',
+    })
+    database.regenerate_demo_credentials(demo_id)
+    database.assign_intern_to_demo(demo_id, 3)
+    database.update_demo_admin_note(demo_id, 'admin note')
+    database.update_demo_intern_note(demo_id, 'intern note')
+    database.bulk_assign_requests([2, 3], 4)
+    database.bulk_assign_requests([2], None)
+    database.bulk_update_request_status([2, 3], 'completed')
+    database.bulk_assign_demos([2, 3], 4)
+    database.bulk_assign_demos([2], None)
+
+    notification_id = database.create_notification('intern', intern_id, 'Title', 'Message')
+    database.create_notification('admin', None, 'Title', 'Message')
+    database.get_notifications('intern', intern_id)
+    database.get_notifications('admin', None, unread_only=True)
+    database.get_unread_notification_count('intern', intern_id)
+    database.get_unread_notification_count('admin')
+    database.get_notifications_since('intern', intern_id, notification_id - 1)
+    database.get_notifications_since('admin', None, 0)
+    database.get_notification_inbox('intern', intern_id, 20, before_id=notification_id)
+    database.get_notification_inbox('intern', intern_id, 20, unread_only=True, since_id=notification_id - 1)
+    database.get_latest_notification_id()
+    database.mark_notification_as_read(notification_id)
+    database.mark_all_notifications_as_read('intern', intern_id)
+    database.mark_all_notifications_as_read('admin')
+    database.delete_notification(notification_id)
+
+    database.delete_demo_account(demo_id)
+    database.delete_customer_record(request_id)
+    database.bulk_delete_demos([2, 3])
+    database.bulk_delete_requests([2, 3])
+    database.delete_intern_record(intern_id)
+
+
+def full_table_scans(conn, statement):
+    """Return the EXPLAIN QUERY PLAN lines that scan a table without an index"""
+    plan = conn.execute(f'EXPLAIN QUERY PLAN {statement}').fetchall()
+    return [row['detail'] for row in plan
+            if row['detail'].startswith('SCAN ') and ' INDEX ' not in row['detail'] + ' '
+            and row['detail'] != 'SCAN CONSTANT ROW']
+
+
+def check_query_plans():
+    """Every SELECT/UPDATE/DELETE issued by database.py must be served by an index"""
+    use_temp_database()
+
+    del _traced_statements[:]
+    exercise_database_functions()
+    statements = []
+    for statement in _traced_statements:
+        statement = ' '.join(statement.split())
+        if statement.split(' ', 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE') and statement not in statements:
+            statements.append(statement)
+    del _traced_statements[:]
+
+    # The demo expiry sweep issued by POST /api/admin/refresh-demo-expiry
+    statements.append("UPDATE demo_credentials SET is_active = 0 "
+                      "WHERE expires_at < datetime('now') AND is_active = 1")
+
+    conn = database.get_db_connection()
+    failures = 0
+    try:
+        for statement in statements:
+            scans = full_table_scans(conn, statement)
+            if scans:
+                failures += 1
+                print(f"  FULL SCAN ({'; '.join(scans)}): {statement}")
+    finally:
+        conn.close()
+
+    print(f"  checked {len(statements)} distinct statements")
+    if failures:
+        print(f"FAIL: {failures} statement(s) scan a table without an index")
+        return False
+    print("OK: every statement uses an index")
+    return True
+
+
+def _write_worker(enable_queue, threads, operations, interns, results):
+    """One simulated gunicorn worker: several threads issuing small writes"""
+    write_queue.WRITE_QUEUE_ENABLED = enable_queue
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def run(thread_index):
+        local = []
+        for n in range(operations):
+            request_id = (thread_index * operations + n) % (interns * 3) + 1
+            started = time.perf_counter()
+            if n % 3 == 0:
+                database.assign_intern_to_request(request_id, n % interns + 1)
+            elif n % 3 == 1:
+                database.update_request_status(request_id, 'completed' if n % 2 else 'assigned')
+            else:
+                database.create_notification('intern', n % interns + 1, 'Benchmark', 'Write benchmark')
+            local.append(time.perf_counter() - started)
+        with latencies_lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=run, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put(latencies)
+
+
+def run_write_benchmark(enable_queue, processes=4, threads=8, operations=150, interns=20):
+    use_temp_database()
+    seed_interns(interns)
+    results = multiprocessing.get_context('fork').Queue()
+    workers = [
+        multiprocessing.get_context('fork').Process(
+            target=_write_worker, args=(enable_queue, threads, operations, interns, results))
+        for _ in range(processes)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    latencies = []
+    for _ in workers:
+        latencies.extend(results.get())
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'writes': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+def benchmark_write_queue():
+    """Write throughput and latency of 4 processes x 8 threads, with and without group commit"""
+    for label, enabled in (('direct commits', False), ('group commit queue', True)):
+        result = run_write_benchmark(enabled)
+        print(f"  {label:<20} {result['writes']} writes  {result['throughput']:8.0f} writes/s  "
+              f"p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  max {result['max_ms']:7.2f} ms")
+    return True
+
+
+def check_write_queue_failures(timeout=0.3):
+    """Callers must get an error, never hang, when the writer cannot connect, dies or stalls"""
+    db_path = use_temp_database()
+
+    def timed_submit(writer, operation):
+        started = time.perf_counter()
+        try:
+            return writer.submit(operation), time.perf_counter() - started
+        except BaseException as e:
+            return e, time.perf_counter() - started
+
+    # No connection: the path's directory does not exist
+    broken = write_queue.WriteQueue(os.path.join(db_path + '.missing', 'perf.db'), timeout=timeout)
+    no_connection, no_connection_wait = timed_submit(broken, lambda cursor: 1)
+
+    # The writer thread stops mid-batch; the queued write behind it fails too
+    writer = write_queue.WriteQueue(db_path, timeout=timeout)
+    gate = threading.Event()
+
+    def stop_writer(cursor):
+        gate.wait()
+        raise SystemExit('writer stopped')
+
+    queued = []
+    first = threading.Thread(target=lambda: queued.append(timed_submit(writer, stop_writer)))
+    first.start()
+    time.sleep(0.05)
+    second = threading.Thread(target=lambda: queued.append(timed_submit(writer, lambda cursor: 1)))
+    second.start()
+    time.sleep(0.05)
+    gate.set()
+    first.join()
+    second.join()
+    write_queue._queues[db_path] = writer
+    restarted = write_queue.get_write_queue(db_path) is not writer
+    after_restart, _ = timed_submit(write_queue.get_write_queue(db_path), lambda cursor: 2)
+
+    # A stalled writer: the caller gives up, and its abandoned write is skipped
+    writer = write_queue.WriteQueue(db_path, timeout=timeout)
+    ran = []
+    slow = threading.Thread(target=lambda: queued.append(timed_submit(writer, lambda cursor: time.sleep(timeout * 2))))
+    slow.start()
+    time.sleep(0.05)
+    stalled, stalled_wait = timed_submit(writer, lambda cursor: ran.append(1))
+    slow.join()
+    time.sleep(timeout)
+
+    stopped = [result for result, _ in queued[:2]]
+    print(f"  no connection: {type(no_connection).__name__} after {no_connection_wait * 1000:.0f} ms")
+    print(f"  writer stopped: {', '.join(type(result).__name__ for result in stopped)}; "
+          f"restarted {restarted}, next write returned {after_restart!r}")
+    print(f"  stalled writer: {stalled} after {stalled_wait * 1000:.0f} ms, abandoned write ran {len(ran)} time(s)")
+
+    ok = isinstance(no_connection, sqlite3.OperationalError) and no_connection_wait < timeout \
+        and len(stopped) == 2 and all(isinstance(result, SystemExit) for result in stopped) \
+        and restarted and after_restart == 2 \
+        and isinstance(stalled, Exception) and 'Timed out' in str(stalled) and not ran
+    print("OK: write queue failures reach every caller" if ok else "FAIL: write queue failure handling mismatch")
+    return ok
+
+
+def check_connection_leaks(size=2):
+    """Outside a request, a failed query must release its connection, and a leaked one must come back"""
+    db_path = use_temp_database()
+    pool = db_pool._pools[db_path] = db_pool.ConnectionPool(db_path, size=size, timeout=2)
+
+    failures = 0
+    for _ in range(size * 3):
+        try:
+            database.get_intern_by_credentials(['not', 'a', 'string'], 'secret')
+        except sqlite3.Error:
+            failures += 1
+    released = pool.stats()
+
+    # Checkouts dropped without close(), one of them kept alive by a reference cycle
+    database.get_db_connection()
+    cycle = [database.get_db_connection()]
+    cycle.append(cycle)
+    del cycle
+    gc.collect()
+    started = time.perf_counter()
+    database.get_all_companies()
+    database.get_requests_for_intern(1)
+    waited = time.perf_counter() - started
+    reclaimed = pool.stats()
+    del db_pool._pools[db_path]
+
+    print(f"  {failures} failed queries, then {released['in_use']} of {size} connections in use, "
+          f"{released['leaked']} leaked")
+    print(f"  {reclaimed['leaked']} unclosed checkouts returned to the pool; "
+          f"next queries waited {waited * 1000:.1f} ms")
+
+    ok = failures == size * 3 and released['in_use'] == 0 and released['leaked'] == 0 \
+        and reclaimed['leaked'] == 2 and reclaimed['in_use'] == 0 and reclaimed['timeouts'] == 0
+    print("OK: pooled connections are always returned" if ok else "FAIL: connection pool leak")
+    return ok
+
+
+def check_intern_counters():
+    """Trigger-maintained intern counters must match a full recount after every kind of write"""
+    use_temp_database()
+    seed_interns(10)
+    database.update_request_status(1, 'completed')
+    database.update_request_status(2, 'completed')
+    database.assign_intern_to_request(2, 5)
+    database.update_request_status(2, 'assigned')
+    database.update_request_status(4, 'completed')
+    database.assign_intern_to_demo(1, 6)
+    database.delete_customer_record(4)
+    database.delete_demo_account(3)
+
+    drifted = database.reconcile_intern_counters()
+    print(f"  {drifted} intern(s) drifted from a full recount")
+
+    conn = database.get_db_connection()
+    try:
+        conn.execute('UPDATE interns SET assigned_count = 0, completed_count = 0')
+        conn.commit()
+    finally:
+        conn.close()
+    repaired = database.reconcile_intern_counters()
+    print(f"  reconcile repaired {repaired} of 10 zeroed intern(s)")
+
+    if drifted or repaired != 10:
+        print("FAIL: intern counters do not match the assignments")
+        return False
+    print("OK: intern counters match the assignments")
+    return True
+
+
+def check_pagination():
+    """Walking every keyset page must return each row exactly once, in the unpaginated order"""
+    use_temp_database()
+    seed_interns(40)
+    from app import app
+    client = app.test_client()
+
+    ok = True
+    for endpoint, table in (('/api/admin/customers', 'free_trial_requests'),
+                            ('/api/admin/interns', 'interns'),
+                            ('/api/admin/demos', 'demo_credentials')):
+        for sort in database.PAGE_SORTS[table]:
+            for order in ('asc', 'desc'):
+                expected = [row['id'] for row in
+                            client.get(f'{endpoint}?sort={sort}&order={order}').get_json()['data']]
+                seen = []
+                pages = 0
+                query = f'{endpoint}?limit=7&sort={sort}&order={order}'
+                while query:
+                    body = client.get(query).get_json()
+                    seen += [row['id'] for row in body['data']]
+                    pages += 1
+                    after = body['pagination']['next_after']
+                    query = f'{endpoint}?limit=7&sort={sort}&order={order}&after={after}' if after else None
+                if seen != expected:
+                    ok = False
+                    print(f"  MISMATCH {endpoint} sort={sort} order={order}")
+                else:
+                    print(f"  {endpoint:<22} {sort:<10} {order:<4} {len(seen):>4} rows in {pages} pages")
+
+    if client.get('/api/admin/customers?limit=5&after=not-a-cursor').status_code != 400:
+        ok = False
+        print("  invalid cursor was not rejected")
+
+    # Well-formed JSON whose sort value or id SQLite cannot bind
+    for sort_value, row_id in (([1, 2], 5), ({'a': 1}, 5), ('2026-01-01', [5]), (2 ** 64, 5), ('x', True)):
+        after = database.encode_page_cursor(sort_value, row_id)
+        status = client.get(f'/api/admin/customers?limit=5&after={after}').status_code
+        if status != 400:
+            ok = False
+            print(f"  cursor ({sort_value!r}, {row_id!r}) returned {status} instead of 400")
+
+    print("OK: pages cover every row once" if ok else "FAIL: pagination skipped or repeated rows")
+    return ok
+
+
+def check_list_projection():
+    """fields= must return only the requested fields, and credentials only when named"""
+    use_temp_database()
+    seed_interns(400, requests_per_intern=5)
+    from app import app
+    client = app.test_client()
+
+    conn = database.get_db_connection()
+    try:
+        conn.execute("UPDATE free_trial_requests SET api_password = 'secret', api_key = 'key', "
+                     "use_cases_list = '[\"a\", \"b\"]', project_info = '{\"phase\": 1}'")
+        conn.commit()
+    finally:
+        conn.close()
+
+    def fetch(query):
+        started = time.perf_counter()
+        response = client.get(query)
+        elapsed = (time.perf_counter() - started) * 1000
+        assert response.status_code == 200, response.data
+        return response.get_json()['data'], len(response.data), elapsed
+
+    ok = True
+    full, full_bytes, full_ms = fetch('/api/admin/customers')
+    if any('api_password' in row or 'api_key' in row for row in full):
+        ok = False
+        print("  credentials returned without being requested")
+
+    fields = 'id,first_name,last_name,company,status,intern_name'
+    narrow, narrow_bytes, narrow_ms = fetch(f'/api/admin/customers?fields={fields}')
+    if any(set(row) != set(fields.split(',')) | {'created_at'} for row in narrow):
+        ok = False
+        print("  projection returned unexpected fields")
+
+    with_credentials, _, _ = fetch('/api/admin/customers?fields=id,api_key&limit=1')
+    if with_credentials[0].get('api_key') != 'key':
+        ok = False
+        print("  explicitly requested credentials were not returned")
+
+    if client.get('/api/admin/customers?fields=id,no_such_field').status_code != 400:
+        ok = False
+        print("  unknown field was not rejected")
+
+    interns, _, _ = fetch('/api/admin/interns?fields=id,name')
+    if any(set(row) != {'id', 'name', 'created_at'} for row in interns):
+        ok = False
+        print("  intern projection returned unexpected fields")
+
+    print(f"  all fields    {len(full)} rows  {full_bytes:>9} bytes  {full_ms:7.1f} ms")
+    print(f"  {len(fields.split(',')):>2} fields     {len(narrow)} rows  {narrow_bytes:>9} bytes  {narrow_ms:7.1f} ms")
+    print("OK: projections return only the requested fields" if ok else "FAIL: projection mismatch")
+    return ok
+
+
+def _legacy_decode(rows):
+    """The per-function loop the row decoder replaced: dict(row), then json.loads per column"""
+    result = []
+    for row in rows:
+        request_dict = dict(row)
+        try:
+            for field in database.JSON_COLUMNS['free_trial_requests']:
+                if request_dict.get(field):
+                    request_dict[field] = json.loads(request_dict[field])
+        except json.JSONDecodeError:
+            pass
+        result.append(request_dict)
+    return result
+
+
+def _measure(label, fetch, consume):
+    """CPU time and peak traced memory of building and consuming one result set"""
+    rows = fetch()
+    started = time.process_time()
+    consume(rows)
+    cpu_ms = (time.process_time() - started) * 1000
+
+    rows = fetch()
+    tracemalloc.start()
+    consume(rows)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  {label:<36} cpu {cpu_ms:8.1f} ms   peak {peak / 1024 / 1024:7.1f} MiB")
+    return cpu_ms, peak
+
+
+def benchmark_row_decoder(total=50000):
+    """Build 50k customer rows with the old per-row loop and with LazyRow, then group or serialize them"""
+    use_temp_database()
+    conn = database.get_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO free_trial_requests (
+                first_name, last_name, email, company, phone, industry_domain, account_type,
+                selected_integrations, use_cases_list, integrations_list, ld_session_dates, project_info
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [('Customer', str(n), f'bench{n}@example.com', f'Company {n % 50}', '555-0100', 'retail', 'ld',
+               '["HubSpot", "Slack"]', '["Onboarding", "Reporting"]', '["Zoom"]',
+               '["2024-01-01", "2024-02-01"]', '{"phase": "pilot", "seats": 25}')
+              for n in range(total)])
+        conn.commit()
+    finally:
+        conn.close()
+
+    def fetch():
+        conn = database.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM free_trial_requests')
+            return cursor, cursor.fetchall()
+        finally:
+            conn.close()
+
+    def group_by_company(decode):
+        def consume(fetched):
+            companies = {}
+            for row in decode(*fetched):
+                companies.setdefault(row['company'], []).append(row['id'])
+        return consume
+
+    def serialize(decode):
+        def consume(fetched):
+            json.dumps(decode(*fetched), default=lambda row: row.to_dict())
+        return consume
+
+    legacy = lambda cursor, rows: _legacy_decode(rows)
+    lazy = lambda cursor, rows: database.decode_table_rows('free_trial_requests', cursor, rows)
+
+    print(f"  {total} rows, 5 JSON columns each")
+    for scenario, consume in (('group by company', group_by_company), ('serialize', serialize)):
+        _measure(f'{scenario}: dict + json.loads loop', fetch, consume(legacy))
+        _measure(f'{scenario}: LazyRow', fetch, consume(lazy))
+    return True
+
+
+def benchmark_json_encoder(requests=20):
+    """GET /api/admin/customers throughput with Flask's default provider, the stdlib and the orjson provider"""
+    from flask.json.provider import DefaultJSONProvider
+    import json_provider
+
+    use_temp_database()
+    seed_interns(1000, requests_per_intern=5)
+    from app import app
+    client = app.test_client()
+
+    class FlaskDefaultJSONProvider(DefaultJSONProvider):
+        """Flask's default settings, taught only to serialize LazyRow"""
+        default = staticmethod(lambda o: o.to_dict() if isinstance(o, json_provider.LazyRow)
+                               else DefaultJSONProvider.default(o))
+
+    providers = [('flask default (sorted keys)', FlaskDefaultJSONProvider),
+                 ('stdlib, unsorted', json_provider.StdlibJSONProvider)]
+    if json_provider.orjson is not None:
+        providers.append(('orjson', json_provider.OrjsonJSONProvider))
+    else:
+        print("  orjson is not installed, skipping it")
+
+    original = app.json
+    try:
+        for label, provider_class in providers:
+            app.json = provider_class(app)
+            client.get('/api/admin/customers')
+            started = time.perf_counter()
+            for _ in range(requests):
+                response = client.get('/api/admin/customers')
+                assert response.status_code == 200, response.data
+            elapsed = time.perf_counter() - started
+            print(f"  {label:<28} {requests / elapsed:6.1f} req/s  {elapsed / requests * 1000:7.1f} ms/req  "
+                  f"{len(response.data)} bytes")
+    finally:
+        app.json = original
+    return True
+
+
+def check_conditional_get():
+    """Unchanged list endpoints must answer If-None-Match with 304 after a single counter query"""
+    use_temp_database()
+    seed_interns(300)
+    from app import app
+    client = app.test_client()
+
+    ok = True
+    writes = {
+        '/api/admin/customers': lambda: database.assign_intern_to_request(1, 2),
+        '/api/admin/demos': lambda: database.update_demo_admin_note(1, 'Checked'),
+        '/api/admin/interns': lambda: database.assign_intern_to_request(2, 3),
+    }
+    for endpoint, write in writes.items():
+        started = time.perf_counter()
+        first = client.get(endpoint)
+        full_ms = (time.perf_counter() - started) * 1000
+        etag = first.headers.get('ETag')
+
+        responses = []
+        started = time.perf_counter()
+        queries = count_queries(lambda: responses.append(client.get(endpoint, headers={'If-None-Match': etag})))
+        cached_ms = (time.perf_counter() - started) * 1000
+        unchanged = responses[0]
+
+        database.create_notification('admin', None, 'Unrelated', 'Does not touch the list tables')
+        still_unchanged = client.get(endpoint, headers={'If-None-Match': etag})
+        write()
+        changed = client.get(endpoint, headers={'If-None-Match': etag})
+
+        print(f"  {endpoint:<22} 200 in {full_ms:6.1f} ms, 304 in {cached_ms:5.1f} ms with {queries} query; "
+              f"after unrelated write {still_unchanged.status_code}, after list write {changed.status_code}")
+        if (unchanged.status_code, still_unchanged.status_code, changed.status_code) != (304, 304, 200) \
+                or queries != 1 or changed.headers.get('ETag') == etag:
+            ok = False
+
+    print("OK: unchanged lists are answered with 304" if ok else "FAIL: conditional GET mismatch")
+    return ok
+
+
+def check_compression():
+    """Large responses must be gzip-encoded losslessly, small ones and 304s left alone, streams flushed per chunk"""
+    import gzip
+    import zlib
+    import compression
+
+    use_temp_database()
+    seed_interns(500, requests_per_intern=5)
+    from app import app
+    client = app.test_client()
+
+    ok = True
+    gzip_headers = {'Accept-Encoding': 'gzip'}
+    for endpoint in ('/api/admin/customers', '/api/admin/demos', '/api/admin/interns'):
+        identity = client.get(endpoint)
+        started = time.perf_counter()
+        encoded = client.get(endpoint, headers=gzip_headers)
+        elapsed = (time.perf_counter() - started) * 1000
+        same = gzip.decompress(encoded.get_data()) == identity.get_data()
+        print(f"  {endpoint:<22} {len(identity.get_data()):>9} -> {len(encoded.get_data()):>8} bytes "
+              f"({encoded.headers.get('Content-Encoding')}) in {elapsed:6.1f} ms, identical: {same}")
+        not_modified = client.get(endpoint, headers={**gzip_headers, 'If-None-Match': encoded.headers['ETag']})
+        if encoded.headers.get('Content-Encoding') != 'gzip' or not same \
+                or 'Accept-Encoding' not in encoded.headers.get('Vary', '') \
+                or not_modified.status_code != 304 or 'Content-Encoding' in not_modified.headers:
+            ok = False
+
+    small = client.get('/api/admin/customers?limit=1&fields=id', headers=gzip_headers)
+    print(f"  small response: {len(small.get_data())} bytes, Content-Encoding {small.headers.get('Content-Encoding')}")
+    ok = ok and 'Content-Encoding' not in small.headers
+
+    # A generator response must be compressed as it is produced
+    rows = [f'{{"id": {i}, "company": "Company {i % 50}"}}\n'.encode() for i in range(2000)]
+
+    def streaming_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/x-ndjson')])
+        for offset in range(0, len(rows), 250):
+            yield b''.join(rows[offset:offset + 250])
+
+    response = []
+    middleware = compression.CompressionMiddleware(streaming_app)
+    chunks = middleware({'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT_ENCODING': 'gzip'},
+                        lambda status, headers, exc_info=None: response.append(dict(headers)))
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    flushed = all(decompressor.decompress(chunk) for chunk in list(chunks)[:-1])
+    streamed_ok = flushed and decompressor.unconsumed_tail == b'' and response[0].get('Content-Encoding') == 'gzip' \
+        and 'Content-Length' not in response[0]
+    print(f"  streamed ndjson: every chunk decodable on arrival: {streamed_ok}")
+    ok = ok and streamed_ok
+
+    stats = client.get('/api/admin/metrics').get_json()['data']['compression']
+    print(f"  metrics: {stats['responses']} responses, {stats['bytes_saved']} bytes saved, {stats['time_ms']} ms spent")
+
+    print("OK: responses are compressed when worthwhile" if ok else "FAIL: compression mismatch")
+    return ok
+
+
+def check_static_assets(requests=500):
+    """Frontend files must come from the startup manifest with the right caching, encoding and Range handling"""
+    import gzip
+    import app as app_module
+    from compression import get_compression_stats
+    from static_assets import StaticManifest
+
+    use_temp_database()
+    dist = tempfile.mkdtemp(prefix='smartcard_dist_')
+    os.makedirs(os.path.join(dist, 'assets'))
+    bundle = b''.join(b'export const value%d = "%d";\n' % (i, i) for i in range(5000))
+    files = {
+        'index.html': b'<!doctype html><div id="root"></div><script src="/assets/index-Ab12Cd34.js"></script>',
+        'assets/index-Ab12Cd34.js': bundle,
+        'assets/index-Ab12Cd34.js.gz': gzip.compress(bundle),
+        'assets/style-Ef56Gh78.css': b''.join(b'.rule%d { color: #%06x; }\n' % (i, i) for i in range(3000)),
+        'favicon.svg': b'<svg xmlns="http://www.w3.org/2000/svg"/>',
+    }
+    for name, data in files.items():
+        with open(os.path.join(dist, name), 'wb') as f:
+            f.write(data)
+
+    original = app_module.static_assets
+    app_module.static_assets = StaticManifest(dist)
+    client = app_module.app.test_client()
+    bundle_url = '/admin-portal/assets/index-Ab12Cd34.js'
+    try:
+        print(f"  manifest: {app_module.static_assets.stats()}")
+        index = client.get('/admin-portal/customers/42')
+        encoded = client.get(bundle_url, headers={'Accept-Encoding': 'gzip'})
+        identity = client.get(bundle_url)
+        revalidated = client.get(bundle_url, headers={'If-None-Match': identity.headers['ETag']})
+        partial = client.get(bundle_url, headers={'Range': 'bytes=10-19'})
+        icon = client.get('/user-portal/favicon.svg')
+        compressed_before = get_compression_stats()['responses']
+        stylesheet = client.get('/admin-portal/assets/style-Ef56Gh78.css', headers={'Accept-Encoding': 'gzip'})
+        compressed_after = get_compression_stats()['responses']
+
+        results = {
+            'client route serves index.html': index.get_data() == files['index.html']
+            and index.headers['Cache-Control'] == 'no-cache',
+            'hashed asset is immutable': 'immutable' in identity.headers['Cache-Control']
+            and identity.get_data() == bundle,
+            'gzip sibling is served as is': encoded.headers.get('Content-Encoding') == 'gzip'
+            and encoded.get_data() == files['assets/index-Ab12Cd34.js.gz']
+            and encoded.headers['ETag'] != identity.headers['ETag'],
+            'strong ETag revalidates': not identity.headers['ETag'].startswith('W/')
+            and revalidated.status_code == 304,
+            'Range returns 206': partial.status_code == 206 and partial.get_data() == bundle[10:20],
+            'unhashed file is revalidated': icon.headers['Cache-Control'] == 'no-cache'
+            and icon.get_data() == files['favicon.svg'],
+            'unbuilt asset gzipped at startup': stylesheet.headers.get('Content-Encoding') == 'gzip'
+            and gzip.decompress(stylesheet.get_data()) == files['assets/style-Ef56Gh78.css']
+            and compressed_after == compressed_before,
+        }
+        for label, passed in results.items():
+            print(f"  {label:<34} {'yes' if passed else 'NO'}")
+
+        for url, headers in (('/admin-portal', {}), (bundle_url, {'Accept-Encoding': 'gzip'}),
+                             ('/admin-portal/assets/style-Ef56Gh78.css', {'Accept-Encoding': 'gzip'})):
+            started = time.perf_counter()
+            for _ in range(requests):
+                client.get(url, headers=headers).close()
+            elapsed = time.perf_counter() - started
+            print(f"  {url:<38} {requests / elapsed:7.0f} req/s")
+    finally:
+        app_module.static_assets = original
+
+    ok = all(results.values())
+    print("OK: static assets are served from the manifest" if ok else "FAIL: static asset mismatch")
+    return ok
+
+
+def _insert_demo_company(db_path, company):
+    """Another process (e.g. a second gunicorn worker) writing a new company"""
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        INSERT INTO demo_credentials (email, username, password, first_name, last_name, company, phone,
+                                      industry_domain, selected_integrations, expires_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ('other@example.com', 'other', 'secret', 'Other', 'Worker', company, '555-0102', 'retail', '[]',
+          datetime.now() + timedelta(days=10)))
+    conn.commit()
+    conn.close()
+
+
+def check_read_cache(calls=50):
+    """Cached read models must hit after one counter query and see writes made by other processes"""
+    db_path = use_temp_database()
+    seed_interns(2000)
+    database.read_cache.clear()
+
+    # The intern list as GET /api/admin/interns asks for it: whole, and one projected page
+    intern_page = {'limit': 50, 'sort': 'name', 'order': 'asc', 'fields': ['id', 'name', 'customer_companies']}
+    reads = (
+        ('get_all_companies', database.get_all_companies, {}),
+        ('get_companies_assigned_to_interns', database.get_companies_assigned_to_interns, {}),
+        ('list_interns_with_assignments', database.list_interns_with_assignments, {}),
+        ('  page of 50, 3 fields', database.list_interns_with_assignments, intern_page),
+    )
+    ok = True
+    for label, func, kwargs in reads:
+        started = time.perf_counter()
+        for _ in range(calls):
+            expected = func.__wrapped__(**kwargs)
+        uncached_ms = (time.perf_counter() - started) / calls * 1000
+        func(**kwargs)
+        started = time.perf_counter()
+        for _ in range(calls):
+            result = func(**kwargs)
+        cached_ms = (time.perf_counter() - started) / calls * 1000
+        queries = count_queries(lambda: func(**kwargs))
+        if func is database.list_interns_with_assignments:
+            expected = copy_page(expected)
+        same = result == expected
+        print(f"  {label:<36} {uncached_ms:7.2f} ms uncached, {cached_ms:6.2f} ms cached "
+              f"({queries} query per hit), same result: {same}")
+        ok = ok and same and queries == 1
+
+    from app import app
+    client = app.test_client()
+    hits = database.read_cache.stats()['hits']
+    served = client.get('/api/admin/interns').get_json()['data']
+    endpoint_cached = database.read_cache.stats()['hits'] == hits + 1 \
+        and served == json.loads(json.dumps(database.list_interns_with_assignments()[0], default=str))
+
+    # Reassigning a demo is seen by the next intern list
+    database.assign_intern_to_demo(1, 2)
+    reassigned = any(account['id'] == 1 for intern in database.list_interns_with_assignments()[0]
+                     if intern['id'] == 2 for account in intern['demo_accounts'])
+    print(f"  GET /api/admin/interns served from the cache: {endpoint_cached}; "
+          f"demo reassignment seen: {reassigned}")
+    ok = ok and endpoint_cached and reassigned
+
+    companies = database.get_all_companies()
+    companies.append('Modified by caller')
+    unaffected = 'Modified by caller' not in database.get_all_companies()
+
+    process = multiprocessing.get_context('fork').Process(target=_insert_demo_company,
+                                                          args=(db_path, 'Fresh Company'))
+    process.start()
+    process.join()
+    coherent = 'Fresh Company' in database.get_all_companies()
+    print(f"  caller mutations stay private: {unaffected}; write from another process seen: {coherent}")
+    print(f"  stats: {database.read_cache.stats()}")
+
+    ok = ok and unaffected and coherent
+    print("OK: cached read models stay coherent" if ok else "FAIL: read cache mismatch")
+    return ok
+
+
+def check_notification_counters(notifications=200000, calls=200):
+    """Unread counts must come from one counter row and match a full recount after every kind of write"""
+    use_temp_database()
+    conn = database.get_db_connection()
+    try:
+        # Bulk seed through the triggers: 50 intern inboxes plus the admin inbox
+        conn.executemany('''
+            INSERT INTO notifications (recipient_type, recipient_id, title, message, read_status)
+            VALUES (?, ?, 'Seed', 'Seeded notification', ?)
+        ''', [('intern', n % 50 + 1, n % 3 == 0) if n % 10 else ('admin', None, n % 20 == 0)
+              for n in range(notifications)])
+        conn.commit()
+    finally:
+        conn.close()
+
+    database.create_notification('intern', 7, 'New', 'One more')
+    database.mark_notification_as_read(1)
+    database.mark_notification_as_read(2)
+    database.mark_all_notifications_as_read('intern', 3)
+    database.mark_all_notifications_as_read('admin')
+    database.delete_notification(4)
+    database.delete_notification(5)
+
+    drifted = database.reconcile_notification_counters()
+    print(f"  {drifted} inbox(es) drifted from a full recount")
+
+    def recount(recipient_type, recipient_id):
+        conn = database.get_db_connection()
+        try:
+            return conn.execute('''
+                SELECT COUNT(*) FROM notifications
+                WHERE recipient_type = ? AND recipient_id IS ? AND read_status = 0
+            ''', (recipient_type, recipient_id)).fetchone()[0]
+        finally:
+            conn.close()
+
+    for label, func in (('COUNT(*) over notifications', recount),
+                        ('notification_counters row', database.get_unread_notification_count)):
+        started = time.perf_counter()
+        for n in range(calls):
+            func('intern', n % 50 + 1)
+        print(f"  {label:<28} {(time.perf_counter() - started) / calls * 1000:7.3f} ms per unread count")
+
+    queries = count_queries(lambda: database.get_unread_notification_count('intern', 7))
+    ok = not drifted and queries == 1 and database.get_unread_notification_count('admin') == 0 \
+        and database.get_unread_notification_count('intern', 999) == 0
+    print("OK: notification counters match the notifications" if ok else "FAIL: notification counter mismatch")
+    return ok
+
+
+def _read_events(port, path, headers, events):
+    """Collect (arrival time, event name, id, data) from a server-sent event stream until it ends"""
+    import http.client
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', path, headers=headers)
+    response = conn.getresponse()
+    event = {}
+    for raw in response:
+        line = raw.decode().rstrip('\n')
+        if not line:
+            if 'event' in event:
+                events.append((time.perf_counter(), event['event'], event.get('id'), event.get('data')))
+            event = {}
+        elif not line.startswith(':'):
+            field, _, value = line.partition(': ')
+            event[field] = value
+    conn.close()
+
+
+def check_notification_stream(writes=5):
+    """Notifications written by another process must reach open streams within a second, and resume by id"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import notification_stream
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    use_temp_database()
+    from app import app
+    notification_stream.SSE_MAX_DURATION = 4
+    notification_stream.SSE_HEARTBEAT = 1
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    earlier = database.create_notification('intern', 1, 'Earlier', 'Written before the stream opened')
+    live, resumed = [], []
+    readers = [
+        threading.Thread(target=_read_events, args=(
+            server.server_port, '/api/notifications/intern/stream?recipient_id=1', {}, live)),
+        threading.Thread(target=_read_events, args=(
+            server.server_port, '/api/notifications/intern/stream?recipient_id=1',
+            {'Last-Event-ID': str(earlier - 1)}, resumed)),
+    ]
+    for reader in readers:
+        reader.start()
+    time.sleep(0.5)
+
+    context = multiprocessing.get_context('fork')
+    written = []
+    for n in range(writes):
+        written.append(time.perf_counter())
+        process = context.Process(target=database.create_notification,
+                                  args=('intern', 1, f'Live {n}', 'Written by another process'))
+        process.start()
+        process.join()
+        database.create_notification('intern', 2, 'Elsewhere', 'Another inbox')
+        time.sleep(0.3)
+    for reader in readers:
+        reader.join()
+    server.shutdown()
+
+    arrivals = [at for at, event, _, _ in live if event == 'notification']
+    latencies = [(arrived - sent) * 1000 for sent, arrived in zip(written, arrivals)]
+    resumed_ids = [int(event_id) for _, event, event_id, _ in resumed if event == 'notification']
+    counts = [json.loads(data)['count'] for _, event, _, data in live if event == 'count']
+    print(f"  live stream: {len(arrivals)} of {writes} notifications, latency "
+          f"max {max(latencies, default=0):.0f} ms, avg {sum(latencies) / max(len(latencies), 1):.0f} ms")
+    print(f"  unread counts pushed: {counts}")
+    print(f"  resumed stream ids: {resumed_ids}")
+    print(f"  watcher: {notification_stream.get_stream_stats()}")
+
+    ok = len(arrivals) == writes and max(latencies) < 1000 and counts == list(range(1, writes + 2)) \
+        and resumed_ids == [earlier] + list(range(earlier + 1, earlier + 2 * writes, 2))
+    print("OK: notifications are pushed within a second" if ok else "FAIL: notification stream mismatch")
+    return ok
+
+
+def check_notification_inbox(notifications=100000, polls=500):
+    """Inbox pages must cover every notification once, and an empty since_id poll must be a single index probe"""
+    use_temp_database()
+    conn = database.get_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO notifications (recipient_type, recipient_id, title, message, read_status)
+            VALUES (?, ?, 'Seed', 'Seeded notification', ?)
+        ''', [('intern', n % 20 + 1, n % 4 == 0) for n in range(notifications)])
+        conn.commit()
+        expected = [row[0] for row in conn.execute(
+            "SELECT id FROM notifications WHERE recipient_type = 'intern' AND recipient_id = 3 ORDER BY id DESC")]
+    finally:
+        conn.close()
+
+    seen, before_id, pages = [], None, 0
+    while True:
+        inbox = database.get_notification_inbox('intern', 3, 200, before_id=before_id)
+        seen.extend(row['id'] for row in inbox['notifications'])
+        pages += 1
+        if not inbox['pagination']['has_more']:
+            break
+        before_id = inbox['pagination']['next_before_id']
+    print(f"  paged {len(seen)} notifications in {pages} pages with before_id, complete: {seen == expected}")
+
+    latest_id = database.get_notification_inbox('intern', 3, 20)['pagination']['latest_id']
+    statements = []
+    queries = count_queries(lambda: statements.append(database.get_notification_inbox('intern', 3, 20, since_id=latest_id)))
+    empty = statements[0]
+    for label, func in (('newest 50 (old poll)', lambda: database.get_notifications('intern', 3, 50)),
+                        ('since_id, nothing new', lambda: database.get_notification_inbox('intern', 3, 50, since_id=latest_id))):
+        started = time.perf_counter()
+        for _ in range(polls):
+            func()
+        print(f"  {label:<24} {(time.perf_counter() - started) / polls * 1000:6.3f} ms per poll")
+
+    new_ids = [database.create_notification('intern', 3, 'New', f'Arrival {n}') for n in range(3)]
+    database.create_notification('intern', 4, 'Elsewhere', 'Another inbox')
+    arrived = database.get_notification_inbox('intern', 3, 20, since_id=latest_id)
+    print(f"  empty poll: {len(empty['notifications'])} rows, unread {empty['unread_count']}, {queries} queries; "
+          f"after 3 writes: ids {[row['id'] for row in arrived['notifications']]}")
+
+    unread_after_arrivals = database.get_unread_notification_count('intern', 3)
+
+    # More arrivals than one poll returns: following latest_id while has_more must pick up every one
+    burst = [database.create_notification('intern', 3, 'Burst', f'Arrival {n}') for n in range(45)]
+    polled, since_id, polls_needed = [], arrived['pagination']['latest_id'], 0
+    while True:
+        inbox = database.get_notification_inbox('intern', 3, 20, since_id=since_id)
+        polled.extend(row['id'] for row in inbox['notifications'])
+        since_id = inbox['pagination']['latest_id']
+        polls_needed += 1
+        if not inbox['pagination']['has_more']:
+            break
+    print(f"  burst of {len(burst)}: {len(polled)} picked up in {polls_needed} polls of 20, "
+          f"none missed: {polled == burst}")
+
+    ok = seen == expected and not empty['notifications'] and queries == 2 \
+        and empty['unread_count'] == unread_after_arrivals - 3 \
+        and [row['id'] for row in arrived['notifications']] == new_ids \
+        and arrived['pagination']['latest_id'] == new_ids[-1] \
+        and polled == burst and since_id == burst[-1] and polls_needed == 3
+    print("OK: inbox pages and polls by id" if ok else "FAIL: notification inbox mismatch")
+    return ok
+
+
+def check_notification_retention(notifications=100000, batch_size=500):
+    """Purging must remove exactly the expired rows in short batches, archive them and keep the counters right"""
+    db_path = use_temp_database()
+    conn = database.get_db_connection()
+    try:
+        # 90 days of history in id order, a quarter of it unread
+        minutes = 90 * 24 * 60
+        conn.executemany('''
+            INSERT INTO notifications (recipient_type, recipient_id, title, message, read_status, created_at)
+            VALUES (?, ?, 'Seed', 'Seeded notification', ?, datetime('now', ?))
+        ''', [('intern', n % 20 + 1, n % 4 != 0, f'-{minutes - n * minutes // notifications} minutes')
+              for n in range(notifications)])
+        conn.commit()
+        expected = conn.execute('''
+            SELECT COUNT(*) FROM notifications
+            WHERE read_status = 1 AND created_at < datetime('now', '-30 days')
+        ''').fetchone()[0]
+        revived = conn.execute('SELECT MIN(id) FROM notifications WHERE read_status = 1').fetchone()[0]
+    finally:
+        conn.close()
+
+    dry_run = purge_notifications.purge_notifications(30, dry_run=True)
+
+    # A row of the first batch is marked unread after it was read but before it is deleted
+    execute_write = database.execute_write
+
+    def revive_then_write(operation):
+        if operation.__name__ == 'delete_batch' and database.execute_write is revive_then_write:
+            database.execute_write = execute_write
+            execute_write(lambda cursor: cursor.execute(
+                'UPDATE notifications SET read_status = 0 WHERE id = ?', (revived,)))
+        return execute_write(operation)
+
+    database.execute_write = revive_then_write
+
+    # A concurrent writer measures how long the purge keeps it waiting
+    stop = threading.Event()
+    latencies = []
+
+    def writer():
+        while not stop.is_set():
+            started = time.perf_counter()
+            database.create_notification('intern', 1, 'Live', 'Written during the purge')
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.002)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    archive_path = os.path.join(os.path.dirname(db_path), 'archive.db')
+    try:
+        report = purge_notifications.purge_notifications(30, archive_path=archive_path, batch_size=batch_size)
+    finally:
+        database.execute_write = execute_write
+    stop.set()
+    thread.join()
+
+    conn = database.get_db_connection()
+    try:
+        left = conn.execute('SELECT COUNT(*) FROM notifications WHERE read_status = 1 AND created_at < ?',
+                            (report['read_cutoff'],)).fetchone()[0]
+        unread_kept = conn.execute('SELECT COUNT(*) FROM notifications WHERE read_status = 0').fetchone()[0]
+        revived_kept = conn.execute('SELECT COUNT(*) FROM notifications WHERE id = ?', (revived,)).fetchone()[0]
+    finally:
+        conn.close()
+    archive = sqlite3.connect(archive_path)
+    try:
+        archived = archive.execute('SELECT COUNT(*) FROM notifications WHERE read_status = 1').fetchone()[0]
+        revived_archived = archive.execute('SELECT COUNT(*) FROM notifications WHERE id = ?',
+                                           (revived,)).fetchone()[0]
+    finally:
+        archive.close()
+    drifted = database.reconcile_notification_counters()
+
+    print(f"  dry run matched {dry_run['rows_matched']} of {expected} expected rows")
+    print(f"  purged {report['rows_deleted']} rows in {report['batches']} batches, {report['duration_ms']} ms: "
+          f"{report['payload_bytes']} bytes of text, {report['bytes_reclaimed']} bytes of pages freed")
+    print(f"  concurrent writes: {len(latencies)}, max latency {max(latencies) * 1000:.1f} ms, "
+          f"{archived} rows archived, {drifted} inbox(es) drifted")
+    print(f"  row marked unread mid-purge: kept {bool(revived_kept)}, archived {bool(revived_archived)}")
+
+    purged = expected - 1
+    ok = dry_run['rows_matched'] == expected and report['rows_deleted'] == purged and report['complete'] \
+        and report['rows_archived'] == purged and archived == purged and not left and not drifted \
+        and unread_kept == notifications // 4 + len(latencies) + 1 and report['bytes_reclaimed'] > 0 \
+        and revived_kept and not revived_archived
+    print("OK: retention purge removed exactly the expired rows" if ok else "FAIL: notification retention mismatch")
+    return ok
+
+
+def _scheduler_worker(seconds, tick, lease_seconds):
+    """One simulated gunicorn worker running the scheduler with a probe job"""
+    def probe(max_seconds):
+        started = time.time()
+        time.sleep(0.03)
+        database.execute_write(lambda cursor: cursor.execute(
+            'INSERT INTO probe_runs (pid, started, finished) VALUES (?, ?, ?)', (os.getpid(), started, time.time())))
+        return 1
+
+    runner = scheduler.Scheduler([scheduler.Job('probe', 0.1, probe, 'Probe')], tick, lease_seconds, 0.2)
+    time.sleep(seconds)
+    runner.stop()
+
+
+def check_scheduler(processes=4, seconds=3.0, tick=0.05, lease_seconds=0.5):
+    """Exactly one worker at a time must run scheduled jobs, and another must take over when it dies"""
+    use_temp_database()
+    conn = database.get_db_connection()
+    try:
+        conn.execute('CREATE TABLE probe_runs (pid INTEGER, started REAL, finished REAL)')
+        conn.commit()
+    finally:
+        conn.close()
+
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_scheduler_worker, args=(seconds, tick, lease_seconds))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    # Kill the first leader without letting it hand the lease back
+    time.sleep(seconds / 3)
+    conn = database.get_db_connection()
+    try:
+        holder = conn.execute('SELECT holder FROM scheduler_leases').fetchone()[0]
+    finally:
+        conn.close()
+    killed_pid = int(holder.split(':')[1])
+    killed_at = time.time()
+    os.kill(killed_pid, signal.SIGKILL)
+    for worker in workers:
+        worker.join()
+
+    conn = database.get_db_connection()
+    try:
+        runs = conn.execute('SELECT pid, started, finished FROM probe_runs ORDER BY started').fetchall()
+        recorded = conn.execute("SELECT runs FROM scheduler_jobs WHERE name = 'probe'").fetchone()[0]
+    finally:
+        conn.close()
+    overlaps = sum(1 for previous, run in zip(runs, runs[1:]) if run['started'] < previous['finished'])
+    leaders = [run['pid'] for run in runs]
+    takeover = min((run['started'] for run in runs if run['pid'] != killed_pid and run['started'] > killed_at),
+                   default=None)
+    print(f"  {len(runs)} probe runs by {len(set(leaders))} leader(s), {overlaps} overlapping")
+    if takeover is not None:
+        print(f"  new leader ran a job {(takeover - killed_at) * 1000:.0f} ms after the leader was killed "
+              f"(lease {lease_seconds * 1000:.0f} ms)")
+
+    # The real jobs, run once by a scheduler in this process
+    conn = database.get_db_connection()
+    try:
+        conn.execute('''
+            INSERT INTO demo_credentials (email, username, password, first_name, last_name, company, phone,
+                                          industry_domain, selected_integrations, expires_at)
+            VALUES ('old@example.com', 'old', 'secret', 'Old', 'Demo', 'Expired Co', '555-0103', 'retail', '[]',
+                    datetime('now', '-1 day'))
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+    runner = scheduler.Scheduler(tick=tick, lease_seconds=lease_seconds)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        status = scheduler.get_scheduler_status()
+        if all(job['runs'] for job in status['jobs']):
+            break
+        time.sleep(tick)
+    runner.stop()
+    for job in status['jobs']:
+        print(f"  {job['name']:<20} {job['last_status']}  {job['last_duration_ms']} ms  rows {job['last_rows']}")
+
+    # Jobs that run past their budget: a statement is interrupted, and a leader that overran steps down
+    def endless_query(max_seconds):
+        conn = database.get_db_connection()
+        try:
+            with scheduler._deadline(conn, max_seconds, 'endless-query'):
+                conn.execute('WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) '
+                             'SELECT count(*) FROM n').fetchone()
+        finally:
+            conn.close()
+
+    def oversleep(max_seconds):
+        time.sleep(max_seconds * 1.5)
+        return 0
+
+    runner = scheduler.Scheduler([], tick=60, lease_seconds=lease_seconds, job_max_seconds=lease_seconds * 4)
+    budget = runner.job_max_seconds
+    runner._acquire_lease()
+    interrupted = runner.run_job(scheduler.Job('endless-query', 1, endless_query, 'Endless query'))
+    runner._acquire_lease()
+    overran = runner.run_job(scheduler.Job('oversleep', 1, oversleep, 'Oversleep'))
+    stepped_down = not runner.is_leader and scheduler.get_scheduler_status()['lease'] is None
+    runner.stop()
+    print(f"  budget {budget * 1000:.0f} ms (lease {lease_seconds * 1000:.0f} ms): endless query "
+          f"{interrupted['status']} after {interrupted['duration_ms']} ms, oversleeping leader "
+          f"{'stepped down' if stepped_down else 'kept the lease'}")
+
+    ok = runs and not overlaps and killed_pid in leaders and takeover is not None \
+        and takeover - killed_at < lease_seconds + 1 and recorded == len(runs) \
+        and all(job['last_status'] == 'ok' for job in status['jobs']) \
+        and status['jobs'][0]['last_rows'] == 1 and scheduler.get_scheduler_status()['lease'] is None \
+        and budget <= lease_seconds / 2 and interrupted['status'] == 'error' \
+        and interrupted['duration_ms'] < budget * 1000 * 2 and overran['status'] == 'ok' and stepped_down
+    print("OK: one leader runs the jobs and fails over" if ok else "FAIL: scheduler leader election mismatch")
+    return ok
+
+
+def check_backup(notifications=50000):
+    """A backup must finish under a steady stream of writes, and rotation must keep the newest backup"""
+    db_path = use_temp_database()
+    conn = database.get_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO notifications (recipient_type, recipient_id, title, message)
+            VALUES ('intern', ?, 'Seed', 'Seeded notification')
+        ''', [(n % 20 + 1,) for n in range(notifications)])
+        conn.commit()
+    finally:
+        conn.close()
+    backup_dir = os.path.join(os.path.dirname(db_path), 'backups')
+
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            database.create_notification('intern', 1, 'Live', 'Written during the backup')
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        backup = backup_database.create_backup(backup_dir, pages_per_step=16, step_sleep=0.005)
+        try:
+            backup_database.create_backup(backup_dir, pages_per_step=16, step_sleep=0.005,
+                                          max_restarts=1000, max_seconds=0.3)
+            timed_out = None
+        except Exception as e:
+            timed_out = str(e)
+    finally:
+        stop.set()
+        thread.join()
+
+    copy = sqlite3.connect(backup['path'])
+    try:
+        copied = copy.execute('SELECT COUNT(*) FROM notifications').fetchone()[0]
+    finally:
+        copy.close()
+    leftovers = [name for name in os.listdir(backup_dir) if name.endswith('.partial')]
+    try:
+        backup_database.rotate_backups(backup_dir, keep=0)
+        keep_zero_rejected = False
+    except ValueError:
+        keep_zero_rejected = True
+    kept = [item['name'] for item in backup_database.list_backups(backup_dir)]
+
+    print(f"  under writes: {backup['restarts']} restarts, unpaced final pass {backup['unpaced_final_pass']}, "
+          f"{backup['steps']} steps in {backup['duration_ms']} ms, {copied} rows copied")
+    print(f"  pacing kept restarting: {timed_out}; partial files left {len(leftovers)}")
+    print(f"  --keep 0 rejected: {keep_zero_rejected}; backups kept {len(kept)}")
+
+    ok = backup['unpaced_final_pass'] and backup['restarts'] == backup_database.BACKUP_MAX_RESTARTS \
+        and copied >= notifications and timed_out is not None and 'did not finish' in timed_out \
+        and not leftovers and keep_zero_rejected and kept == [backup['name']]
+    print("OK: backups finish under writes" if ok else "FAIL: backup mismatch")
+    return ok
+
+
+def check_demo_expiry(demos=20000, lapsed=200):
+    """Expired demos must read as inactive without a write, and the sweep must only touch lapsed rows"""
+    use_temp_database()
+    now = datetime.now()
+    conn = database.get_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO demo_credentials (email, username, password, first_name, last_name, company, phone,
+                                          industry_domain, selected_integrations, expires_at, is_active,
+                                          assigned_intern_id)
+            VALUES (?, ?, 'secret', 'Demo', 'User', ?, '555-0100', 'retail', '[]', ?, ?, ?)
+        ''', [(f'demo{n}@example.com', f'demo{n}', f'Company {n}',
+               now - timedelta(hours=1) if n < lapsed else now + timedelta(days=10 if n % 10 else -30),
+               n < lapsed or n % 10 != 0, 1 if n < lapsed else None)
+              for n in range(demos)])
+        conn.commit()
+    finally:
+        conn.close()
+    expected_active = sum(1 for n in range(lapsed, demos) if n % 10)
+
+    listed = database.list_demo_accounts(fields=['id', 'is_active'])[0]
+    active = sum(1 for row in listed if row['is_active'])
+    intern_active = sum(1 for row in database.get_demo_accounts_for_intern(1) if row['is_active'])
+    print(f"  before any sweep: {active} of {len(listed)} demos listed as active ({expected_active} expected), "
+          f"{intern_active} of the intern's {lapsed} lapsed demos")
+
+    # The list ETag must change when a demo expires, even though nothing is written
+    database.create_demo_credentials({'firstName': 'Soon', 'lastName': 'Gone', 'email': 'soon@example.com',
+                                      'company': 'Soon Co', 'phone': '555-0101', 'industryDomain': 'retail'})
+    expires_at = datetime.now() + timedelta(seconds=2)
+    database.execute_write(lambda cursor: cursor.execute(
+        "UPDATE demo_credentials SET expires_at = ? WHERE email = 'soon@example.com'", (expires_at,)))
+    from app import app
+    client = app.test_client()
+    endpoint = '/api/admin/demos?fields=id,email,is_active'
+    etag = client.get(endpoint).headers['ETag']
+    still_fresh = client.get(endpoint, headers={'If-None-Match': etag}).status_code
+    in_time = datetime.now() < expires_at
+    time.sleep(max((expires_at - datetime.now()).total_seconds(), 0) + 0.1)
+    after_expiry = client.get(endpoint, headers={'If-None-Match': etag})
+    soon = [row for row in after_expiry.get_json()['data'] if row['email'] == 'soon@example.com'][0]
+    print(f"  list ETag: {still_fresh} before the demo expires, {after_expiry.status_code} after "
+          f"(is_active now {soon['is_active']})")
+
+    conn = database.get_db_connection()
+    try:
+        plan = [row['detail'] for row in conn.execute(
+            f'EXPLAIN QUERY PLAN UPDATE demo_credentials SET is_active = 0 WHERE {database.DEMO_LAPSED_SQL}')]
+        started = time.perf_counter()
+        conn.execute(f'UPDATE demo_credentials NOT INDEXED SET is_active = 0 WHERE {database.DEMO_LAPSED_SQL}')
+        scan_ms = (time.perf_counter() - started) * 1000
+        conn.rollback()
+    finally:
+        conn.close()
+    started = time.perf_counter()
+    swept = database.expire_demo_accounts()
+    sweep_ms = (time.perf_counter() - started) * 1000
+    again = database.expire_demo_accounts()
+    print(f"  sweep cleared {swept} rows in {sweep_ms:.2f} ms (full scan {scan_ms:.2f} ms) via {plan}; "
+          f"second sweep {again}")
+
+    listed_after = database.list_demo_accounts(fields=['id', 'is_active'])[0]
+    etag_after = client.get(endpoint).headers['ETag']
+    steady = client.get(endpoint, headers={'If-None-Match': etag_after}).status_code
+
+    ok = active == expected_active and intern_active == 0 and in_time and still_fresh == 304 \
+        and after_expiry.status_code == 200 and not soon['is_active'] \
+        and swept == lapsed + 1 and again == 0 and any('idx_demo_active_expires' in line for line in plan) \
+        and sum(1 for row in listed_after if row['is_active']) == expected_active \
+        and etag_after != etag and steady == 304
+    print("OK: demo expiry is evaluated at read time" if ok else "FAIL: demo expiry mismatch")
+    return ok
+
+
+def _count_notifications():
+    conn = database.get_db_connection()
+    try:
+        return conn.execute('SELECT COUNT(*) FROM notifications').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def check_bulk_mutations(rows=500):
+    """A bulk change of 500 rows must take one write transaction, coalesce notifications and keep counters exact"""
+    use_temp_database()
+    seed_interns(rows // 2, requests_per_intern=2, demos_per_intern=2)
+    seed_interns(1, requests_per_intern=0, demos_per_intern=0)
+    target = rows // 2 + 1
+    from app import app
+    client = app.test_client()
+
+    started = time.perf_counter()
+    for request_id in range(1, rows + 1):
+        response = client.post(f'/api/admin/requests/{request_id}/assign', json={'intern_id': target})
+        assert response.status_code == 200, response.data
+    single_ms = (time.perf_counter() - started) * 1000
+    client.post('/api/admin/requests/bulk', json={'action': 'unassign', 'ids': list(range(1, rows + 1))})
+
+    transactions = []
+    execute_write = database.execute_write
+
+    def counting_write(operation):
+        transactions.append(operation)
+        return execute_write(operation)
+
+    ok = True
+    ids = list(range(1, rows + 1))
+    calls = [
+        ('/api/admin/requests/bulk', {'action': 'assign', 'ids': ids, 'intern_id': target}, 2),
+        ('/api/admin/requests/bulk', {'action': 'status', 'ids': ids, 'status': 'completed'}, 2),
+        ('/api/admin/demos/bulk', {'action': 'assign', 'ids': ids, 'intern_id': target}, 2),
+        ('/api/admin/demos/bulk', {'action': 'unassign', 'ids': ids}, 1),
+        ('/api/admin/demos/bulk', {'action': 'delete', 'ids': ids + [10 ** 6]}, 0),
+        ('/api/admin/requests/bulk', {'action': 'delete', 'ids': ids + [10 ** 6]}, 0),
+    ]
+    timings = []
+    database.execute_write = counting_write
+    try:
+        for endpoint, body, expected_notifications in calls:
+            del transactions[:]
+            before = _count_notifications()
+            started = time.perf_counter()
+            response = client.post(endpoint, json=body)
+            timings.append((time.perf_counter() - started) * 1000)
+            result = response.get_json().get('data') or {}
+            writes = len(transactions)
+            notifications = _count_notifications() - before
+            drifted = database.reconcile_intern_counters()
+            print(f"  {endpoint:<25} {body['action']:<9} {result.get('updated', 0):>4} rows in {timings[-1]:6.1f} ms, "
+                  f"{writes} transaction(s), {notifications} notification(s), "
+                  f"not found {result.get('not_found')}, {drifted} intern(s) drifted")
+            if response.status_code != 200 or result['updated'] != rows or writes != 1 \
+                    or notifications != expected_notifications or drifted \
+                    or result['not_found'] != ([10 ** 6] if body['action'] == 'delete' else []):
+                ok = False
+    finally:
+        database.execute_write = execute_write
+    print(f"  assign {rows} customers: {single_ms:.1f} ms one by one, {timings[0]:.1f} ms in bulk")
+
+    rejected = [
+        client.post('/api/admin/requests/bulk', json={'action': 'assign', 'ids': [1], 'intern_id': 10 ** 6}),
+        client.post('/api/admin/requests/bulk', json={'action': 'status', 'ids': [1]}),
+        client.post('/api/admin/requests/bulk', json={'action': 'delete', 'ids': []}),
+        client.post('/api/admin/demos/bulk', json={'action': 'status', 'ids': [1]}),
+        client.post('/api/admin/demos/bulk',
+                    json={'action': 'delete', 'ids': list(range(database.MAX_BULK_IDS + 1))}),
+    ]
+    statuses = [response.status_code for response in rejected]
+    print(f"  invalid requests answered with {statuses}")
+
+    ok = ok and statuses == [400] * len(rejected) and timings[0] < single_ms
+    print("OK: bulk changes run in one transaction" if ok else "FAIL: bulk mutation mismatch")
+    return ok
+
+
+def _write_customer_file(path, rows, start=0):
+    """Write a customer CSV with the given number of rows, one line at a time"""
+    with open(path, 'w', newline='') as f:
+        f.write('first_name,last_name,email,company,phone,industry_domain,selected_integrations\n')
+        for n in range(start, start + rows):
+            f.write(f'Customer,{n},import{n}@example.com,Company {n % 50},555-0100,retail,"Slack;Zoom"\n')
+
+
+def check_bulk_import(small=10000, large=100000):
+    """Importing 10x the rows must not raise peak memory, and re-imports must follow the conflict policy"""
+    # Statement tracing would keep every executed row in memory
+    db_pool.connect_hooks.remove(_trace_connection)
+    try:
+        return _check_bulk_import(small, large)
+    finally:
+        db_pool.connect_hooks.append(_trace_connection)
+
+
+def _check_bulk_import(small, large):
+    use_temp_database()
+    tmp_dir = tempfile.mkdtemp(prefix='smartcard_import_')
+    peaks = {}
+    ok = True
+    for rows, start in ((small, 0), (large, small)):
+        path = os.path.join(tmp_dir, f'customers_{rows}.csv')
+        _write_customer_file(path, rows, start)
+        tracemalloc.start()
+        with open(path, 'rb') as stream:
+            report = import_records.import_records('customers', stream, 'csv')
+        peaks[rows] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rate = rows / report['duration_ms'] * 1000
+        print(f"  {rows:>6} rows: {report['inserted']} added in {report['batches']} batches, "
+              f"{report['duration_ms']:8.1f} ms ({rate:,.0f} rows/s under tracemalloc), "
+              f"peak {peaks[rows] / 1024 / 1024:.2f} MiB")
+        ok = ok and report['inserted'] == rows and not report['errors']
+
+    path = os.path.join(tmp_dir, f'customers_{small}.csv')
+    with open(path, 'rb') as stream:
+        skipped = import_records.import_records('customers', stream, 'csv')
+    with open(path, 'rb') as stream:
+        rejected = import_records.import_records('customers', stream, 'csv', on_conflict='error')
+    with open(path, 'rb') as stream:
+        updated = import_records.import_records('customers', stream, 'csv', on_conflict='update')
+    print(f"  re-import of {small} rows: skip -> {skipped['skipped']} skipped, error -> {rejected['errors']} "
+          f"rejected ({len(rejected['error_rows'])} listed), update -> {updated['updated']} updated")
+
+    from app import app
+    client = app.test_client()
+    body = ('{"first_name": "Demo", "last_name": "Upload", "email": "upload@example.com", "company": "Up Co"}\n'
+            '{"first_name": "Demo", "email": "broken"}\n')
+    response = client.post('/api/admin/import/demos', data=body, content_type='application/x-ndjson')
+    upload = response.get_json()['data']
+    print(f"  NDJSON upload: {upload['inserted']} added, errors {upload['error_rows']}")
+
+    # Squeeze usernames into 1500 values so generated ones collide all the time
+    generate = import_records.generate_demo_username
+    import_records.generate_demo_username = lambda first_name: f'demo_{first_name[:4].lower()}{random.randrange(1500)}'
+    try:
+        body = ''.join(f'{{"first_name": "Demo", "last_name": "{n}", "email": "clash{n}@example.com", '
+                       f'"company": "Clash Co"}}\n' for n in range(1200))
+        clashes = import_records.import_records('demos', io.BytesIO(body.encode()), 'ndjson')
+    finally:
+        import_records.generate_demo_username = generate
+    print(f"  1200 demos over 1500 possible usernames: {clashes['inserted']} added, {clashes['errors']} rejected")
+    drifted = database.reconcile_intern_counters()
+
+    ok = ok and peaks[large] < peaks[small] * 1.5 and skipped['skipped'] == small \
+        and rejected['errors'] == small and len(rejected['error_rows']) == import_records.IMPORT_MAX_ERRORS \
+        and updated['updated'] == small and upload['inserted'] == 1 and upload['errors'] == 1 and not drifted \
+        and clashes['inserted'] == 1200 and not clashes['errors']
+    print("OK: imports stream in constant memory" if ok else "FAIL: bulk import mismatch")
+    return ok
+
+
+def _stream_export(client, url):
+    """Download an export chunk by chunk; returns (lines, bytes, peak traced memory, ms)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    lines = size = 0
+    tail = b''
+    for chunk in response.iter_encoded():
+        size += len(chunk)
+        lines += chunk.count(b'\n')
+        tail = chunk[-200:] or tail
+    response.close()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return response.status_code, lines, size, peak, elapsed_ms, tail
+
+
+def check_bulk_export(rows=200000):
+    """Exports must stream in constant memory and honour their filters"""
+    use_temp_database()
+    seed_interns(2, requests_per_intern=0, demos_per_intern=0)
+    conn = sqlite3.connect(database.DB_PATH)
+    try:
+        conn.executemany('''
+            INSERT INTO free_trial_requests (first_name, last_name, email, company, phone, industry_domain,
+                                             account_type, selected_integrations, status, assigned_intern_id,
+                                             created_at)
+            VALUES ('Customer', ?, ?, ?, '555-0100', 'retail', 'ld', '["HubSpot"]', ?, ?, ?)
+        ''', ((str(n), f'export{n}@example.com', f'Company {n % 50}', 'completed' if n % 4 == 0 else 'pending',
+               1 + n % 2 if n % 3 == 0 else None, f'2026-{1 + n * 9 // rows:02d}-15 12:00:00')
+              for n in range(rows)))
+        conn.commit()
+        september = conn.execute('''
+            SELECT COUNT(*) FROM free_trial_requests
+            WHERE created_at >= '2026-09-01' AND created_at < '2026-10-01' AND status = 'completed'
+        ''').fetchone()[0]
+        intern = conn.execute('SELECT COUNT(*) FROM free_trial_requests WHERE assigned_intern_id = 1').fetchone()[0]
+    finally:
+        conn.close()
+
+    from app import app
+    client = app.test_client()
+    ok = True
+    exports = [
+        ('all rows, csv', '/api/admin/export/customers', rows + 1),
+        ('september completed, csv', '/api/admin/export/customers?status=completed&from=2026-09-01&to=2026-10-01',
+         september + 1),
+        ('intern 1, 3 fields, ndjson', '/api/admin/export/customers?format=ndjson&intern_id=1&fields=id,email,status',
+         intern),
+    ]
+    peaks = []
+    for label, url, expected_lines in exports:
+        status, lines, size, peak, elapsed_ms, tail = _stream_export(client, url)
+        peaks.append(peak)
+        print(f"  {label:<28} {lines:>7} lines {size:>10} bytes in {elapsed_ms:7.1f} ms, "
+              f"peak {peak / 1024 / 1024:.2f} MiB")
+        ok = ok and status == 200 and lines == expected_lines
+        if 'ndjson' in url:
+            ok = ok and set(json.loads(tail.splitlines()[-1])) == {'id', 'email', 'status'}
+
+    ok = ok and max(peaks) < 5 * 1024 * 1024
+    print("OK: exports stream in constant memory" if ok else "FAIL: export mismatch")
+    return ok
+
+
+CHECKS = {
+    'interns-query-count': check_interns_query_count,
+    'query-plans': check_query_plans,
+    'write-queue': benchmark_write_queue,
+    'write-queue-failures': check_write_queue_failures,
+    'connection-leaks': check_connection_leaks,
+    'intern-counters': check_intern_counters,
+    'pagination': check_pagination,
+    'list-projection': check_list_projection,
+    'row-decoder': benchmark_row_decoder,
+    'json-encoder': benchmark_json_encoder,
+    'conditional-get': check_conditional_get,
+    'compression': check_compression,
+    'static-assets': check_static_assets,
+    'read-cache': check_read_cache,
+    'notification-counters': check_notification_counters,
+    'notification-stream': check_notification_stream,
+    'notification-inbox': check_notification_inbox,
+    'notification-retention': check_notification_retention,
+    'scheduler': check_scheduler,
+    'backup': check_backup,
+    'demo-expiry': check_demo_expiry,
+    'bulk-mutations': check_bulk_mutations,
+    'bulk-import': check_bulk_import,
+    'bulk-export': check_bulk_export,
+}
+
+
+def main(argv):
+    names = argv or list(CHECKS)
+    unknown = [name for name in names if name not in CHECKS]
+    if unknown:
+        print(f"Unknown check(s): {', '.join(unknown)}. Available: {', '.join(CHECKS)}")
+        return 2
+
+    ok = True
+    for name in names:
+        print(f"== {name}")
+        ok = CHECKS[name]() and ok
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
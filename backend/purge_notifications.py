@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Retention policy for the notifications table.
+
+Read notifications older than NOTIFICATION_RETENTION_DAYS are deleted, as
+are unread ones older than NOTIFICATION_UNREAD_RETENTION_DAYS when that is
+set. Matching rows are read a batch at a time without holding a lock and
+then deleted by id in a short write transaction of their own, with a pause
+between batches, so other writers wait for one batch at most. A run stops
+after NOTIFICATION_PURGE_MAX_SECONDS and the next run carries on.
+
+With NOTIFICATION_ARCHIVE_PATH set, the rows a batch actually deletes (as
+returned by DELETE ... RETURNING) are copied into the notifications table of
+that SQLite file before the delete commits. A row that changed after it was
+read and no longer matches the policy is neither deleted nor archived, and
+if archiving fails the delete is rolled back.
+
+The counter triggers keep notification_counters in step. Deleted rows free
+whole pages for reuse inside the database file; the file itself only
+shrinks when the database uses auto_vacuum=INCREMENTAL, in which case the
+freed pages are released a few at a time after the purge.
+
+    python purge_notifications.py                 # apply the policy
+    python purge_notifications.py --dry-run       # report what would go
+    python purge_notifications.py --days 14 --archive notifications_archive.db
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import database
+
+# Read notifications are kept this many days; unread ones forever unless
+# NOTIFICATION_UNREAD_RETENTION_DAYS is set (0 = keep)
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', '30'))
+NOTIFICATION_UNREAD_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_UNREAD_RETENTION_DAYS', '0'))
+
+# Rows deleted per write transaction, pause between batches and longest run
+NOTIFICATION_PURGE_BATCH = int(os.environ.get('NOTIFICATION_PURGE_BATCH', '500'))
+NOTIFICATION_PURGE_PAUSE = float(os.environ.get('NOTIFICATION_PURGE_PAUSE', '0.05'))
+NOTIFICATION_PURGE_MAX_SECONDS = float(os.environ.get('NOTIFICATION_PURGE_MAX_SECONDS', '60'))
+
+# SQLite file receiving purged rows (empty = purged rows are discarded)
+NOTIFICATION_ARCHIVE_PATH = os.environ.get('NOTIFICATION_ARCHIVE_PATH', '')
+
+# Free pages released per PRAGMA incremental_vacuum step
+VACUUM_PAGES_PER_STEP = 256
+
+NOTIFICATION_COLUMNS = ('id', 'recipient_type', 'recipient_id', 'title', 'message', 'type',
+                        'read_status', 'created_at', 'related_entity_type', 'related_entity_id')
+
+# Rows covered by the policy: read and past the read cutoff, or past the unread cutoff
+PURGE_PREDICATE = '((read_status = 1 AND created_at < ?) OR created_at < ?)'
+
+PAYLOAD_BYTES = '''
+    LENGTH(title) + LENGTH(message) + IFNULL(LENGTH(related_entity_type), 0) + LENGTH(recipient_type)
+'''
+
+
+def _pragma(conn, name):
+    return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+def open_archive(path):
+    """Open (creating if needed) an archive database with a notifications table"""
+    # Written from whichever thread commits the delete (the writer thread with DB_WRITE_QUEUE)
+    conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    conn.execute(database.TABLE_SCHEMAS['notifications'])
+    conn.commit()
+    return conn
+
+
+def archive_rows(archive, rows):
+    """Copy rows into the archive; re-archiving a row after an interrupted run is a no-op"""
+    archive.executemany(f'''
+        INSERT OR IGNORE INTO notifications ({', '.join(NOTIFICATION_COLUMNS)})
+        VALUES ({', '.join('?' * len(NOTIFICATION_COLUMNS))})
+    ''', rows)
+    archive.commit()
+
+
+def release_free_pages(step_sleep, deadline=None):
+    """Shrink the file with incremental_vacuum when auto_vacuum=INCREMENTAL; returns bytes released
+
+    Stops after the step that passes deadline (a time.perf_counter() value);
+    the pages left over are released by the next purge.
+    """
+    conn = database.get_db_connection()
+    try:
+        if _pragma(conn, 'auto_vacuum') != 2:
+            return 0
+        page_size = _pragma(conn, 'page_size')
+        released = 0
+        while True:
+            free_pages = _pragma(conn, 'freelist_count')
+            if not free_pages:
+                break
+            conn.execute(f'PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})')
+            conn.commit()
+            released += (free_pages - _pragma(conn, 'freelist_count')) * page_size
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            time.sleep(step_sleep)
+        return released
+    finally:
+        conn.close()
+
+
+def purge_notifications(days=None, unread_days=None, archive_path=None, batch_size=None,
+                        pause=None, max_seconds=None, dry_run=False):
+    """Delete (and optionally archive) notifications outside the retention policy
+
+    Returns a report with the rows deleted and archived, the payload bytes
+    they held, the bytes of pages freed in the database file and whether
+    rows were left for the next run.
+    """
+    days = NOTIFICATION_RETENTION_DAYS if days is None else days
+    unread_days = NOTIFICATION_UNREAD_RETENTION_DAYS if unread_days is None else unread_days
+    archive_path = NOTIFICATION_ARCHIVE_PATH if archive_path is None else archive_path
+    batch_size = batch_size or NOTIFICATION_PURGE_BATCH
+    pause = NOTIFICATION_PURGE_PAUSE if pause is None else pause
+    max_seconds = max_seconds or NOTIFICATION_PURGE_MAX_SECONDS
+
+    started = time.perf_counter()
+    conn = database.get_db_connection()
+    try:
+        read_cutoff = conn.execute("SELECT datetime('now', ?)", (f'-{days} days',)).fetchone()[0]
+        unread_cutoff = None
+        if unread_days:
+            unread_cutoff = conn.execute("SELECT datetime('now', ?)", (f'-{unread_days} days',)).fetchone()[0]
+        cutoffs = (read_cutoff, unread_cutoff)
+        page_size = _pragma(conn, 'page_size')
+        free_pages_before = _pragma(conn, 'freelist_count')
+
+        # ids grow with created_at, so nothing from the first row newer than
+        # both cutoffs onwards can match and the scan stops there
+        newest_cutoff = max(cutoff for cutoff in cutoffs if cutoff)
+        row = conn.execute('SELECT id FROM notifications WHERE created_at >= ? ORDER BY id LIMIT 1',
+                           (newest_cutoff,)).fetchone()
+        boundary = row[0] if row else (1 << 63) - 1
+
+        if dry_run:
+            matched, payload = conn.execute(f'''
+                SELECT COUNT(*), IFNULL(SUM({PAYLOAD_BYTES}), 0) FROM notifications
+                WHERE id < ? AND {PURGE_PREDICATE}
+            ''', (boundary,) + cutoffs).fetchone()
+            return {
+                'dry_run': True,
+                'read_cutoff': read_cutoff,
+                'unread_cutoff': unread_cutoff,
+                'rows_matched': matched,
+                'payload_bytes': payload,
+            }
+    finally:
+        conn.close()
+
+    archive = open_archive(archive_path) if archive_path else None
+    report = {
+        'dry_run': False,
+        'read_cutoff': read_cutoff,
+        'unread_cutoff': unread_cutoff,
+        'archive_path': archive_path or None,
+        'rows_deleted': 0,
+        'rows_archived': 0,
+        'payload_bytes': 0,
+        'batches': 0,
+        'complete': False,
+    }
+    last_id = 0
+    try:
+        while time.perf_counter() - started < max_seconds:
+            conn = database.get_db_connection()
+            try:
+                rows = conn.execute(f'''
+                    SELECT {', '.join(NOTIFICATION_COLUMNS)}, {PAYLOAD_BYTES} as payload
+                    FROM notifications
+                    WHERE id > ? AND id < ? AND {PURGE_PREDICATE}
+                    ORDER BY id
+                    LIMIT ?
+                ''', (last_id, boundary) + cutoffs + (batch_size,)).fetchall()
+            finally:
+                conn.close()
+            if not rows:
+                report['complete'] = True
+                break
+
+            ids = [row['id'] for row in rows]
+
+            def delete_batch(cursor):
+                # Re-check the policy in case a row changed since it was read
+                cursor.execute(f'''
+                    DELETE FROM notifications
+                    WHERE id IN ({', '.join('?' * len(ids))}) AND {PURGE_PREDICATE}
+                    RETURNING {', '.join(NOTIFICATION_COLUMNS)}, {PAYLOAD_BYTES}
+                ''', ids + list(cutoffs))
+                deleted = cursor.fetchall()
+                if archive is not None and deleted:
+                    archive_rows(archive, [tuple(row)[:len(NOTIFICATION_COLUMNS)] for row in deleted])
+                return deleted
+
+            deleted = database.execute_write(delete_batch)
+            report['rows_deleted'] += len(deleted)
+            if archive is not None:
+                report['rows_archived'] += len(deleted)
+            report['payload_bytes'] += sum(row[-1] for row in deleted)
+            report['batches'] += 1
+            last_id = ids[-1]
+            if len(rows) < batch_size:
+                report['complete'] = True
+                break
+            time.sleep(pause)
+    finally:
+        if archive is not None:
+            archive.close()
+
+    conn = database.get_db_connection()
+    try:
+        free_pages_after = _pragma(conn, 'freelist_count')
+    finally:
+        conn.close()
+    report['bytes_reclaimed'] = max(free_pages_after - free_pages_before, 0) * page_size
+    report['bytes_released_to_os'] = release_free_pages(pause, started + max_seconds)
+    report['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Purge notifications outside the retention policy')
+    parser.add_argument('--days', type=int,
+                        help=f'keep read notifications this many days (default {NOTIFICATION_RETENTION_DAYS})')
+    parser.add_argument('--unread-days', type=int,
+                        help='also purge unread notifications older than this (default: keep them)')
+    parser.add_argument('--archive', help='copy purged rows into this SQLite file')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be purged and exit')
+    args = parser.parse_args()
+
+    report = purge_notifications(args.days, args.unread_days, args.archive, dry_run=args.dry_run)
+    if report['dry_run']:
+        print(f"{report['rows_matched']} notification(s) ({report['payload_bytes']} bytes of text) "
+              f"would be purged")
+        return
+    print(f"Purged {report['rows_deleted']} notification(s) in {report['batches']} batch(es), "
+          f"{report['duration_ms']} ms: {report['payload_bytes']} bytes of text, "
+          f"{report['bytes_reclaimed']} bytes of pages freed")
+    if report['rows_archived']:
+        print(f"Archived {report['rows_archived']} row(s) to {report['archive_path']}")
+    if not report['complete']:
+        print("Stopped at the time limit; run again to continue.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Per-process cache for read models that rarely change.
+
+Entries are tagged with the table_versions counters of the tables they
+were computed from. Those counters live in the database and are bumped by
+triggers on every write, whichever gunicorn worker (or script) makes it,
+so a lookup costs one primary-key read of the counters and an entry is
+served only while every counter still matches. Entries are also dropped
+after READ_CACHE_TTL seconds and the least recently used ones are evicted
+beyond READ_CACHE_SIZE.
+"""
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from functools import wraps
+
+READ_CACHE_ENABLED = os.environ.get('READ_CACHE_ENABLED', '1').lower() in ('1', 'true', 'yes')
+READ_CACHE_SIZE = int(os.environ.get('READ_CACHE_SIZE', '128'))
+READ_CACHE_TTL = float(os.environ.get('READ_CACHE_TTL', '300'))
+
+
+class ReadCache:
+    """LRU/TTL cache validated against shared table change counters
+
+    get_versions(tables) must return {table: version} for the given tables.
+    """
+
+    def __init__(self, get_versions, max_entries=READ_CACHE_SIZE, ttl=READ_CACHE_TTL):
+        self._get_versions = get_versions
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (versions, expires_at, value)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._expired = 0
+        self._evictions = 0
+
+    def cached(self, *tables, copy=list):
+        """Decorator caching a read function that depends on tables
+
+        copy(value) is applied to the value stored and to every result
+        handed out, so callers can modify what they get without affecting
+        the cached value.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not READ_CACHE_ENABLED:
+                    return func(*args, **kwargs)
+                # Keyed on the bound arguments, so f(), f(None) and f(limit=None) share an entry
+                arguments = signature.bind(*args, **kwargs)
+                arguments.apply_defaults()
+                key = (func.__name__, _freeze(tuple(arguments.arguments.items())))
+                return copy(self._get(key, tables, lambda: copy(func(*args, **kwargs))))
+            wrapper.cache = self
+            return wrapper
+        return decorator
+
+    def _get(self, key, tables, compute):
+        # Read the counters before computing so a concurrent write can only
+        # make the stored entry look stale, never hide the write
+        versions = self._get_versions(tables)
+        versions = tuple(versions.get(table) for table in tables)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == versions and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[2]
+                if entry[0] != versions:
+                    self._stale += 1
+                else:
+                    self._expired += 1
+            self._misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (versions, now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss metrics for this worker"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'pid': os.getpid(),
+                'enabled': READ_CACHE_ENABLED,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stale': self._stale,
+                'expired': self._expired,
+                'evictions': self._evictions,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+def _freeze(value):
+    # Lists in the arguments (e.g. a fields projection) become tuples so the key is hashable
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def copy_page(page):
+    """Copy a (rows, pagination) result into plain dicts, including lists of rows nested in a row"""
+    rows, pagination = page
+    copied = []
+    for row in rows:
+        row = dict(row)
+        for key, value in row.items():
+            if isinstance(value, list) and value and isinstance(value[0], Mapping):
+                row[key] = [dict(item) for item in value]
+        copied.append(row)
+    return copied, dict(pagination) if pagination is not None else None
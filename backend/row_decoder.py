@@ -0,0 +1,93 @@
+"""
+Result rows whose JSON columns are decoded on first use.
+
+Several tables keep JSON documents in TEXT columns. Decoding every one of
+them for every row costs CPU and allocations even when the caller only looks
+at a few plain columns, so rows are built in one pass from the cursor and a
+JSON column is only decoded when it is read or the row is serialized. The
+decoded value is cached on the row.
+"""
+import json
+from collections.abc import MutableMapping
+
+
+class LazyRow(MutableMapping):
+    """A mutable mapping over one result row with lazily decoded JSON columns
+
+    Behaves like the dict built by dict(sqlite3.Row). Values assigned by
+    the caller are stored as given and never decoded. json_columns maps each
+    JSON column to (bit, fallback) and is shared by every row of a result
+    set; the row only keeps a bitmask of the columns already decoded.
+    """
+    __slots__ = ('_values', '_json_columns', '_decoded')
+
+    def __init__(self, values, json_columns):
+        self._values = values
+        self._json_columns = json_columns
+        self._decoded = 0
+
+    def __getitem__(self, key):
+        value = self._values[key]
+        column = self._json_columns.get(key)
+        if column is not None and not self._decoded & column[0]:
+            value = self._decode(key, value)
+        return value
+
+    def _decode(self, key, value):
+        bit, fallback = self._json_columns[key]
+        if value:
+            try:
+                value = json.loads(value)
+            except (ValueError, TypeError):
+                # Keep the stored text unless the table declares a fallback
+                if fallback is not None:
+                    value = fallback()
+        elif fallback is not None:
+            value = fallback()
+        self._values[key] = value
+        self._decoded |= bit
+        return value
+
+    def __setitem__(self, key, value):
+        self._values[key] = value
+        column = self._json_columns.get(key)
+        if column is not None:
+            self._decoded |= column[0]
+
+    def __delitem__(self, key):
+        del self._values[key]
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f'LazyRow({self.to_dict()!r})'
+
+    def to_dict(self):
+        """Decode any remaining JSON columns and return the row as a plain dict"""
+        for key, (bit, _) in self._json_columns.items():
+            if not self._decoded & bit and key in self._values:
+                self._decode(key, self._values[key])
+        return self._values
+
+
+def decode_rows(cursor, rows, json_columns):
+    """Turn rows fetched from cursor into LazyRow mappings
+
+    json_columns maps JSON column names to the factory used when the column
+    is empty or holds invalid JSON (None keeps the stored value as is).
+    Column names and the JSON columns present are resolved once per result
+    set rather than once per row.
+    """
+    keys = [column[0] for column in cursor.description or ()]
+    present = {}
+    for key in keys:
+        if key in json_columns:
+            present[key] = (1 << len(present), json_columns[key])
+    return [LazyRow(dict(zip(keys, row)), present) for row in rows]
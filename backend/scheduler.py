@@ -0,0 +1,324 @@
+"""
+In-process scheduler for database maintenance, run by one elected worker.
+
+Every gunicorn worker starts a scheduler thread when it serves its first
+request. The threads compete for a lease row in scheduler_leases: the worker
+holding an unexpired lease is the leader, and the others only check every
+SCHEDULER_TICK seconds whether it has lapsed. The leader renews the lease on
+every tick and before every job, and runs the due jobs one after another,
+so maintenance never runs twice in parallel, even across workers. If the
+leader dies, another worker takes over once its lease has expired
+(SCHEDULER_LEASE_SECONDS); a worker that exits cleanly hands the lease back
+straight away.
+
+Each job is given SCHEDULER_JOB_MAX_SECONDS, capped at half the lease so a
+job always finishes before anyone else can become leader. The jobs hold to
+it: demo expiry and the purge work in batches and stop when the time is up,
+and the PRAGMA jobs are interrupted at the deadline. A leader whose job
+still overruns hands the lease back rather than run on. Due
+times and the outcome of each job's last run are kept in scheduler_jobs, so
+they survive a change of leader and every worker reports the same status at
+GET /api/admin/scheduler. Intervals and ticks vary by +/- SCHEDULER_JITTER so
+workers and jobs do not fall into step.
+
+Jobs (an interval of 0 disables one):
+
+    demo-expiry           deactivate expired demo accounts
+    notification-purge    purge_notifications.purge_notifications()
+    wal-checkpoint        PRAGMA wal_checkpoint(PASSIVE)
+    optimize              PRAGMA optimize with a bounded analysis_limit
+"""
+import atexit
+import os
+import sqlite3
+import random
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+
+import database
+from purge_notifications import purge_notifications
+
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1').lower() in ('1', 'true', 'yes')
+SCHEDULER_TICK = float(os.environ.get('SCHEDULER_TICK', '5'))
+SCHEDULER_LEASE_SECONDS = float(os.environ.get('SCHEDULER_LEASE_SECONDS', '60'))
+SCHEDULER_JOB_MAX_SECONDS = float(os.environ.get('SCHEDULER_JOB_MAX_SECONDS', '20'))
+SCHEDULER_JITTER = float(os.environ.get('SCHEDULER_JITTER', '0.1'))
+
+# Job intervals in seconds
+DEMO_EXPIRY_INTERVAL = float(os.environ.get('DEMO_EXPIRY_INTERVAL', '300'))
+NOTIFICATION_PURGE_INTERVAL = float(os.environ.get('NOTIFICATION_PURGE_INTERVAL', '3600'))
+WAL_CHECKPOINT_INTERVAL = float(os.environ.get('WAL_CHECKPOINT_INTERVAL', '300'))
+DB_OPTIMIZE_INTERVAL = float(os.environ.get('DB_OPTIMIZE_INTERVAL', '21600'))
+
+# Rows sampled per index by the ANALYZE that PRAGMA optimize may run
+OPTIMIZE_ANALYSIS_LIMIT = 400
+
+LEASE_NAME = 'maintenance'
+
+
+class Job:
+    """A periodic job: func(max_seconds) returns the number of rows (or pages) it touched"""
+    __slots__ = ('name', 'interval', 'func', 'description')
+
+    def __init__(self, name, interval, func, description):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.description = description
+
+
+class _deadline:
+    """Interrupt whatever conn is running once max_seconds have passed
+
+    An interrupted statement is rolled back and surfaces as a TimeoutError,
+    so the job is recorded as failed instead of running past its budget.
+    """
+
+    def __init__(self, conn, max_seconds, name):
+        self.conn = conn
+        self.max_seconds = max_seconds
+        self.name = name
+        self._timer = threading.Timer(max_seconds, conn.interrupt)
+        self._timer.daemon = True
+
+    def __enter__(self):
+        self._timer.start()
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self._timer.cancel()
+        if exc_type is sqlite3.OperationalError and 'interrupted' in str(exc):
+            raise TimeoutError(f'{self.name} interrupted after {self.max_seconds:g} s') from exc
+        return False
+
+
+def expire_demos(max_seconds):
+    return database.expire_demo_accounts(max_seconds=max_seconds)
+
+
+def purge_expired_notifications(max_seconds):
+    return purge_notifications(max_seconds=max_seconds)['rows_deleted']
+
+
+def checkpoint_wal(max_seconds):
+    """Copy WAL frames into the database without waiting for readers or writers"""
+    conn = database.get_db_connection()
+    try:
+        with _deadline(conn, max_seconds, 'wal_checkpoint'):
+            _, _, checkpointed = conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+        return max(checkpointed, 0)
+    finally:
+        conn.close()
+
+
+def optimize_database(max_seconds):
+    conn = database.get_db_connection()
+    try:
+        conn.execute(f'PRAGMA analysis_limit = {OPTIMIZE_ANALYSIS_LIMIT}')
+        with _deadline(conn, max_seconds, 'optimize'):
+            conn.execute('PRAGMA optimize')
+        return None
+    finally:
+        conn.close()
+
+
+JOBS = [
+    Job('demo-expiry', DEMO_EXPIRY_INTERVAL, expire_demos, 'Deactivate expired demo accounts'),
+    Job('notification-purge', NOTIFICATION_PURGE_INTERVAL, purge_expired_notifications,
+        'Purge notifications outside the retention policy'),
+    Job('wal-checkpoint', WAL_CHECKPOINT_INTERVAL, checkpoint_wal, 'Checkpoint the write-ahead log'),
+    Job('optimize', DB_OPTIMIZE_INTERVAL, optimize_database, 'Refresh query planner statistics'),
+]
+
+
+def _jittered(seconds, jitter=SCHEDULER_JITTER):
+    return seconds * random.uniform(1 - jitter, 1 + jitter)
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, timezone.utc).isoformat() if value is not None else None
+
+
+class Scheduler:
+    """Per-process scheduler thread that runs the jobs while it holds the lease"""
+
+    def __init__(self, jobs=None, tick=SCHEDULER_TICK, lease_seconds=SCHEDULER_LEASE_SECONDS,
+                 job_max_seconds=SCHEDULER_JOB_MAX_SECONDS):
+        self.pid = os.getpid()
+        self.holder = f'{socket.gethostname()}:{self.pid}:{secrets.token_hex(4)}'
+        self.jobs = [job for job in (JOBS if jobs is None else jobs) if job.interval > 0]
+        self.tick = tick
+        self.lease_seconds = lease_seconds
+        # A job that outlived the lease could run alongside the next leader's
+        self.job_max_seconds = min(job_max_seconds, lease_seconds / 2)
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='maintenance-scheduler', daemon=True)
+        self._thread.start()
+
+    def _acquire_lease(self):
+        """Take or renew the lease; returns whether this worker is the leader"""
+        now = time.time()
+
+        def acquire(cursor):
+            cursor.execute('''
+                INSERT INTO scheduler_leases (name, holder, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (name) DO UPDATE
+                SET holder = excluded.holder, expires_at = excluded.expires_at
+                WHERE scheduler_leases.holder = excluded.holder OR scheduler_leases.expires_at < ?
+            ''', (LEASE_NAME, self.holder, now + self.lease_seconds, now))
+            return cursor.rowcount == 1
+
+        self.is_leader = database.execute_write(acquire)
+        return self.is_leader
+
+    def release_lease(self):
+        """Hand the lease back so another worker can take over without waiting for it to expire"""
+        def release(cursor):
+            cursor.execute('DELETE FROM scheduler_leases WHERE name = ? AND holder = ?',
+                           (LEASE_NAME, self.holder))
+
+        self.is_leader = False
+        database.execute_write(release)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        if os.getpid() == self.pid:
+            try:
+                self.release_lease()
+            except Exception as e:
+                print(f"Scheduler error releasing lease: {str(e)}")
+
+    def _run(self):
+        while not self._stop.wait(_jittered(self.tick)):
+            try:
+                if self._acquire_lease():
+                    self._run_due_jobs()
+            except Exception as e:
+                print(f"Scheduler error: {str(e)}")
+                self.is_leader = False
+
+    def _run_due_jobs(self):
+        conn = database.get_db_connection()
+        try:
+            next_runs = dict(conn.execute('SELECT name, next_run_at FROM scheduler_jobs').fetchall())
+        finally:
+            conn.close()
+
+        for job in self.jobs:
+            next_run_at = next_runs.get(job.name)
+            if next_run_at is not None and next_run_at > time.time():
+                continue
+            # Renew first: the job must finish before the lease could pass to another worker
+            if self._stop.is_set() or not self._acquire_lease():
+                return
+            self.run_job(job)
+            if not self.is_leader:
+                return
+
+    def run_job(self, job):
+        """Run one job and record its outcome in scheduler_jobs"""
+        started_at = time.time()
+        started = time.perf_counter()
+        rows, status, error = None, 'ok', None
+        try:
+            rows = job.func(self.job_max_seconds)
+        except Exception as e:
+            status, error = 'error', str(e)
+            print(f"Scheduled job {job.name} failed: {error}")
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        overran = duration_ms > self.job_max_seconds * 1000
+
+        def record(cursor):
+            cursor.execute('''
+                INSERT INTO scheduler_jobs (
+                    name, next_run_at, last_started_at, last_duration_ms, last_rows,
+                    last_status, last_error, last_holder, runs, failures
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT (name) DO UPDATE SET
+                    next_run_at = excluded.next_run_at,
+                    last_started_at = excluded.last_started_at,
+                    last_duration_ms = excluded.last_duration_ms,
+                    last_rows = excluded.last_rows,
+                    last_status = excluded.last_status,
+                    last_error = excluded.last_error,
+                    last_holder = excluded.last_holder,
+                    runs = runs + 1,
+                    failures = failures + excluded.failures
+            ''', (job.name, time.time() + _jittered(job.interval), started_at, duration_ms, rows,
+                  status, error, self.holder, int(status == 'error')))
+
+        database.execute_write(record)
+        if overran:
+            # The lease may be close to lapsing: step down rather than start another job on it
+            print(f"Scheduled job {job.name} overran its budget: {duration_ms} ms; releasing the lease")
+            self.release_lease()
+        return {'rows': rows, 'status': status, 'error': error, 'duration_ms': duration_ms}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Get the scheduler for the current process, starting it (again after fork) if enabled"""
+    global _scheduler
+    scheduler = _scheduler
+    if not SCHEDULER_ENABLED:
+        return None
+    if scheduler is None or scheduler.pid != os.getpid():
+        with _scheduler_lock:
+            scheduler = _scheduler
+            if scheduler is None or scheduler.pid != os.getpid():
+                scheduler = _scheduler = Scheduler()
+                atexit.register(scheduler.stop)
+    return scheduler
+
+
+def get_scheduler_status():
+    """Lease holder and per-job status shared by all workers, plus this worker's role"""
+    conn = database.get_db_connection()
+    try:
+        lease = conn.execute('SELECT holder, expires_at FROM scheduler_leases WHERE name = ?',
+                             (LEASE_NAME,)).fetchone()
+        runs = {row['name']: row for row in conn.execute('SELECT * FROM scheduler_jobs').fetchall()}
+    finally:
+        conn.close()
+
+    scheduler = _scheduler if _scheduler is not None and _scheduler.pid == os.getpid() else None
+    jobs = []
+    for job in JOBS:
+        run = runs.get(job.name)
+        jobs.append({
+            'name': job.name,
+            'description': job.description,
+            'interval': job.interval,
+            'enabled': job.interval > 0,
+            'next_run_at': _timestamp(run['next_run_at']) if run else None,
+            'last_started_at': _timestamp(run['last_started_at']) if run else None,
+            'last_duration_ms': run['last_duration_ms'] if run else None,
+            'last_rows': run['last_rows'] if run else None,
+            'last_status': run['last_status'] if run else None,
+            'last_error': run['last_error'] if run else None,
+            'last_holder': run['last_holder'] if run else None,
+            'runs': run['runs'] if run else 0,
+            'failures': run['failures'] if run else 0,
+        })
+    return {
+        'enabled': SCHEDULER_ENABLED,
+        'lease': {
+            'holder': lease['holder'],
+            'expires_at': _timestamp(lease['expires_at']),
+            'active': lease['expires_at'] > time.time(),
+        } if lease else None,
+        'worker': {
+            'pid': os.getpid(),
+            'holder': scheduler.holder,
+            'is_leader': scheduler.is_leader,
+        } if scheduler else None,
+        'jobs': jobs,
+    }
@@ -0,0 +1,215 @@
+"""
+In-memory manifest of the built frontend (frontend/dist).
+
+The tree is scanned once when the app starts: every file's size, mtime,
+content type and content hash is recorded together with any pre-compressed
+`.br`/`.gz` sibling found next to it. Text files the build did not
+compress are compressed once during the scan, at a high level, and the
+encoded bytes are kept in memory, so no request ever compresses an asset.
+Requests are then answered from the manifest without touching the
+filesystem except to stream the file body, and index.html (the response
+for every client-side route) is kept in memory.
+
+Vite writes content-hashed file names under assets/, so those are sent
+with a one-year immutable Cache-Control. Everything else, index.html
+included, must be revalidated with its strong ETag. Range requests are
+supported for every file. Rebuilding the frontend requires restarting the
+workers.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from datetime import datetime, timezone
+
+from flask import current_app, request
+from werkzeug.exceptions import NotFound
+from werkzeug.http import is_resource_modified
+from werkzeug.wsgi import wrap_file
+
+from compression import (
+    AVAILABLE_ENCODINGS, COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE, compress_body, is_compressible,
+    negotiate_encoding,
+)
+
+INDEX_FILE = 'index.html'
+
+# Vite's assetsDir and its "name-[hash].ext" file names
+HASHED_ASSET_DIR = 'assets/'
+HASHED_ASSET_NAME = re.compile(r'-[A-Za-z0-9_-]{8,}\.\w+(\.map)?$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Pre-compressed siblings in order of preference
+PRECOMPRESSED_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+# Levels for assets compressed once at startup rather than per response
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 9
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class Representation:
+    """One encoding of an asset: identity or a pre-compressed sibling"""
+    __slots__ = ('path', 'size', 'etag', 'encoding', 'data')
+
+    def __init__(self, path, size, etag, encoding=None, data=None):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.encoding = encoding
+        self.data = data
+
+
+class Asset:
+    """A file in the manifest with its available representations"""
+    __slots__ = ('name', 'content_type', 'mtime', 'immutable', 'identity', 'encoded')
+
+    def __init__(self, name, content_type, mtime, immutable, identity, encoded):
+        self.name = name
+        self.content_type = content_type
+        self.mtime = mtime
+        self.immutable = immutable
+        self.identity = identity
+        self.encoded = encoded  # {'br': Representation, 'gzip': Representation}
+
+    def select(self, accept_encoding):
+        """The representation to send for an Accept-Encoding header value"""
+        if self.encoded and accept_encoding:
+            encoding = negotiate_encoding(accept_encoding, tuple(self.encoded))
+            if encoding is not None:
+                return self.encoded[encoding]
+        return self.identity
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _content_type(name):
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if mimetype.startswith('text/') or mimetype in ('application/javascript', 'image/svg+xml'):
+        return f'{mimetype}; charset=utf-8'
+    return mimetype
+
+
+class StaticManifest:
+    """Files under root, keyed by their slash-separated relative path"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.assets = {}
+        self.total_bytes = 0
+        self.compressed_at_startup = 0
+        if os.path.isdir(self.root):
+            self._scan()
+        self.index = self.assets.get(INDEX_FILE)
+
+    def _scan(self):
+        files = set()
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                files.add(os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, '/'))
+
+        for name in sorted(files):
+            if any(name.endswith(suffix) and name[:-len(suffix)] in files
+                   for _, suffix in PRECOMPRESSED_SUFFIXES):
+                continue  # served as a representation of the uncompressed file
+            path = os.path.join(self.root, name)
+            stat = os.stat(path)
+            digest = _file_digest(path)
+            in_memory = name == INDEX_FILE
+
+            identity = Representation(path, stat.st_size, digest, data=_read(path) if in_memory else None)
+            encoded = {}
+            for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+                if name + suffix in files:
+                    encoded_path = path + suffix
+                    encoded[encoding] = Representation(
+                        encoded_path, os.path.getsize(encoded_path), f'{digest}-{encoding}', encoding,
+                        _read(encoded_path) if in_memory else None)
+            content_type = _content_type(name)
+            if COMPRESSION_ENABLED and stat.st_size >= COMPRESSION_MIN_SIZE and is_compressible(content_type):
+                self._compress(path, digest, stat.st_size, encoded)
+                encoded = {encoding: encoded[encoding] for encoding, _ in PRECOMPRESSED_SUFFIXES
+                           if encoding in encoded}
+
+            immutable = name.startswith(HASHED_ASSET_DIR) and HASHED_ASSET_NAME.search(name) is not None
+            mtime = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+            self.assets[name] = Asset(name, content_type, mtime, immutable, identity, encoded)
+            self.total_bytes += stat.st_size
+
+    def _compress(self, path, digest, size, encoded):
+        """Add in-memory representations for the encodings the build did not provide"""
+        data = None
+        for encoding in AVAILABLE_ENCODINGS:
+            if encoding in encoded:
+                continue
+            if data is None:
+                data = _read(path)
+            body = compress_body(data, encoding, STATIC_GZIP_LEVEL, STATIC_BROTLI_QUALITY)
+            if len(body) < size:
+                encoded[encoding] = Representation(None, len(body), f'{digest}-{encoding}', encoding, body)
+                self.compressed_at_startup += 1
+
+    def get(self, path):
+        """The asset at path, or index.html for client-side routes"""
+        asset = self.assets.get(path) if path else None
+        if asset is None:
+            asset = self.index
+        if asset is None:
+            raise NotFound()
+        return asset
+
+    def stats(self):
+        """Summary of the manifest for the metrics endpoint"""
+        return {
+            'root': self.root,
+            'files': len(self.assets),
+            'bytes': self.total_bytes,
+            'immutable': sum(1 for asset in self.assets.values() if asset.immutable),
+            'precompressed': sum(1 for asset in self.assets.values()
+                                 if any(r.path is not None for r in asset.encoded.values())),
+            'compressed_at_startup': self.compressed_at_startup,
+            'index_in_memory': self.index is not None,
+        }
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def send_asset(asset):
+    """Response for asset honouring Accept-Encoding, If-None-Match/If-Modified-Since and Range"""
+    representation = asset.select(request.headers.get('Accept-Encoding', ''))
+    headers = {
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL,
+    }
+    if asset.encoded:
+        headers['Vary'] = 'Accept-Encoding'
+
+    if not is_resource_modified(request.environ, etag=representation.etag, last_modified=asset.mtime):
+        response = current_app.response_class(status=304, headers=headers)
+        response.set_etag(representation.etag)
+        response.last_modified = asset.mtime
+        return response
+
+    if representation.data is not None:
+        body = [representation.data]
+    else:
+        body = wrap_file(request.environ, open(representation.path, 'rb'))
+    if representation.encoding:
+        headers['Content-Encoding'] = representation.encoding
+    response = current_app.response_class(body, headers=headers, content_type=asset.content_type,
+                                          direct_passthrough=True)
+    response.content_length = representation.size
+    response.set_etag(representation.etag)
+    response.last_modified = asset.mtime
+    return response.make_conditional(request, accept_ranges=True, complete_length=representation.size)
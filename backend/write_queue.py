@@ -0,0 +1,212 @@
+import os
+import time
+import queue
+import threading
+import db_pool
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# Route writes through one writer thread per process (off by default)
+WRITE_QUEUE_ENABLED = os.environ.get('DB_WRITE_QUEUE', '0').lower() in ('1', 'true', 'yes')
+
+# Most operations committed together, and how long the writer waits for more
+# work before committing a batch (0 = only batch what is already queued)
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get('DB_GROUP_COMMIT_MAX_BATCH', '64'))
+GROUP_COMMIT_WINDOW = float(os.environ.get('DB_GROUP_COMMIT_WINDOW_MS', '0')) / 1000
+
+# Longest a caller waits for its write to be committed
+WRITE_TIMEOUT = float(os.environ.get('DB_WRITE_TIMEOUT', '30'))
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+class _Job:
+    __slots__ = ('operation', 'done', 'result', 'error', 'abandoned')
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+
+
+class WriteQueue:
+    """Single writer thread that commits queued write operations in groups
+
+    Each operation is a callable taking a cursor. Operations in a batch run
+    inside one transaction, each under its own SAVEPOINT so a failing
+    operation is rolled back and reported to its caller without affecting
+    the others. Writer threads in different processes take an exclusive
+    file lock around each batch, so gunicorn workers queue on the OS lock
+    instead of spinning in SQLite's busy handler.
+
+    If the writer cannot open its connection or stops on an unexpected
+    error, every queued job fails with that error and the next call to
+    get_write_queue starts a new writer. A caller gives up after
+    WRITE_TIMEOUT seconds; its operation is skipped unless the writer has
+    already started it.
+    """
+
+    def __init__(self, db_path, timeout=WRITE_TIMEOUT):
+        self.db_path = db_path
+        self.pid = os.getpid()
+        self.timeout = timeout
+        self.error = None
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._operations = 0
+        self._failed_operations = 0
+        self._max_batch = 0
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, operation):
+        """Queue operation(cursor) and wait for its batch to commit, returning its result"""
+        if threading.current_thread() is self._thread:
+            # Nested write from inside an operation - already in the transaction
+            return operation(self._cursor)
+        job = _Job(operation)
+        with self._lock:
+            if self.error is not None:
+                raise self.error
+            self._jobs.put(job)
+        if not job.done.wait(self.timeout):
+            job.abandoned = True
+            raise Exception(f"Timed out after {self.timeout}s waiting for the database writer")
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _next_batch(self):
+        batch = [self._jobs.get()]
+        deadline = time.perf_counter() + GROUP_COMMIT_WINDOW
+        while len(batch) < GROUP_COMMIT_MAX_BATCH:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._jobs.get(timeout=remaining))
+                else:
+                    batch.append(self._jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        batch = []
+        conn = lock_file = None
+        try:
+            conn = db_pool.connect(self.db_path)
+            self._cursor = conn.cursor()
+            lock_file = open(self.db_path + '.write-lock', 'a') if fcntl else None
+
+            while True:
+                batch = self._next_batch()
+                try:
+                    if lock_file:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        self._commit_batch(conn, batch)
+                    finally:
+                        if lock_file:
+                            fcntl.flock(lock_file, fcntl.LOCK_UN)
+                except Exception as e:
+                    print(f"Database error in write queue: {str(e)}")
+                    for job in batch:
+                        if job.error is None:
+                            job.error = e
+                for job in batch:
+                    job.done.set()
+                batch = []
+        except BaseException as e:
+            print(f"Write queue stopped: {str(e)}")
+            self._fail_pending(batch, e)
+            # Closing rolls back a transaction the failure left open, so the next writer is not locked out
+            if conn is not None:
+                conn.close()
+            if lock_file:
+                lock_file.close()
+
+    def _fail_pending(self, batch, error):
+        """Fail the current batch and everything still queued; later submits raise straight away"""
+        with self._lock:
+            self.error = error
+        while True:
+            try:
+                batch.append(self._jobs.get_nowait())
+            except queue.Empty:
+                break
+        for job in batch:
+            if not job.done.is_set():
+                if job.error is None:
+                    job.error = error
+                job.done.set()
+
+    def _commit_batch(self, conn, batch):
+        cursor = self._cursor
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            failed = 0
+            for job in batch:
+                if job.abandoned:
+                    # Its caller timed out and has already reported the failure
+                    job.error = Exception("Write abandoned by its caller")
+                    failed += 1
+                    continue
+                cursor.execute('SAVEPOINT operation')
+                try:
+                    job.result = job.operation(cursor)
+                    cursor.execute('RELEASE operation')
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO operation')
+                    cursor.execute('RELEASE operation')
+                    job.error = e
+                    failed += 1
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        with self._lock:
+            self._batches += 1
+            self._operations += len(batch)
+            self._failed_operations += failed
+            self._max_batch = max(self._max_batch, len(batch))
+
+    def stats(self):
+        """Group-commit metrics for this worker"""
+        with self._lock:
+            return {
+                'pid': self.pid,
+                'running': self.error is None,
+                'queued': self._jobs.qsize(),
+                'batches': self._batches,
+                'operations': self._operations,
+                'failed_operations': self._failed_operations,
+                'max_batch': self._max_batch,
+                'avg_batch': round(self._operations / self._batches, 2) if self._batches else 0.0,
+            }
+
+
+def get_write_queue(db_path):
+    """Get the writer for db_path in the current process (restarted after fork or a failure)"""
+    pid = os.getpid()
+    writer = _queues.get(db_path)
+    if writer is None or writer.pid != pid or writer.error is not None:
+        with _queues_lock:
+            writer = _queues.get(db_path)
+            if writer is None or writer.pid != pid or writer.error is not None:
+                writer = WriteQueue(db_path)
+                _queues[db_path] = writer
+    return writer
+
+
+def get_write_queue_stats():
+    """Metrics for every writer owned by the current process"""
+    pid = os.getpid()
+    return [writer.stats() for writer in list(_queues.values()) if writer.pid == pid]
@@ -811,8 +811,25 @@ export function AdminDashboard() {
     }
   };
 
+  // The customer list leaves out API credentials, so load the full record
+  const loadCustomerRecord = async (customerId) => {
+    try {
+      const response = await apiService.admin.getCustomer(customerId);
+      if (response.data.success) {
+        return response.data.data;
+      }
+      setError("Failed to load customer: " + response.data.message);
+    } catch (err) {
+      setError("Error loading customer: " + err.message);
+      console.error("Error loading customer:", err);
+    }
+    return null;
+  };
+
   // Open project edit dialog
-  const handleEditProject = (customer) => {
+  const handleEditProject = async (listedCustomer) => {
+    const customer = await loadCustomerRecord(listedCustomer.id);
+    if (!customer) return;
     setSelectedCustomer(customer);
     setProjectEditData({
       dashboards_requested: customer.dashboards_requested || 0,
@@ -834,7 +851,9 @@ export function AdminDashboard() {
   };
 
   // View customer details
-  const handleViewCustomerDetails = (customer) => {
+  const handleViewCustomerDetails = async (listedCustomer) => {
+    const customer = await loadCustomerRecord(listedCustomer.id);
+    if (!customer) return;
     setSelectedCustomer(customer);
     setIsViewCustomerDetailsDialogOpen(true);
   };
@@ -20,21 +20,17 @@ export function NotificationDropdown({ recipientType, recipientId = null }) {
   const fetchNotifications = async () => {
     try {
       setLoading(true);
-      const [notificationsResponse, countResponse] = await Promise.all([
-        apiService.notifications.getNotifications(
-          recipientType,
-          recipientId,
-          20
-        ),
-        apiService.notifications.getUnreadCount(recipientType, recipientId),
-      ]);
-
-      if (notificationsResponse.data.success) {
-        setNotifications(notificationsResponse.data.data);
-      }
+      const response = await apiService.notifications.getNotifications(
+        recipientType,
+        recipientId,
+        20
+      );
 
-      if (countResponse.data.success) {
-        setUnreadCount(countResponse.data.data.count);
+      if (response.data.success) {
+        setNotifications(response.data.data);
+        setUnreadCount(response.data.unread_count);
+        // Newest id loaded, so the stream starts right after it
+        return response.data.pagination.latest_id;
       }
     } catch (error) {
       console.error("Error fetching notifications:", error);
@@ -43,13 +39,84 @@ export function NotificationDropdown({ recipientType, recipientId = null }) {
     }
   };
 
+  // Fetch only notifications newer than sinceId; returns the new latest id.
+  // They arrive oldest first, so keep going from latest_id while has_more is set
+  const fetchNewNotifications = async (sinceId) => {
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const response = await apiService.notifications.getNotifications(
+          recipientType,
+          recipientId,
+          20,
+          false,
+          { sinceId }
+        );
+        if (!response.data.success) break;
+
+        const fresh = response.data.data;
+        setUnreadCount(response.data.unread_count);
+        if (fresh.length > 0) {
+          setNotifications((prev) =>
+            [...[...fresh].reverse(), ...prev].slice(0, 20)
+          );
+        }
+        sinceId = response.data.pagination.latest_id ?? sinceId;
+        hasMore = response.data.pagination.has_more && fresh.length > 0;
+      }
+    } catch (error) {
+      console.error("Error fetching notifications:", error);
+    }
+    return sinceId;
+  };
+
   useEffect(() => {
-    fetchNotifications();
+    let source = null;
+    let interval = null;
+    let cancelled = false;
+
+    const subscribe = async () => {
+      const latestId = await fetchNotifications();
+      if (cancelled) return;
+
+      if (typeof EventSource === "undefined") {
+        // Poll for new notifications every 30 seconds
+        let sinceId = latestId;
+        interval = setInterval(async () => {
+          sinceId = await fetchNewNotifications(sinceId);
+        }, 30000);
+        return;
+      }
+
+      // New notifications and unread count changes are pushed by the server;
+      // EventSource reconnects on its own and resumes from the last event id
+      source = new EventSource(
+        apiService.notifications.getStreamUrl(
+          recipientType,
+          recipientId,
+          latestId
+        )
+      );
+      source.addEventListener("notification", (event) => {
+        const notification = JSON.parse(event.data);
+        setNotifications((prev) =>
+          prev.some((notif) => notif.id === notification.id)
+            ? prev
+            : [notification, ...prev].slice(0, 20)
+        );
+      });
+      source.addEventListener("count", (event) => {
+        setUnreadCount(JSON.parse(event.data).count);
+      });
+    };
 
-    // Poll for new notifications every 30 seconds
-    const interval = setInterval(fetchNotifications, 30000);
+    subscribe();
 
-    return () => clearInterval(interval);
+    return () => {
+      cancelled = true;
+      if (source) source.close();
+      if (interval) clearInterval(interval);
+    };
   }, [recipientType, recipientId]);
 
   const handleMarkAsRead = async (notificationId) => {
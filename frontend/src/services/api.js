@@ -80,6 +80,7 @@ export const apiService = {
 
     // Customers (Free trial requests)
     getCustomers: () => apiClient.get("/admin/customers"),
+    getCustomer: (customerId) => apiClient.get(`/admin/customers/${customerId}`),
     getCompanies: () => apiClient.get("/admin/companies"),
     getAllCompanies: () => apiClient.get("/admin/all-companies"),
     updateDashboardCounts: (requestId, data) =>
@@ -125,11 +126,14 @@ export const apiService = {
       recipientType,
       recipientId = null,
       limit = 50,
-      unreadOnly = false
+      unreadOnly = false,
+      { beforeId = null, sinceId = null } = {}
     ) => {
       const params = new URLSearchParams({ limit: limit.toString() });
       if (recipientId) params.append("recipient_id", recipientId.toString());
       if (unreadOnly) params.append("unread_only", "true");
+      if (beforeId) params.append("before_id", beforeId.toString());
+      if (sinceId) params.append("since_id", sinceId.toString());
       return apiClient.get(`/notifications/${recipientType}?${params}`);
     },
     getUnreadCount: (recipientType, recipientId = null) => {
@@ -150,6 +154,12 @@ export const apiService = {
     },
     deleteNotification: (notificationId) =>
       apiClient.delete(`/notifications/${notificationId}`),
+    getStreamUrl: (recipientType, recipientId = null, lastEventId = null) => {
+      const params = new URLSearchParams();
+      if (recipientId) params.append("recipient_id", recipientId.toString());
+      if (lastEventId) params.append("last_event_id", lastEventId.toString());
+      return buildApiUrl(`/notifications/${recipientType}/stream?${params}`);
+    },
   },
 
   // Intern methods